@@ -1,140 +1,17 @@
 #Import Libraries
-import pandas as pd
-import numpy as np
 import streamlit as st
 
-import inflection
+from utils.data import load_data, load_countries, dataset_version
+from utils.export import EXPORT_FORMATS, load_export
+from utils.profiling import start_profile, section, profile_report
 
 
-#Load data
-df = pd.read_csv('data/base_restaurantes.csv')
+#Profiling mode (PROFILE=1 or ?profile=1): section timings in the sidebar
+start_profile('Página_Inicial')
 
-# =======================================
-# Functions
-# =======================================
-
-#Data processing
-#Adjusting variables
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-
-#Rename columns
-def rename_cols(df):
-    df1 = df.copy()
-    
-    title = lambda x: inflection.titleize(x)
-    spaces = lambda x: x.replace(' ', '') 
-    snakecase = lambda x: inflection.underscore(x)
-    
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    
-    cols_new = list(map(snakecase, cols_old))
-    
-    df1.columns = cols_new
-    
-    return df1
-
-#Adjust price type
-def price_type(price_range):
-    if price_range == 1:
-        return 'Cheap'
-    elif price_range == 2:
-        return 'Normal'
-    elif price_range == 3:
-        return 'Expensive'
-    else:
-        return 'Gourmet'
-    
-#Adjust country names
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#Adjust color names
-def color_name(color_code):
-    return COLORS[color_code]
-
-#Adjust columns order
-def adjust_cols_order(df):
-    df1 = df.copy()
-
-    new_cols_order = [
-        'restaurant_id',
-        'restaurant_name',
-        'country',
-        'city',
-        'address',
-        'locality',
-        'locality_verbose',
-        'longitude',
-        'latitude',
-        'cuisines',
-        'price_type',
-        'average_cost_for_two',
-        'currency',
-        'has_table_booking',
-        'has_online_delivery',
-        'is_delivering_now',
-        'aggregate_rating',
-        'rating_color',
-        'color_name',
-        'rating_text',
-        'votes',
-    ]
-    
-    return df1.loc[:, new_cols_order]
-
-#General Data Processing
-def process_data(df):
-    df = df.dropna()
-
-    df = rename_cols(df)
-
-    df['price_type'] = df.loc[:, 'price_range'].apply(lambda x: price_type(x))
-
-    df['country'] = df.loc[:, 'country_code'].apply(lambda x: country_name(x))
-
-    df['color_name'] = df.loc[:, 'rating_color'].apply(lambda x: color_name(x))
-
-    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(',')[0])
-
-    df = df.drop_duplicates()
-
-    df = adjust_cols_order(df)
-
-    df.to_csv('data/base_restaurantes_tratada.csv', index=False)
-
-    return df
-          
-#Data Processing
-df = process_data(df)
+#Load processed data (cached and shared across sessions)
+with section('carregar dados'):
+    df = load_data()
 
 
 #Streamlit page config
@@ -154,14 +31,22 @@ st.sidebar.markdown('## Painel Gerencial')
 
 st.sidebar.markdown('''---''')
 
-st.sidebar.markdown('### Download dos Dados (Arquivo CSV):')
+st.sidebar.markdown('### Download dos Dados:')
+
+formato = st.sidebar.radio('Formato do arquivo', list(EXPORT_FORMATS))
 
-st.sidebar.download_button(
-        label="Download",
-        data=df.to_csv(index=False, sep=";"),
-        file_name="world_restaurants-database.csv",
-        mime="text/csv",
-    )
+paises = st.sidebar.multiselect('Filtrar países (opcional)', load_countries())
+
+extensao, mime = EXPORT_FORMATS[formato]
+
+#Export bytes cached per dataset version/format/selection, shared by every session
+with section('exportação'):
+    st.sidebar.download_button(
+            label="Download",
+            data=load_export(extensao, tuple(sorted(paises)), dataset_version(), df),
+            file_name=f"world_restaurants-database.{extensao}",
+            mime=mime,
+        )
 
 st.sidebar.markdown('Base de dados processada e atualizada!')
 
@@ -211,3 +96,6 @@ st.markdown(
     '''
 )
 
+
+#Section timings of this rerun (profiling mode only)
+profile_report()
@@ -0,0 +1,133 @@
+#Load test of the JSON API (utils.api): throughput and latency under concurrent clients
+#Starts the server in a subprocess, then for each number of clients runs three phases over every view x selection:
+#    frio:        first request of each URL (responses computed)
+#    cache:       clients looping over the URLs for --duration seconds (responses from the cache)
+#    revalidação: same, sending If-None-Match with the known ETags (304 without a body)
+#Usage: python -m benchmarks.bench_api [--clients 1,10,50] [--duration 5] [--port 8650]
+#Client and server share the machine: on few cores the numbers are a lower bound for the server
+
+#Import Libraries
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.ioloop import IOLoop
+
+from utils.api import VIEW_PATHS
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# =======================================
+# Functions
+# =======================================
+
+def start_server(port):
+    server = subprocess.Popen([sys.executable, '-m', 'utils.api', '--port', str(port)], cwd=ROOT,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    #The server prints its address once the dataset is loaded
+    for line in server.stdout:
+        if line.startswith('API em'):
+            return server
+
+    raise RuntimeError('A API não iniciou')
+
+#Every view for every country alone, every country together and a few pairs
+def test_urls(base, countries):
+    selections = [None] + [[c] for c in countries] + [list(pair) for pair in itertools.combinations(countries[:4], 2)]
+
+    urls = []
+    for path, selection in itertools.product(VIEW_PATHS, selections):
+        query = '' if selection is None else '?paises=' + quote(','.join(selection))
+        urls.append(f'{base}/{path}{query}')
+
+    return urls
+
+async def fetch(client, url, etag=None):
+    headers = {'If-None-Match': etag} if etag else None
+    start = time.perf_counter()
+    try:
+        response = await client.fetch(url, headers=headers)
+        code, response_etag = response.code, response.headers.get('Etag')
+    except HTTPClientError as error:
+        code, response_etag = error.code, etag
+
+    return code, response_etag, time.perf_counter() - start
+
+#Coroutines (one per client) requesting random URLs until the deadline
+async def load(client, urls, clients, duration, etags=None):
+    deadline = time.perf_counter() + duration
+    latencies, codes = [], {}
+
+    async def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            url = rng.choice(urls)
+            code, _, latency = await fetch(client, url, etags.get(url) if etags else None)
+            latencies.append(latency)
+            codes[code] = codes.get(code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(clients)])
+    elapsed = time.perf_counter() - start
+
+    return latencies, codes, elapsed
+
+def summary(phase, clients, latencies, codes, elapsed):
+    ms = np.array(latencies) * 1000
+    status = ' '.join(f'{code}:{n}' for code, n in sorted(codes.items()))
+    print(f'{phase:<12} {clients:>8} {len(ms):>9} {len(ms) / elapsed:>9.0f} {np.percentile(ms, 50):>8.1f} '
+          f'{np.percentile(ms, 95):>8.1f} {np.percentile(ms, 99):>8.1f}   {status}')
+
+async def main(args):
+    base = f'http://localhost:{args.port}/api'
+    AsyncHTTPClient.configure(None, max_clients=max(args.clients))
+    client = AsyncHTTPClient()
+
+    status = await client.fetch(f'{base}/status')
+    countries = json.loads(status.body)['countries']
+    urls = test_urls(base, countries)
+    print(f'{len(urls)} URLs ({len(VIEW_PATHS)} visões x {len(urls) // len(VIEW_PATHS)} seleções)\n')
+    print(f"{'fase':<12} {'clientes':>8} {'pedidos':>9} {'pedidos/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}   status")
+
+    #Cold: every response computed once, first request of each URL in sequence
+    etags, latencies, codes = {}, [], {}
+    start = time.perf_counter()
+    for url in urls:
+        code, etag, latency = await fetch(client, url)
+        etags[url] = etag
+        latencies.append(latency)
+        codes[code] = codes.get(code, 0) + 1
+    summary('frio', 1, latencies, codes, time.perf_counter() - start)
+
+    for clients in args.clients:
+        summary('cache', clients, *await load(client, urls, clients, args.duration))
+        summary('revalidação', clients, *await load(client, urls, clients, args.duration, etags))
+
+    status = await client.fetch(f'{base}/status')
+    stats = json.loads(status.body)
+    print('\nservidor:', ', '.join(f'{name} {stats[name]}' for name in ('entries', 'hits', 'misses', 'coalesced', 'not_modified')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=lambda s: [int(n) for n in s.split(',')], default=[1, 10, 50])
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--port', type=int, default=8650)
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    try:
+        IOLoop.current().run_sync(lambda: main(args))
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,95 @@
+#Memory check of the streaming ingest: peak RSS must not grow with the raw file size
+#Each build runs in a fresh process; the raw file is the real data repeated with new restaurant_ids
+#Usage: python -m benchmarks.bench_ingest [teto_mb] [copias ...]
+#Exits with status 1 when a streaming build goes over the ceiling, or when the peak of the largest file
+#is more than GROWTH_MB above the peak of the BASE_COPIES file (smallest file when that size is not measured)
+
+#Import Libraries
+import os
+import subprocess
+import sys
+import tempfile
+
+from utils.data import read_raw
+
+
+#Small chunks/partitions, so the scaled files span many of them (and every partition is about full from BASE_COPIES on)
+CHUNK_ROWS = 20_000
+PARTITION_MB = 4
+
+#Reference size and allowed growth of the streaming peak
+BASE_COPIES = 10
+GROWTH_MB = 25
+
+#Child process: build and report its own peak RSS (MB)
+CHILD = '''
+import resource, sys
+import pandas as pd
+from utils.data import process_data
+from utils.stream import build_snapshot_streaming
+
+raw, out, mode = sys.argv[1:4]
+if mode == 'stream':
+    build_snapshot_streaming(raw, chunk_rows={chunk_rows}, partition_mb={partition_mb},
+                             snapshot_path=out + '/s.parquet', manifest_path=out + '/m.json',
+                             cube_path=out + '/c.parquet', processed_path=out + '/p.csv', price_path=out + '/q.parquet',
+                             distinct_path=out + '/h.parquet')
+else:
+    process_data(pd.read_csv(raw)).to_parquet(out + '/s.parquet', index=False)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+'''.format(chunk_rows=CHUNK_ROWS, partition_mb=PARTITION_MB)
+
+# =======================================
+# Functions
+# =======================================
+
+#Raw file with n copies of the real data (ids shifted per copy, so only the original duplicates repeat)
+def scaled_raw(path, copies):
+    raw = read_raw()
+    offset = int(raw['Restaurant ID'].max()) + 1
+
+    for i in range(copies):
+        raw1 = raw.copy()
+        raw1['Restaurant ID'] = raw1['Restaurant ID'] + i * offset
+        raw1.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+
+#Peak RSS of one build, in MB
+def peak_mb(raw_path, mode):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as out:
+        result = subprocess.run([sys.executable, '-c', CHILD, raw_path, out, mode],
+                                cwd=root, env={**os.environ, 'PYTHONPATH': root},
+                                capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def main(ceiling_mb, copies):
+    failed = False
+    peaks = {}
+
+    print(f"{'cópias':>7} {'arquivo MB':>11} {'pandas MB':>10} {'streaming MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in copies:
+            raw_path = os.path.join(tmp, f'raw_{n}.csv')
+            scaled_raw(raw_path, n)
+
+            size = os.path.getsize(raw_path) / 1024 ** 2
+            full = peak_mb(raw_path, 'pandas')
+            stream = peak_mb(raw_path, 'stream')
+            failed |= stream > ceiling_mb
+            peaks[n] = stream
+
+            print(f'{n:>7} {size:>11.1f} {full:>10.1f} {stream:>13.1f}' + ('   ACIMA DO TETO' if stream > ceiling_mb else ''))
+            os.remove(raw_path)
+
+    base = BASE_COPIES if BASE_COPIES in peaks else min(peaks)
+    growth = peaks[max(peaks)] - peaks[base]
+    failed |= growth > GROWTH_MB
+
+    print(f'Teto: {ceiling_mb:.0f} MB')
+    print(f'Crescimento {base} -> {max(peaks)} cópias: {growth:+.1f} MB (limite {GROWTH_MB} MB)' + ('   CRESCEU' if growth > GROWTH_MB else ''))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    ceiling = float(sys.argv[1]) if len(sys.argv) > 1 else 350
+    sys.exit(main(ceiling, [int(n) for n in sys.argv[2:]] or [1, 10, 40, 80]))
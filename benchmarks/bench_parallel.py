@@ -0,0 +1,64 @@
+#Parallel ingest benchmark: one raw CSV per country, process pool with 1..N workers
+#Usage: python -m benchmarks.bench_parallel [copias] [workers ...]
+
+#Import Libraries
+import os
+import sys
+import tempfile
+import time
+
+from utils.data import read_raw
+from utils.parallel import build_snapshot_parallel, worker_report
+
+
+# =======================================
+# Functions
+# =======================================
+
+#One raw file per country with n copies of the real data (ids shifted per copy)
+def country_files(directory, copies):
+    raw = read_raw()
+    offset = int(raw['Restaurant ID'].max()) + 1
+
+    for i in range(copies):
+        raw1 = raw.copy()
+        raw1['Restaurant ID'] = raw1['Restaurant ID'] + i * offset
+
+        for code, rows in raw1.groupby('Country Code'):
+            path = os.path.join(directory, f'pais_{code:03d}.csv')
+            rows.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory))
+
+def main(copies, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'raw')
+        out_dir = os.path.join(tmp, 'out')
+        os.mkdir(raw_dir)
+        os.mkdir(out_dir)
+        files = country_files(raw_dir, copies)
+
+        print(f'{len(files)} arquivos, {sum(os.path.getsize(f) for f in files) / 1024 ** 2:.1f} MB, {os.cpu_count()} CPUs')
+
+        base = None
+        for n in workers:
+            start = time.perf_counter()
+            manifest, report = build_snapshot_parallel(
+                files, workers=n,
+                snapshot_path=os.path.join(out_dir, 's.parquet'), manifest_path=os.path.join(out_dir, 'm.json'),
+                cube_path=os.path.join(out_dir, 'c.parquet'), processed_path=os.path.join(out_dir, 'p.csv'),
+                price_path=os.path.join(out_dir, 'q.parquet'), distinct_path=os.path.join(out_dir, 'h.parquet'))
+            wall = time.perf_counter() - start
+            base = base or wall
+
+            serial = report.loc[report['step'].isin(['deduplicar', 'juntar']), 'total_s'].sum()
+            print(f'{n:>3} workers: {wall:7.2f} s   {base / wall:5.2f}x   (serial {serial:.2f} s, {manifest["rows"]} restaurantes)')
+
+        print()
+        print(worker_report(report).to_string(index=False, float_format='{:.3f}'.format))
+
+
+if __name__ == '__main__':
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = [int(n) for n in sys.argv[2:]] or sorted({1, 2, 4, 8, 16, 32, os.cpu_count()} & set(range(1, os.cpu_count() + 1)))
+    main(copies, workers)
@@ -0,0 +1,109 @@
+#Price quantiles from the sketch (utils.quantiles) vs exact pandas quantiles
+#1. error bound: every p25/median/p75/p95 per country, city and cuisine, for every country alone, all together and a few
+#   pairs, must be within QUANTILE_ACCURACY (relative) of pandas, and exactly 0 where pandas gives 0
+#2. scale: the real rows resampled with price noise, timing the exact median per country against the sketch
+#   (build once, merge one more batch as an incremental ingest would, quantiles of a selection)
+#Usage: python -m benchmarks.bench_quantiles [--rows 5000000] [--seed 0]
+#Exits with status 1 when an estimate is outside the bound
+
+#Import Libraries
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.quantiles import QUANTILE_ACCURACY, build_price_sketch, merge_price_sketches, sketch_quantiles
+from utils.snapshot import read_snapshot
+
+
+QUANTILES = [0.25, 0.5, 0.75, 0.95]
+
+COLUMNS = ['country', 'city', 'cuisines', 'price_type', 'aggregate_rating', 'average_cost_for_two']
+
+# =======================================
+# Functions
+# =======================================
+
+#Largest relative error of the sketch quantiles of one selection, and the number of zeros that don't match
+def selection_errors(df, sketch, countries, dims):
+    rows = df.loc[df['country'].isin(countries), :]
+    estimate = sketch_quantiles(sketch.loc[sketch['country'].isin(countries), :], dims, QUANTILES)
+    exact = rows.groupby(dims, observed=True)['average_cost_for_two'].quantile(QUANTILES).unstack().loc[estimate.index, :]
+
+    exact = exact.to_numpy()
+    estimate = estimate.to_numpy()
+    zeros = int(((exact == 0) != (estimate == 0)).sum())
+    positive = exact > 0
+
+    return float(np.max(np.abs(estimate[positive] - exact[positive]) / exact[positive], initial=0)), zeros
+
+def check_bound(df):
+    sketch = build_price_sketch(df)
+    countries = df['country'].unique().tolist()
+    selections = [countries] + [[c] for c in countries] + [list(p) for p in itertools.combinations(countries[:4], 2)]
+
+    print(f'sketch: {len(sketch):,} linhas ({len(df):,} restaurantes), precisão {QUANTILE_ACCURACY:.0%}\n')
+    print(f"{'grupo':<10} {'seleções':>8} {'erro máx':>9} {'zeros errados':>14}")
+
+    failed = False
+    for dim in ('country', 'city', 'cuisines'):
+        results = [selection_errors(df, sketch, selection, [dim]) for selection in selections]
+        error = max(r[0] for r in results)
+        zeros = sum(r[1] for r in results)
+        print(f'{dim:<10} {len(selections):>8} {error:>9.3%} {zeros:>14}')
+        failed |= error > QUANTILE_ACCURACY + 1e-9 or zeros > 0
+
+    return failed
+
+#Real rows resampled, prices with multiplicative noise (so they are not all round values)
+def scaled_rows(df, rows, seed):
+    rng = np.random.default_rng(seed)
+    sample = df.iloc[rng.integers(0, len(df), rows), :].reset_index(drop=True)
+    sample['average_cost_for_two'] = np.round(sample['average_cost_for_two'] * rng.lognormal(0, 0.3, rows))
+
+    return sample
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+
+    return result, time.perf_counter() - start
+
+def check_scale(df, rows, seed):
+    big = scaled_rows(df, rows, seed)
+    batch = scaled_rows(df, rows // 100, seed + 1)
+    selection = big['country'].unique().tolist()[:8]
+
+    print(f'\n{rows:,} linhas, seleção de {len(selection)} países')
+
+    sketch, build_s = timed(lambda: build_price_sketch(big))
+    merged, merge_s = timed(lambda: merge_price_sketches([sketch, build_price_sketch(batch)]))
+    print(f'construir o sketch: {build_s:.2f} s ({len(sketch):,} linhas), juntar um lote de {len(batch):,}: {merge_s:.2f} s')
+
+    rows_all = pd.concat([big, batch], ignore_index=True)
+    exact, exact_s = timed(lambda: rows_all.loc[rows_all['country'].isin(selection), :]
+                           .groupby('country', observed=True)['average_cost_for_two'].median())
+    estimate, sketch_s = timed(lambda: sketch_quantiles(merged.loc[merged['country'].isin(selection), :], ['country'], [0.5])[0.5])
+
+    error = float((np.abs(estimate - exact.loc[estimate.index]) / exact.loc[estimate.index]).max())
+    print(f'mediana por país: exata {exact_s:.3f} s, sketch {sketch_s * 1000:.1f} ms, erro máx {error:.3%}')
+
+    return error > QUANTILE_ACCURACY + 1e-9
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = read_snapshot(COLUMNS)
+    failed = check_bound(df)
+    failed |= check_scale(df, args.rows, args.seed)
+
+    if failed:
+        print('\nFORA DO LIMITE de erro')
+        sys.exit(1)
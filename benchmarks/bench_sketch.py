@@ -0,0 +1,92 @@
+#Distinct restaurants per country selection: exact nunique over the rows vs merged HyperLogLog sketches (utils.sketch)
+#The rows are a synthetic history: restaurant ids drawn with repetition (each restaurant seen several times),
+#countries with the real country weights
+#The sketches persisted with the snapshot (per country, city and cuisine) are checked against the snapshot rows first
+#Usage: python -m benchmarks.bench_sketch [--rows 20000000] [--restaurants 5000000] [--seed 0]
+
+#Import Libraries
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.sketch import HLL_ERROR, HLL_PRECISION, SKETCH_DIMENSIONS, build_sketches, estimate_distinct, table_sketches
+from utils.snapshot import DISTINCT_SKETCH_PATH, read_snapshot, read_table
+
+
+# =======================================
+# Functions
+# =======================================
+
+def history(rows, restaurants, seed):
+    rng = np.random.default_rng(seed)
+    weights = read_snapshot(['country'])['country'].value_counts(normalize=True)
+
+    #Each restaurant belongs to one country, and its id comes back in several rows
+    home = rng.choice(len(weights), restaurants, p=weights.to_numpy())
+    ids = rng.integers(0, restaurants, rows)
+    countries = pd.Series(pd.Categorical.from_codes(home[ids], categories=weights.index.astype(str)))
+
+    return ids, countries
+
+#Best of a few runs, in seconds
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return result, best
+
+#Sketch table built at ingest: every group of every dimension against the exact count of the snapshot rows
+def check_snapshot():
+    df = read_snapshot(['restaurant_id'] + SKETCH_DIMENSIONS)
+    table = read_table(DISTINCT_SKETCH_PATH)
+    print(f'sketches do snapshot: {len(table):,} registros não vazios, {table.memory_usage(deep=True).sum() / 1024:.0f} KB em memória')
+
+    print(f"{'grupo':<10} {'grupos':>7} {'erro médio':>11} {'erro máx':>9}")
+    for dim in SKETCH_DIMENSIONS:
+        sketches = table_sketches(table, dim)
+        exact = df.groupby(dim, observed=True)['restaurant_id'].nunique()
+        errors = [estimate_distinct(sketches, [group]) / exact[group] - 1 for group in sketches['groups']]
+        print(f'{dim:<10} {len(errors):>7} {np.mean(np.abs(errors)):>11.2%} {np.max(np.abs(errors)):>9.2%}')
+    print()
+
+def main(args):
+    check_snapshot()
+
+    ids, countries = history(args.rows, args.restaurants, args.seed)
+    names = countries.cat.categories.tolist()
+    print(f'{args.rows:,} linhas, {args.restaurants:,} restaurantes, {len(names)} países')
+
+    sketches, build_s = timed(lambda: build_sketches(ids, countries), repeat=1)
+    print(f'sketches: p={HLL_PRECISION}, {sketches["registers"].nbytes / 1024:.0f} KB, construídos em {build_s:.2f} s, '
+          f'erro padrão {HLL_ERROR:.2%}\n')
+
+    codes = countries.cat.codes.to_numpy()
+    selections = [names] + [[c] for c in names[:5]] + [list(p) for p in itertools.combinations(names[:4], 2)]
+
+    print(f"{'seleção':<40} {'exato':>10} {'exato s':>8} {'estimado':>10} {'sketch ms':>9} {'erro':>7}")
+    errors = []
+    for selection in selections:
+        mask = np.isin(codes, [names.index(c) for c in selection])
+        exact, exact_s = timed(lambda: pd.Series(ids[mask]).nunique(), repeat=1)
+        estimate, sketch_s = timed(lambda: estimate_distinct(sketches, selection))
+        errors.append(estimate / exact - 1)
+
+        label = 'todos' if selection == names else ', '.join(selection)
+        print(f'{label[:40]:<40} {exact:>10,} {exact_s:>8.2f} {estimate:>10,} {sketch_s * 1000:>9.3f} {errors[-1]:>7.2%}')
+
+    print(f'\nerro relativo: médio {np.mean(np.abs(errors)):.2%}, máximo {np.max(np.abs(errors)):.2%}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000_000)
+    parser.add_argument('--restaurants', type=int, default=5_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,52 @@
+#Cold load benchmark: raw CSV + process_data (old path) vs processed Parquet snapshot
+#Usage: python -m benchmarks.bench_snapshot [repeticoes]
+
+#Import Libraries
+import os
+import sys
+import tempfile
+import time
+
+from utils.data import process_data, read_raw, ensure_snapshot
+from utils.snapshot import read_snapshot
+
+
+#Columns used by the Países page, to measure column projection
+PAGE_COLUMNS = ['restaurant_id', 'country', 'cuisines', 'average_cost_for_two', 'votes']
+
+# =======================================
+# Functions
+# =======================================
+
+#Old path: parse raw CSV, process it and write the processed CSV (to a temp file here)
+def load_csv_path():
+    df = process_data(read_raw())
+    with tempfile.TemporaryDirectory() as tmp:
+        df.to_csv(os.path.join(tmp, 'base_restaurantes_tratada.csv'), index=False)
+    return df
+
+#Best wall time of a function over n runs, in milliseconds
+def best_of(func, n):
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main(n=5):
+    ensure_snapshot()
+
+    results = {
+        'CSV + process_data + to_csv': best_of(load_csv_path, n),
+        'Parquet (todas as colunas)': best_of(lambda: read_snapshot(), n),
+        'Parquet (colunas da página Países)': best_of(lambda: read_snapshot(PAGE_COLUMNS), n),
+    }
+
+    base = results['CSV + process_data + to_csv']
+    for name, ms in results.items():
+        print(f'{name:<38} {ms:9.1f} ms   {base / ms:6.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,82 @@
+#Spatial index benchmark: grid index vs brute-force NumPy scan
+#Usage: python -m benchmarks.bench_spatial [linhas ...]
+
+#Import Libraries
+import sys
+import time
+
+import numpy as np
+
+from utils.data import load_data
+from utils.spatial import build_index, query_bbox, query_radius, nearest, haversine
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Dataset with n rows: the real data repeated with jittered coordinates (~1 km)
+def scaled_data(df, n, seed=0):
+    rng = np.random.default_rng(seed)
+    df1 = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    df1['latitude'] = df1['latitude'] + rng.normal(0, 0.01, n)
+    df1['longitude'] = df1['longitude'] + rng.normal(0, 0.01, n)
+    return df1
+
+#Brute-force versions of the queries
+def brute_bbox(lat, lon, south, west, north, east):
+    return np.nonzero((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east))[0]
+
+def brute_radius(lat, lon, plat, plon, km):
+    dist = haversine(plat, plon, lat, lon)
+    pos = np.nonzero(dist <= km)[0]
+    return pos[np.argsort(dist[pos])]
+
+def brute_nearest(lat, lon, mask, plat, plon, k):
+    dist = haversine(plat, plon, lat, lon)
+    dist[~mask] = np.inf
+    pos = np.argpartition(dist, k)[:k]
+    return pos[np.argsort(dist[pos])]
+
+#Mean wall time of a function over the query points, in microseconds
+def mean_us(func, points):
+    start = time.perf_counter()
+    for plat, plon in points:
+        func(plat, plon)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+def main(sizes):
+    base = load_data()
+    rng = np.random.default_rng(1)
+
+    for n in sizes:
+        df = scaled_data(base, n)
+        lat = df['latitude'].to_numpy()
+        lon = df['longitude'].to_numpy()
+        cuisine = (df['cuisines'] == 'Italian').to_numpy()
+
+        start = time.perf_counter()
+        index = build_index(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        points = [(lat[i], lon[i]) for i in rng.integers(0, n, 200)]
+
+        results = {
+            'viewport (0.5 x 0.5 graus)': (
+                mean_us(lambda a, b: query_bbox(index, a - .25, b - .25, a + .25, b + .25), points),
+                mean_us(lambda a, b: brute_bbox(lat, lon, a - .25, b - .25, a + .25, b + .25), points)),
+            'raio 5 km': (
+                mean_us(lambda a, b: query_radius(index, a, b, 5), points),
+                mean_us(lambda a, b: brute_radius(lat, lon, a, b, 5), points)),
+            '10 mais próximos (Italian)': (
+                mean_us(lambda a, b: nearest(index, a, b, 10, {'cuisines': 'Italian'}), points),
+                mean_us(lambda a, b: brute_nearest(lat, lon, cuisine, a, b, 10), points)),
+        }
+
+        print(f'\n{n:,} restaurantes (índice construído em {build_ms:.1f} ms)')
+        for name, (idx_us, brute_us) in results.items():
+            print(f'  {name:<28} índice {idx_us:9.1f} us   força bruta {brute_us:10.1f} us   {brute_us / idx_us:7.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(x) for x in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,86 @@
+#SQL backend check and benchmark: the chart frames of every page from SQLite/DuckDB must equal the pandas ones
+#Usage: python -m benchmarks.bench_sql [sqlite duckdb ...]
+#Exits with status 1 when any frame differs
+
+#Import Libraries
+import glob
+import logging
+import runpy
+import sys
+import time
+import warnings
+
+from utils.charts import compute_charts
+from utils.cube import filter_cube
+from utils.data import dataset_version, load_countries, load_cube, load_cuisine_cube, load_data
+from utils.sql import duckdb, load_database, query_charts
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Chart specs of each page (pages are run once in bare mode to read their CHARTS)
+def page_specs():
+    specs = {}
+    for path in sorted(glob.glob('pages/*.py')):
+        charts = runpy.run_path(path).get('CHARTS')
+        if charts:
+            specs[path] = charts
+
+    return specs
+
+def best_time(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+def main(engines):
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.CRITICAL)
+
+    countries = load_countries()
+    selections = {
+        'todos': countries,
+        'três': countries[:3],
+        'um': countries[7:8],
+        'nenhum': [],
+    }
+
+    specs = page_specs()
+    cube = load_cube()
+    cuisine_cube = load_cuisine_cube()
+    df = load_data()
+    failures = 0
+
+    for engine in engines:
+        start = time.perf_counter()
+        load_database(engine, dataset_version())
+        print(f'\n== {engine} (banco pronto em {time.perf_counter() - start:.2f} s) ==')
+
+        for path, charts in specs.items():
+            for label, selection in selections.items():
+                sources = {'cube': filter_cube(cube, selection), 'cuisine_cube': filter_cube(cuisine_cube, selection),
+                           'rows': df.loc[df['country'].isin(selection), :]}
+
+                expected = compute_charts(charts, sources)
+                frames = query_charts(charts, selection, sources, engine)
+                wrong = [name for name in charts if not frames[name].equals(expected[name])]
+                failures += len(wrong)
+
+                pandas_s = best_time(lambda: compute_charts(charts, sources))
+                sql_s = best_time(lambda: query_charts(charts, selection, sources, engine))
+                status = 'ok' if not wrong else 'DIFERENTE: ' + ', '.join(wrong)
+                print(f'{path:<24} {label:<7} pandas {pandas_s * 1000:7.2f} ms   {engine} {sql_s * 1000:7.2f} ms   {status}')
+
+    print(f'\n{failures} gráficos diferentes')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    engines = sys.argv[1:] or ['sqlite'] + (['duckdb'] if duckdb is not None else [])
+    sys.exit(main(engines))
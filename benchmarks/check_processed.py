@@ -0,0 +1,98 @@
+#Regression check of process_data: the raw CSV processed now must match the original row by row implementation
+#(baseline_process_data below, a copy of process_data before it was vectorized), in the legacy CSV layout
+#Both sides go through the same CSV round trip, so only the processed values and layout are compared
+#Usage: python benchmarks/check_processed.py [--reference arquivo.csv]   (or python -m benchmarks.check_processed)
+#Exits with status 1 when they differ
+
+#Import Libraries
+import argparse
+import io
+import os
+import sys
+
+import pandas as pd
+
+#Run as a script, the repository root is not on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data import COLORS, COUNTRIES, process_data, read_raw, rename_cols
+from utils.schema import legacy_frame
+
+
+# =======================================
+# Functions
+# =======================================
+
+#process_data as it was before the vectorization (one Python call per row), kept as the reference
+def baseline_price_type(price_range):
+    if price_range == 1:
+        return 'Cheap'
+    elif price_range == 2:
+        return 'Normal'
+    elif price_range == 3:
+        return 'Expensive'
+    else:
+        return 'Gourmet'
+
+def baseline_process_data(df):
+    df = df.dropna()
+
+    df = rename_cols(df)
+
+    df['price_type'] = df.loc[:, 'price_range'].apply(lambda x: baseline_price_type(x))
+
+    df['country'] = df.loc[:, 'country_code'].apply(lambda x: COUNTRIES[x])
+
+    df['color_name'] = df.loc[:, 'rating_color'].apply(lambda x: COLORS[x])
+
+    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(',')[0])
+
+    df = df.drop_duplicates()
+
+    return df.loc[:, ['restaurant_id', 'restaurant_name', 'country', 'city', 'address', 'locality', 'locality_verbose',
+                      'longitude', 'latitude', 'cuisines', 'price_type', 'average_cost_for_two', 'currency',
+                      'has_table_booking', 'has_online_delivery', 'is_delivering_now', 'aggregate_rating',
+                      'rating_color', 'color_name', 'rating_text', 'votes']]
+
+#Frame as read back from its CSV
+def csv_round_trip(df):
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)))
+
+#Differences between the two frames, one line each (empty when they match)
+def differences(expected, actual):
+    if list(expected.columns) != list(actual.columns):
+        return [f'colunas: esperado {list(expected.columns)}, obtido {list(actual.columns)}']
+    if len(expected) != len(actual):
+        return [f'linhas: esperado {len(expected)}, obtido {len(actual)}']
+
+    lines = []
+    for col in expected.columns:
+        if str(expected[col].dtype) != str(actual[col].dtype):
+            lines.append(f'{col}: tipo esperado {expected[col].dtype}, obtido {actual[col].dtype}')
+            continue
+
+        diff = ~((expected[col] == actual[col]) | (expected[col].isna() & actual[col].isna()))
+        if diff.any():
+            first = diff.to_numpy().nonzero()[0][0]
+            lines.append(f'{col}: {int(diff.sum())} valores diferentes (linha {first}: '
+                         f'{expected[col].iloc[first]!r} != {actual[col].iloc[first]!r})')
+
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reference', default=None)
+    args = parser.parse_args()
+
+    raw = read_raw()
+    expected = pd.read_csv(args.reference) if args.reference else csv_round_trip(baseline_process_data(raw))
+    actual = csv_round_trip(legacy_frame(process_data(raw)))
+
+    lines = differences(expected, actual)
+    if lines:
+        print('process_data difere da referência:')
+        print('\n'.join(lines))
+        sys.exit(1)
+
+    print(f'process_data confere com a referência: {len(actual)} linhas, {len(actual.columns)} colunas')
@@ -0,0 +1,325 @@
+#Benchmark suite: ingestion, page sections (charts, metrics, map) and peak memory at several dataset sizes
+#Runs headless: pages are executed as plain scripts (Streamlit "bare" mode), one process per dataset size,
+#with their own raw file (RAW_PATH) and snapshot directory (SNAPSHOT_DIR)
+#Bare mode caches nothing, so st.cache_resource/st.cache_data are replaced by an in-process memo (same keys: every
+#argument but the _-prefixed ones) and the warm reruns hit the caches as in the server
+#Usage: python -m benchmarks.suite [--sizes 1,10] [--synthetic 100000,1000000] [--repeat 5] [--output resultados.json]
+#                                  [--baseline benchmarks/baseline.json] [--threshold 0.25] [--save-baseline]
+#Exits with status 1 when a result is slower (or uses more memory) than the baseline by more than the threshold
+#(a size with regressions is measured once more and keeps the best of both runs, so a noisy moment isn't reported)
+
+#Import Libraries
+import argparse
+import datetime
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import platform
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from collections import OrderedDict
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+PAGES = ['Página_Inicial.py'] + sorted(glob.glob(os.path.join('pages', '*.py')), key=os.path.basename)
+
+#Regressions smaller than this (seconds / MB) are noise, whatever the ratio
+#(a warm rerun of a page is ~0.15 s at 1x, mostly the sidebar logo resize, and the same rerun measures 0.12-0.21 s
+#from run to run on a shared machine)
+MIN_DELTA_S = 0.075
+MIN_DELTA_MB = 2.0
+
+# =======================================
+# Functions
+# =======================================
+
+#Page sections: each main-area heading (st.markdown('## ...')) starts a section that runs until the next one,
+#so every chart is timed with its aggregation, figure building and JSON serialization
+class Sections:
+    def __init__(self, page):
+        self.page = page
+        self.times = {}
+        self.name = None
+        self.start = None
+
+    def open(self, name):
+        self.close()
+        self.name = f'{self.page} / {name}'
+        self.start = time.perf_counter()
+
+    def close(self):
+        if self.name is not None:
+            self.times[self.name] = self.times.get(self.name, 0.0) + time.perf_counter() - self.start
+            self.name = None
+
+#Stand-in for st.cache_resource/st.cache_data outside the runtime: memoized per argument values (LRU of max_entries)
+def memoize(func=None, max_entries=None, **options):
+    if func is None:
+        return functools.partial(memoize, max_entries=max_entries)
+
+    signature = inspect.signature(func)
+    entries = OrderedDict()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple((name, value) for name, value in bound.arguments.items() if not name.startswith('_'))
+        try:
+            hash(key)
+        except TypeError:
+            key = repr(key)
+
+        if key in entries:
+            entries.move_to_end(key)
+            return entries[key]
+
+        value = entries[key] = func(*args, **kwargs)
+        if max_entries is not None and len(entries) > max_entries:
+            entries.popitem(last=False)
+        return value
+
+    wrapper.clear = entries.clear
+
+    return wrapper
+
+#Run a page script once, timing its sections and counting the figures served from the figure cache
+#Charts go through utils.figures.show_figure (serialized there, as in the server), so it is wrapped where the pages call it
+def run_page(path, st):
+    import utils.charts
+
+    page = os.path.splitext(os.path.basename(path))[0].split('.')[-1]
+    sections = Sections(page)
+    figures = {'hits': 0, 'misses': 0}
+    markdown = st.markdown
+    show_figure = utils.charts.show_figure
+
+    def heading(body, *args, **kwargs):
+        if body.lstrip().startswith('#'):
+            sections.open(body.strip().splitlines()[0].lstrip('#').strip().rstrip(':'))
+        return markdown(body, *args, **kwargs)
+
+    def figure(key, build, *args, **kwargs):
+        built = []
+        show_figure(key, lambda: built.append(True) or build(), *args, **kwargs)
+        figures['misses' if built else 'hits'] += 1
+
+    st.markdown, utils.charts.show_figure = heading, figure
+    try:
+        sections.open('carregar dados')
+        runpy.run_path(path, run_name='__main__')
+        sections.close()
+    finally:
+        st.markdown, utils.charts.show_figure = markdown, show_figure
+
+    return sections.times, figures
+
+#Peak of the memory allocated by a function (MB, Python + NumPy allocations)
+def traced_peak_mb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+#Child process: every benchmark on the dataset behind RAW_PATH/SNAPSHOT_DIR
+def child(output, repeat):
+    warnings.filterwarnings('ignore')
+    logging.disable(logging.CRITICAL)
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    import streamlit as st
+    st.cache_resource = st.cache_data = memoize
+
+    from utils.data import build_snapshot, ensure_snapshot, process_data, read_raw
+
+    results = {}
+
+    def record(name, cold, warm, peak, **extra):
+        results[name] = {'cold_s': cold, 'warm_s': warm, 'peak_mb': peak, **extra}
+
+    #First build, then rebuilds of the same file (a single run is too noisy to compare)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        source_hash = ensure_snapshot() if not times else build_snapshot(source_hash=source_hash)['source_hash']
+        times.append(time.perf_counter() - start)
+    record('ingestão / build_snapshot', times[0], min(times[1:]) if repeat > 1 else None, None)
+
+    raw = read_raw()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process_data(raw)
+        times.append(time.perf_counter() - start)
+    record('ingestão / process_data', times[0], min(times), traced_peak_mb(lambda: process_data(raw)))
+
+    #First run of each page is cold (empty caches), the best of the others is a warm rerun
+    for path in PAGES:
+        runs, figures = zip(*[run_page(path, st) for _ in range(repeat)])
+        peak = traced_peak_mb(lambda: run_page(path, st))
+
+        for name in runs[0]:
+            warm = min(run.get(name, 0.0) for run in runs[1:]) if repeat > 1 else None
+            record(name, runs[0][name], warm, None)
+
+        total = os.path.splitext(os.path.basename(path))[0].split('.')[-1] + ' / (página inteira)'
+        record(total, sum(runs[0].values()), min(sum(run.values()) for run in runs[1:]) if repeat > 1 else None, peak,
+               figure_hits=figures[-1]['hits'], figure_misses=figures[-1]['misses'])
+
+    record('processo / pico RSS', None, None, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+#Run the child for one dataset size: the real data repeated n times (new restaurant_ids per copy),
+#or n synthetic rows (benchmarks.synthetic, fixed seed)
+def run_size(size, repeat, tmp, synthetic=False):
+    from benchmarks.bench_ingest import scaled_raw
+    from benchmarks.synthetic import generate
+
+    name = f'{size}_linhas' if synthetic else f'{size}x'
+    raw_path = os.path.join(tmp, f'raw_{name}.csv')
+    snapshot_dir = os.path.join(tmp, f'snapshot_{name}')
+    output = os.path.join(tmp, f'resultado_{name}.json')
+    os.makedirs(snapshot_dir)
+
+    if synthetic:
+        generate(raw_path, size)
+    else:
+        scaled_raw(raw_path, size)
+
+    env = {**os.environ, 'PYTHONPATH': ROOT, 'RAW_PATH': raw_path, 'SNAPSHOT_DIR': snapshot_dir}
+    subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--child', output, '--repeat', str(repeat)],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    with open(output, encoding='utf-8') as f:
+        return json.load(f)
+
+#Best of two runs of the same size, per benchmark and metric
+def best_of(results, other):
+    best = {}
+    for name, r in results.items():
+        o = other.get(name, {})
+        best[name] = {metric: min(v, o[metric]) if isinstance(v, float) and isinstance(o.get(metric), float) else v
+                      for metric, v in r.items()}
+
+    return best
+
+#Regressions of the results against the baseline (same size and benchmark)
+#Times are compared on the warm best-of-n; single cold runs only where there is no warm time
+def regressions(results, baseline, threshold):
+    found = []
+
+    for size, benchmarks in results['sizes'].items():
+        for name, current in benchmarks.items():
+            base = baseline['sizes'].get(size, {}).get(name)
+            if base is None:
+                continue
+
+            time_metric = 'cold_s' if current.get('warm_s') is None else 'warm_s'
+            for metric, min_delta in ((time_metric, MIN_DELTA_S), ('peak_mb', MIN_DELTA_MB)):
+                new, old = current.get(metric), base.get(metric)
+                if new is None or old is None:
+                    continue
+                if new > old * (1 + threshold) and new - old > min_delta:
+                    found.append((size, name, metric, old, new))
+
+    return found
+
+def print_results(results, baseline):
+    for size, benchmarks in results['sizes'].items():
+        print(f'\n== {size} ==')
+        print(f"{'benchmark':<70} {'frio s':>9} {'quente s':>9} {'pico MB':>9} {'base s':>9}")
+        for name, r in benchmarks.items():
+            base = (baseline or {}).get('sizes', {}).get(size, {}).get(name, {})
+            base_s = base.get('warm_s') if base.get('warm_s') is not None else base.get('cold_s')
+            cells = [r['cold_s'], r['warm_s'], r['peak_mb'], base_s]
+            print(f'{name:<70} ' + ' '.join('        -' if v is None else f'{v:9.4f}' for v in cells))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1,10')
+    parser.add_argument('--synthetic', default='')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.25)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--child', default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.repeat)
+        return 0
+
+    import pandas as pd
+
+    results = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'sizes': {},
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    runs = ([(f'{n}x', f'Rodando {n}x...', int(n), False) for n in args.sizes.split(',') if n] +
+            [(f'{n} linhas', f'Rodando {n} linhas sintéticas...', int(n), True) for n in args.synthetic.split(',') if n])
+
+    for size, message, n, synthetic in runs:
+        print(message, flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            results['sizes'][size] = run_size(n, args.repeat, tmp, synthetic)
+
+        if baseline is not None and regressions({'sizes': {size: results['sizes'][size]}}, baseline, args.threshold):
+            print(f'Rodando {size} de novo (possível regressão)...', flush=True)
+            with tempfile.TemporaryDirectory() as tmp:
+                results['sizes'][size] = best_of(results['sizes'][size], run_size(n, args.repeat, tmp, synthetic))
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f'\nBaseline salvo em {args.baseline}')
+        return 0
+
+    if baseline is None:
+        print('\nSem baseline para comparar (use --save-baseline)')
+        return 0
+
+    found = regressions(results, baseline, args.threshold)
+    for size, name, metric, old, new in found:
+        print(f'REGRESSÃO {size} {name} {metric}: {old:.4f} -> {new:.4f} ({new / old - 1:+.0%})')
+
+    print(f"\n{len(found)} regressões (limite {args.threshold:.0%})")
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
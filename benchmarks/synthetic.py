@@ -0,0 +1,126 @@
+#Synthetic raw dataset generator (same 21 columns as data/base_restaurantes.csv), for load and scale tests
+#Distributions are learned from the real file and generation streams in chunks, so memory doesn't grow with the row count
+#Usage: python -m benchmarks.synthetic <saida.csv> [--rows 1000000] [--seed 42] [--chunk-rows 50000]
+
+#Import Libraries
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data import read_raw
+
+
+#Columns taken together from the same real restaurant, so the values stay consistent with each other
+#(the other groups are drawn independently, from any restaurant of the same country)
+LOCATION_COLS = ['City', 'Address', 'Locality', 'Locality Verbose', 'Longitude', 'Latitude']
+PRICE_COLS = ['Price range', 'Average Cost for two']
+RATING_COLS = ['Aggregate rating', 'Rating color', 'Rating text', 'Votes']
+SERVICE_COLS = ['Has Table booking', 'Has Online delivery', 'Is delivering now', 'Switch to order menu']
+
+#Coordinates are jittered around the real restaurant (~500 m), so they stay clustered around the cities
+JITTER_DEG = 0.005
+
+#Synthetic ids start here, far from the real ones
+ID_START = 100_000_000
+
+# =======================================
+# Functions
+# =======================================
+
+#Profile of the real data: unique restaurants grouped by country, plus the duplicate rate
+def learn_profile(raw):
+    unique = raw.drop_duplicates()
+    rows = unique.sort_values('Country Code', kind='stable').reset_index(drop=True)
+
+    countries, starts, counts = np.unique(rows['Country Code'].to_numpy(), return_index=True, return_counts=True)
+    names = rows['Restaurant Name'].fillna('').str.split()
+
+    return {
+        'columns': list(raw.columns),
+        'rows': rows,
+        'countries': countries,
+        'country_p': counts / counts.sum(),
+        'starts': starts,
+        'counts': counts,
+        'first_word': names.str[0].fillna('').to_numpy(dtype=object),
+        'last_word': names.str[-1].fillna('').to_numpy(dtype=object),
+        'duplicate_rate': float(raw.duplicated().mean()),
+    }
+
+#Random real restaurant of the same country for each row (positions in profile['rows'])
+def donors(rng, profile, country_idx):
+    u = rng.random(len(country_idx))
+    return profile['starts'][country_idx] + (u * profile['counts'][country_idx]).astype('int64')
+
+#One chunk of n synthetic rows, with ids from first_id
+def generate_chunk(rng, profile, n, first_id):
+    rows = profile['rows']
+    country_idx = rng.choice(len(profile['countries']), size=n, p=profile['country_p'])
+
+    chunk = pd.DataFrame({'Restaurant ID': np.arange(first_id, first_id + n, dtype='int64')})
+
+    #Names: a real name of the country, or the first word of one and the last word of another
+    a, b = donors(rng, profile, country_idx), donors(rng, profile, country_idx)
+    mixed = profile['first_word'][a] + ' ' + profile['last_word'][b]
+    chunk['Restaurant Name'] = np.where(rng.random(n) < 0.5, rows['Restaurant Name'].to_numpy(dtype=object)[a], mixed)
+
+    chunk['Country Code'] = profile['countries'][country_idx]
+
+    location = rows.loc[donors(rng, profile, country_idx), LOCATION_COLS].reset_index(drop=True)
+    location['Longitude'] = (location['Longitude'] + rng.normal(0, JITTER_DEG, n)).round(6)
+    location['Latitude'] = (location['Latitude'] + rng.normal(0, JITTER_DEG, n)).round(6)
+    chunk = pd.concat([chunk, location], axis=1)
+
+    #Whole multi-value strings ("Italian, Pizza"), keeping the cuisine combinations (and missing values) of each country
+    chunk['Cuisines'] = rows['Cuisines'].to_numpy(dtype=object)[donors(rng, profile, country_idx)]
+
+    price = rows.loc[donors(rng, profile, country_idx), PRICE_COLS].reset_index(drop=True)
+    chunk['Average Cost for two'] = price['Average Cost for two']
+    chunk['Currency'] = rows['Currency'].to_numpy(dtype=object)[profile['starts'][country_idx]]
+
+    service = rows.loc[donors(rng, profile, country_idx), SERVICE_COLS].reset_index(drop=True)
+    chunk = pd.concat([chunk, service], axis=1)
+    chunk['Price range'] = price['Price range']
+
+    rating = rows.loc[donors(rng, profile, country_idx), RATING_COLS].reset_index(drop=True)
+    chunk = pd.concat([chunk, rating], axis=1)
+
+    #Exact duplicates of earlier (original) rows of the chunk, at the real duplicate rate
+    is_dup = rng.random(n) < profile['duplicate_rate']
+    is_dup[0] = False
+    dup = np.nonzero(is_dup)[0]
+    if len(dup):
+        originals = np.nonzero(~is_dup)[0]
+        before = np.searchsorted(originals, dup)
+        source = originals[(rng.random(len(dup)) * before).astype('int64')]
+        chunk.iloc[dup] = chunk.iloc[source].to_numpy()
+
+    return chunk.loc[:, profile['columns']]
+
+#Write n synthetic rows to path, chunk by chunk (same seed and chunk size, same file)
+def generate(path, rows, seed=42, chunk_rows=50_000, raw=None):
+    profile = learn_profile(read_raw() if raw is None else raw)
+    rng = np.random.default_rng(seed)
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, chunk_rows) or [0]:
+            n = min(chunk_rows, rows - start)
+            chunk = generate_chunk(rng, profile, n, ID_START + start)
+            chunk.to_csv(f, index=False, header=start == 0)
+
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-rows', type=int, default=50_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate(args.output, args.rows, args.seed, args.chunk_rows)
+    print(f'{args.rows} linhas em {time.perf_counter() - start:.1f} s: {args.output}')
@@ -1,179 +1,115 @@
 #Import Libraries
-import pandas as pd
-import numpy as np
 import streamlit as st
-import folium
-from folium.plugins import MarkerCluster
-from streamlit_folium import folium_static
 
-import plotly.express as px
-import inflection
+from utils.cuisines import CUISINE_MODES
+from utils.data import (load_data, load_country_index, load_cuisine_index, dataset_version, load_cube, load_cube_index,
+                        load_cuisine_cube, load_cuisine_cube_index, load_sketches)
+from utils.lod import load_pyramid, parse_bounds, view
+from utils.profiling import start_profile, section, profile_report
+from utils.selection import select_rows
+from utils.spatial import load_index, nearest
+from utils.sketch import APPROX_DISTINCT
+from utils.views import APPROXIMATE_HELP, APPROXIMATE_METRICS, OVERVIEW_METRICS, format_metric, overview_metrics, sketch_metrics
 
 
-#Load data
-df = pd.read_csv('data/base_restaurantes.csv')
-
 # =======================================
 # Functions
 # =======================================
 
-#Data processing
-#Adjusting variables
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-
-#Rename columns
-def rename_cols(df):
-    df1 = df.copy()
-    
-    title = lambda x: inflection.titleize(x)
-    spaces = lambda x: x.replace(' ', '') 
-    snakecase = lambda x: inflection.underscore(x)
-    
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    
-    cols_new = list(map(snakecase, cols_old))
-    
-    df1.columns = cols_new
-    
-    return df1
-
-#Adjust price type
-def price_type(price_range):
-    if price_range == 1:
-        return 'Cheap'
-    elif price_range == 2:
-        return 'Normal'
-    elif price_range == 3:
-        return 'Expensive'
-    else:
-        return 'Gourmet'
-    
-#Adjust country names
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#Adjust color names
-def color_name(color_code):
-    return COLORS[color_code]
-
-#Adjust columns order
-def adjust_cols_order(df):
-    df1 = df.copy()
-
-    new_cols_order = [
-        'restaurant_id',
-        'restaurant_name',
-        'country',
-        'city',
-        'address',
-        'locality',
-        'locality_verbose',
-        'longitude',
-        'latitude',
-        'cuisines',
-        'price_type',
-        'average_cost_for_two',
-        'currency',
-        'has_table_booking',
-        'has_online_delivery',
-        'is_delivering_now',
-        'aggregate_rating',
-        'rating_color',
-        'color_name',
-        'rating_text',
-        'votes',
-    ]
-    
-    return df1.loc[:, new_cols_order]
-
-#General Data Processing
-def process_data(df):
-    df = df.dropna()
+#Last state reported by the map (zoom, bounds, last_clicked), as returned by st_folium on the previous rerun
+#(st_folium registers its component under a hash of the map, not under its key, so the page keeps the value itself)
+MAP_STATE = 'mapa_estado'
 
-    df = rename_cols(df)
+def map_state():
+    return st.session_state.get(MAP_STATE) or {}
 
-    df['price_type'] = df.loc[:, 'price_range'].apply(lambda x: price_type(x))
+#Zoom and viewport of a map state (bounds None before the map reports any)
+def map_view(state, default_zoom):
+    bounds = state.get('bounds')
 
-    df['country'] = df.loc[:, 'country_code'].apply(lambda x: country_name(x))
+    return state.get('zoom') or default_zoom, bounds if parse_bounds(bounds) is not None else None
 
-    df['color_name'] = df.loc[:, 'rating_color'].apply(lambda x: color_name(x))
+#Reference point for the nearby restaurants panel: last click on the map,
+#otherwise the center of the current map view (both from the state st_folium returned, see map_state)
+def reference_point(df):
+    state = map_state()
 
-    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(',')[0])
+    clicked = state.get('last_clicked')
+    if clicked:
+        return clicked['lat'], clicked['lng']
 
-    df = df.drop_duplicates()
+    try:
+        bounds = state['bounds']
+        return ((bounds['_southWest']['lat'] + bounds['_northEast']['lat']) / 2,
+                (bounds['_southWest']['lng'] + bounds['_northEast']['lng']) / 2)
+    except (KeyError, TypeError):
+        pass
 
-    df = adjust_cols_order(df)
+    if len(df) > 0:
+        return df['latitude'].iloc[0], df['longitude'].iloc[0]
 
-    df.to_csv('data/base_restaurantes_tratada.csv', index=False)
+    return 0.0, 0.0
 
-    return df
-  
 #Draw map
-def create_map(df):
+#Clusters come from the server-side pyramid for the current zoom/viewport (st_folium
+#reports them on each interaction), so the browser never gets every restaurant
+#folium, streamlit_folium and utils.maps are imported here: the metrics above render before their import (~0.4 s cold)
+def create_map(df, paises):
+    import folium
+    from streamlit_folium import st_folium
+
+    from utils.maps import ClusterMarkers, RestaurantMarkers
+
     fig = folium.Figure(width=800, height=600)
 
     map = folium.Map(max_bounds=True, titles='World Restaurants').add_to(fig)
 
-    marker_cluster = MarkerCluster().add_to(map)
-
-    for i, line in df.iterrows():
-        name = line['restaurant_name']
-        price_for_two = line['average_cost_for_two']
-        cuisine = line['cuisines']
-        currency = line['currency']
-        rating = line['aggregate_rating']
-        color = f'{line["color_name"]}'
-        
-        html = '<p><strong>{}</strong></p>'
-        html += '<p>Preço p/ dois: {},00 ({})'
-        html += '<br />Tipo: {}'
-        html += '<br />Nota: {}/5.0'
-        html = html.format(name, price_for_two, currency, cuisine, rating)
-        
-        popup = folium.Popup(
-            folium.Html(html, script=True),
-            max_width=500,
-        )
-        
-        folium.Marker(
-            [line['latitude'], line['longitude']],
-            popup = popup,
-            icon = folium.Icon(color=color, icon='home', prefix='fa'),
-        ).add_to(marker_cluster)
-        
-    folium_static(map, width=800, height=600)
+    zoom, bounds = map_view(map_state(), map.options['zoom'])
+    with section('clusters'):
+        pyramid = load_pyramid(tuple(sorted(paises)), dataset_version(), df)
+        clusters, restaurants = view(pyramid, zoom, bounds)
+
+    layer = folium.FeatureGroup(name='Restaurantes')
+    ClusterMarkers(clusters).add_to(layer)
+    RestaurantMarkers(restaurants, cluster=False).add_to(layer)
+
+    with section('st_folium'):
+        st.session_state[MAP_STATE] = st_folium(map, key='mapa', feature_group_to_add=layer,
+                                                returned_objects=['zoom', 'bounds', 'last_clicked'], width=800, height=600)
+
+    #A zoom/pan reaches the page in the rerun it triggers, after the clusters were drawn for the previous view:
+    #rerun once so they match the new one (clicks alone don't change the view, so they don't rerun)
+    if map_view(map_state(), map.options['zoom']) != (zoom, bounds):
+        st.experimental_rerun()
           
-#Data Processing
-df = process_data(df)
+#Profiling mode (PROFILE=1 or ?profile=1): section timings in the sidebar
+start_profile('Geral')
+
+#Load processed data (cached and shared across sessions), only the columns used on this page
+COLUMNS = [
+    'restaurant_id',
+    'restaurant_name',
+    'country',
+    'city',
+    'latitude',
+    'longitude',
+    'cuisines',
+    'all_cuisines',
+    'price_type',
+    'average_cost_for_two',
+    'currency',
+    'aggregate_rating',
+    'color_name',
+    'votes',
+]
+
+with section('carregar dados'):
+    df = load_data(COLUMNS)
+
+#Spatial index over all restaurants (built once per dataset version)
+with section('índice espacial'):
+    indice = load_index(dataset_version(), df)
+restaurantes = df
 
 
 #Streamlit page config
@@ -204,42 +140,79 @@ paises = st.sidebar.multiselect(
 
 st.sidebar.markdown('''---''')
 
+#Cuisine types counted in the metrics: every cuisine the restaurants list, or only the primary one
+culinarias = st.sidebar.radio('Tipos de Culinária considerados:', list(CUISINE_MODES), format_func=CUISINE_MODES.get)
+
+st.sidebar.markdown('''---''')
+
 st.sidebar.markdown('### Powered by Caio Michelan')
 
-#Data filter on countries
-paises_sel = df.loc[:, 'country'].isin(paises)
-df = df.loc[paises_sel, :]
+#Data filter on countries (precomputed row positions, no copy when every country is selected)
+with section('filtro'):
+    df = select_rows(df, load_country_index(), paises)
 
 # =======================================
 # Streamlit Layout
 # =======================================
 
 #Metrics
-with st.container():
+with st.container(), section('métricas'):
     st.markdown('## Escopo Geral:')
     
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        rest = df['restaurant_id'].nunique()
-        col1.metric('Restaurantes Cadastrados: ', '{:,}'.format(rest).replace(',','.'))
-        
-    with col2:
-        paises = df['country'].nunique()
-        col2.metric('Países Cadastrados: ', paises)
- 
-    with col3:
-        cidades = df['city'].nunique()
-        col3.metric('Cidades Cadastradas: ', cidades)
-        
-    with col4:
-        culinaria = df['cuisines'].nunique()
-        col4.metric('Tipos de Culinária: ', culinaria)
-    
-    av = df['votes'].sum()
-    st.metric('Total de avaliações registradas: ', '{:,}'.format(av).replace(',','.'))
+    #Approximate mode (APPROX_DISTINCT=1): distinct restaurants from the per-country sketches, no pass over the rows
+    if APPROX_DISTINCT:
+        metrics = sketch_metrics(load_sketches(), paises, select_rows(load_cube(), load_cube_index(), paises),
+                                 select_rows(load_cuisine_cube(), load_cuisine_cube_index(), paises) if culinarias != 'principal' else None)
+    else:
+        metrics = overview_metrics(df, load_cuisine_index() if culinarias != 'principal' else None)
+
+    #Restaurants, countries, cities and culinary types side by side, total ratings below
+    for col, name in zip(st.columns(4), ['restaurants', 'countries', 'cities', 'cuisines']):
+        col.metric(f'{OVERVIEW_METRICS[name][0]}: ', format_metric(name, metrics[name]),
+                   help=APPROXIMATE_HELP if name in APPROXIMATE_METRICS else None)
+
+    st.metric(f"{OVERVIEW_METRICS['votes'][0]}: ", format_metric('votes', metrics['votes']))
 
 #Map
-with st.container():
+with st.container(), section('mapa'):
     st.markdown('## Visualização no Mapa:')
-    create_map(df)
+    create_map(df, paises)
+
+#Nearby restaurants
+with st.container(), section('restaurantes próximos'):
+    st.markdown('## Restaurantes Próximos:')
+    st.markdown('Clique no mapa para escolher o ponto de referência ou informe as coordenadas.')
+
+    lat, lon = reference_point(df)
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    lat = col1.number_input('Latitude', min_value=-90.0, max_value=90.0, value=float(lat), format='%.5f')
+    lon = col2.number_input('Longitude', min_value=-180.0, max_value=180.0, value=float(lon), format='%.5f')
+    culinaria = col3.selectbox('Tipo de Culinária', ['Todas'] + sorted(df['cuisines'].unique().tolist()))
+    preco = col4.selectbox('Tipo de Preço', ['Todos', 'Cheap', 'Normal', 'Expensive', 'Gourmet'])
+    qtd = col5.number_input('Quantidade', min_value=1, max_value=100, value=10)
+
+    filtros = {
+        'country': paises,
+        'cuisines': None if culinaria == 'Todas' else culinaria,
+        'price_type': None if preco == 'Todos' else preco,
+    }
+    rows, dist = nearest(indice, lat, lon, int(qtd), filtros)
+
+    df_aux = restaurantes.iloc[rows].loc[:, ['restaurant_name', 'country', 'city', 'cuisines', 'price_type', 'aggregate_rating']]
+    df_aux['distance'] = dist.round(2)
+    df_aux.rename(columns={
+        'restaurant_name':'Restaurante',
+        'country':'País',
+        'city':'Cidade',
+        'cuisines':'Tipo de Culinária',
+        'price_type':'Tipo de Preço',
+        'aggregate_rating':'Nota',
+        'distance':'Distância (km)',
+    }, inplace=True)
+
+    st.dataframe(df_aux.reset_index(drop=True), width=800)
+
+#Section timings of this rerun (profiling mode only)
+profile_report()
@@ -1,142 +1,34 @@
 #Import Libraries
-import pandas as pd
-import numpy as np
 import streamlit as st
 
-import plotly.express as px
-import inflection
+from utils.charts import PageCharts
+from utils.cube import filter_cube
+from utils.cuisines import CUISINE_MODES
+from utils.data import (load_data, load_cube, load_countries, load_country_index, load_cube_index, load_cuisine_cube, load_cuisine_cube_index,
+                        load_price_sketch, load_price_sketch_index)
+from utils.profiling import start_profile, section, profile_report
+from utils.selection import select_rows
+from utils.quantiles import APPROX_QUANTILES
+from utils.views import COUNTRY_CHARTS, cuisine_specs, quantile_specs
 
 
-#Load data
-df = pd.read_csv('data/base_restaurantes.csv')
+#Profiling mode (PROFILE=1 or ?profile=1): section timings in the sidebar
+start_profile('Países')
 
-# =======================================
-# Functions
-# =======================================
-
-#Data processing
-#Adjusting variables
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-
-#Rename columns
-def rename_cols(df):
-    df1 = df.copy()
-    
-    title = lambda x: inflection.titleize(x)
-    spaces = lambda x: x.replace(' ', '') 
-    snakecase = lambda x: inflection.underscore(x)
-    
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    
-    cols_new = list(map(snakecase, cols_old))
-    
-    df1.columns = cols_new
-    
-    return df1
-
-#Adjust price type
-def price_type(price_range):
-    if price_range == 1:
-        return 'Cheap'
-    elif price_range == 2:
-        return 'Normal'
-    elif price_range == 3:
-        return 'Expensive'
-    else:
-        return 'Gourmet'
-    
-#Adjust country names
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#Adjust color names
-def color_name(color_code):
-    return COLORS[color_code]
-
-#Adjust columns order
-def adjust_cols_order(df):
-    df1 = df.copy()
-
-    new_cols_order = [
-        'restaurant_id',
-        'restaurant_name',
-        'country',
-        'city',
-        'address',
-        'locality',
-        'locality_verbose',
-        'longitude',
-        'latitude',
-        'cuisines',
-        'price_type',
-        'average_cost_for_two',
-        'currency',
-        'has_table_booking',
-        'has_online_delivery',
-        'is_delivering_now',
-        'aggregate_rating',
-        'rating_color',
-        'color_name',
-        'rating_text',
-        'votes',
-    ]
-    
-    return df1.loc[:, new_cols_order]
-
-#General Data Processing
-def process_data(df):
-    df = df.dropna()
-
-    df = rename_cols(df)
-
-    df['price_type'] = df.loc[:, 'price_range'].apply(lambda x: price_type(x))
-
-    df['country'] = df.loc[:, 'country_code'].apply(lambda x: country_name(x))
+#Load aggregation cubes (primary cuisine, every listed cuisine) and processed data (cached and shared across sessions)
+#Rows are only needed for the median price chart, everything else rolls up the cube
+#(approximate mode, APPROX_QUANTILES=1: the median comes from the price sketch and no row is loaded)
+COLUMNS = [
+    'country',
+    'average_cost_for_two',
+]
 
-    df['color_name'] = df.loc[:, 'rating_color'].apply(lambda x: color_name(x))
+PRICE_SOURCE = 'price_sketch' if APPROX_QUANTILES else 'rows'
 
-    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(',')[0])
-
-    df = df.drop_duplicates()
-
-    df = adjust_cols_order(df)
-
-    df.to_csv('data/base_restaurantes_tratada.csv', index=False)
-
-    return df
-
-          
-#Data Processing
-df = process_data(df)
+with section('carregar dados'):
+    cube = load_cube()
+    cuisine_cube = load_cuisine_cube()
+    prices = load_price_sketch() if APPROX_QUANTILES else load_data(COLUMNS)
 
 
 #Streamlit page config
@@ -159,7 +51,7 @@ st.sidebar.markdown('''---''')
 #Insert multiselector for filtering
 paises = st.sidebar.multiselect(
     'Selecione os países que deseja visualizar:',
-    df.loc[:, 'country'].unique().tolist(),
+    load_countries(),
     default = ['Philippines', 'Brazil', 'Australia', 'United States of America',
        'Canada', 'Singapure', 'United Arab Emirates', 'India',
        'Indonesia', 'New Zeland', 'England', 'Qatar', 'South Africa',
@@ -167,11 +59,24 @@ paises = st.sidebar.multiselect(
 
 st.sidebar.markdown('''---''')
 
+#Cuisine types counted in the charts: every cuisine the restaurants list, or only the primary one
+culinarias = st.sidebar.radio('Tipos de Culinária considerados:', list(CUISINE_MODES), format_func=CUISINE_MODES.get)
+
+st.sidebar.markdown('''---''')
+
 st.sidebar.markdown('### Powered by Caio Michelan')
 
-#Data filter on countries
-paises_sel = df.loc[:, 'country'].isin(paises)
-df = df.loc[paises_sel, :]
+#Data filter on countries (precomputed row positions, no copy when every country is selected)
+with section('filtro'):
+    prices = select_rows(prices, load_price_sketch_index() if APPROX_QUANTILES else load_country_index(), paises)
+    cube = filter_cube(cube, paises, load_cube_index())
+    cuisine_cube = filter_cube(cuisine_cube, paises, load_cuisine_cube_index())
+
+#Charts of the page (specs in utils.views, aggregated by utils.charts)
+CHARTS = quantile_specs(cuisine_specs(COUNTRY_CHARTS, culinarias))
+
+#Charts of the selection (figures served from the figure cache, frames computed only on a miss)
+charts = PageCharts('Países', CHARTS, paises, {'cube': cube, PRICE_SOURCE: prices, 'cuisine_cube': cuisine_cube})
 
 
 # =======================================
@@ -179,123 +84,42 @@ df = df.loc[paises_sel, :]
 # =======================================
 
 #Restaurants by country pie graph
-with st.container():
+with st.container(), section('restaurantes por país'):
     
-    st.markdown('### Quantidade de Restaurantes por País:')
-
-    df_aux = (df.loc[:, ['restaurant_id' ,'country']]
-    .groupby('country')
-    .nunique()
-    .sort_values('restaurant_id', ascending=False)
-    .reset_index())
+    st.markdown(f"### {CHARTS['restaurantes_pais']['title']}:")
     
-    fig = px.pie(df_aux,
-        values='restaurant_id',
-        names='country',
-        #title='Quantidade de Restaurantes por País - Visão Geral',
-        labels={'restaurant_id':'QTD Restaurantes',
-               'country':'País'})
-    
-    st.plotly_chart(fig, use_container_width=True)
+    charts.show('restaurantes_pais')
         
 #Top 10 countries with more restaurants bar graph
-with st.container():
-    
-    st.markdown('### Top 10 Países com Maior Número de Restaurantes:')
-    
-    df_aux = (df.loc[:, ['restaurant_id' ,'country']]
-    .groupby('country')
-    .nunique()
-    .sort_values('restaurant_id', ascending=False)
-    .reset_index())
+with st.container(), section('top 10 países'):
     
-    fig = px.bar(df_aux.head(10),
-               x='country',
-               y='restaurant_id',
-               text='restaurant_id',
-               text_auto='.0f',
-               #title='Top 10 Países com mais Restaurantes',
-               color='country',
-               labels={
-                   'country':'Países',
-                   'restaurant_id':'QTD Restaurantes',
-               })
+    st.markdown(f"### {CHARTS['top_paises']['title']}:")
     
-    st.plotly_chart(fig, use_container_width=True)
+    charts.show('top_paises')
 
 #Overall culinary types by country bar graph
-with st.container():
+with st.container(), section('culinárias por país'):
     
-    st.markdown('### Total de Tipos de Culinária por País:')
+    st.markdown(f"### {CHARTS['culinarias_pais']['title']}:")
     
-    df_aux = (df.loc[:, ['country', 'cuisines']]
-              .groupby('country')
-              .nunique()
-              .sort_values('cuisines', ascending=False)
-              .reset_index())
-    
-    fig = px.bar(df_aux,
-               x='country',
-               y='cuisines',
-               text='cuisines',
-               text_auto='.0f',
-               #title='Total de Tipos de Culinária por País',
-               color='country',
-               labels={
-                   'country':'Países',
-                   'cuisines':'Tipos de Culinária',
-               })
-    st.plotly_chart(fig, use_container_width=True)
+    charts.show('culinarias_pais')
 
 #Average price of meal for two person bar graph
-with st.container(): 
+with st.container(), section('preço mediano'):
 
-    st.markdown('### Média de Preços de um Prato para Duas Pessoas (Considerada a Mediana*):')
-    
-    cond = df['country']!='Indonesia'
-    df_aux = (df.loc[cond, ['country', 'average_cost_for_two']]
-              .groupby('country')
-              .median()
-              .sort_values('average_cost_for_two', ascending=False)
-              .reset_index())
+    st.markdown(f"### {CHARTS['preco_mediano']['title']}:")
     
-    fig = px.bar(df_aux,
-           x='country',
-           y='average_cost_for_two',
-           text='average_cost_for_two',
-           text_auto='.0f',
-           #title='Média de Preços de um Prato para Duas Pessoas (Considerada a Mediana*)',
-           color='country',
-           labels={
-               'country':'Países',
-               'average_cost_for_two':'Média de Preço',
-           })
-    
-    st.plotly_chart(fig, use_container_width=True)
-    st.markdown('*Mediana: Valor Central de um conjunto de números colocados por ordem de grandeza.')
-    st.markdown('**Nesta análise foi desconsiderado a Indonésia por se configurar um Outlier previamente identificado.')
+    charts.show('preco_mediano')
+    for note in CHARTS['preco_mediano']['notes']:
+        st.markdown(note)
 
 #Average registered ratings by country bar graph
-with st.container():
-    
-    st.markdown('### Média de Avaliações por País:')
-    
-    df_aux = (df.loc[:, ['country', 'votes']]
-              .groupby('country')
-              .mean()
-              .sort_values('votes', ascending=False)
-              .reset_index())
+with st.container(), section('média de avaliações'):
     
-    fig = px.bar(df_aux,
-           x='country',
-           y='votes',
-           text='votes',
-           text_auto='.0f',
-           #title='Média de Avaliações por País',
-           color='country',
-           labels={
-               'country':'Países',
-               'votes':'Média de Avaliações',
-           })
+    st.markdown(f"### {CHARTS['media_avaliacoes']['title']}:")
     
-    st.plotly_chart(fig, use_container_width=True)
+    charts.show('media_avaliacoes')
+
+
+#Section timings of this rerun (profiling mode only)
+profile_report()
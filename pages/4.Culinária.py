@@ -1,142 +1,21 @@
 #Import Libraries
-import pandas as pd
-import numpy as np
 import streamlit as st
 
-import plotly.express as px
-import inflection
+from utils.charts import PageCharts
+from utils.cube import filter_cube
+from utils.cuisines import CUISINE_MODES
+from utils.data import load_cube, load_countries, load_cube_index, load_cuisine_cube, load_cuisine_cube_index
+from utils.profiling import start_profile, section, profile_report
+from utils.views import CUISINE_CHARTS, cuisine_specs
 
 
-#Load data
-df = pd.read_csv('data/base_restaurantes.csv')
+#Profiling mode (PROFILE=1 or ?profile=1): section timings in the sidebar
+start_profile('Culinária')
 
-# =======================================
-# Functions
-# =======================================
-
-#Data processing
-#Adjusting variables
-COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-}
-
-
-COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-}
-
-#Rename columns
-def rename_cols(df):
-    df1 = df.copy()
-    
-    title = lambda x: inflection.titleize(x)
-    spaces = lambda x: x.replace(' ', '') 
-    snakecase = lambda x: inflection.underscore(x)
-    
-    cols_old = list(df1.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    
-    cols_new = list(map(snakecase, cols_old))
-    
-    df1.columns = cols_new
-    
-    return df1
-
-#Adjust price type
-def price_type(price_range):
-    if price_range == 1:
-        return 'Cheap'
-    elif price_range == 2:
-        return 'Normal'
-    elif price_range == 3:
-        return 'Expensive'
-    else:
-        return 'Gourmet'
-    
-#Adjust country names
-def country_name(country_id):
-    return COUNTRIES[country_id]
-
-#Adjust color names
-def color_name(color_code):
-    return COLORS[color_code]
-
-#Adjust columns order
-def adjust_cols_order(df):
-    df1 = df.copy()
-
-    new_cols_order = [
-        'restaurant_id',
-        'restaurant_name',
-        'country',
-        'city',
-        'address',
-        'locality',
-        'locality_verbose',
-        'longitude',
-        'latitude',
-        'cuisines',
-        'price_type',
-        'average_cost_for_two',
-        'currency',
-        'has_table_booking',
-        'has_online_delivery',
-        'is_delivering_now',
-        'aggregate_rating',
-        'rating_color',
-        'color_name',
-        'rating_text',
-        'votes',
-    ]
-    
-    return df1.loc[:, new_cols_order]
-
-#General Data Processing
-def process_data(df):
-    df = df.dropna()
-
-    df = rename_cols(df)
-
-    df['price_type'] = df.loc[:, 'price_range'].apply(lambda x: price_type(x))
-
-    df['country'] = df.loc[:, 'country_code'].apply(lambda x: country_name(x))
-
-    df['color_name'] = df.loc[:, 'rating_color'].apply(lambda x: color_name(x))
-
-    df['cuisines'] = df.loc[:, 'cuisines'].apply(lambda x: x.split(',')[0])
-
-    df = df.drop_duplicates()
-
-    df = adjust_cols_order(df)
-
-    df.to_csv('data/base_restaurantes_tratada.csv', index=False)
-
-    return df
-
-          
-#Data Processing
-df = process_data(df)
+#Load aggregation cubes, by primary cuisine and by every listed cuisine (cached and shared across sessions)
+with section('carregar dados'):
+    cube = load_cube()
+    cuisine_cube = load_cuisine_cube()
 
 
 #Streamlit page config
@@ -159,7 +38,7 @@ st.sidebar.markdown('''---''')
 #Insert multiselector for filtering
 paises = st.sidebar.multiselect(
     'Selecione os países que deseja visualizar:',
-    df.loc[:, 'country'].unique().tolist(),
+    load_countries(),
     default = ['Philippines', 'Brazil', 'Australia', 'United States of America',
        'Canada', 'Singapure', 'United Arab Emirates', 'India',
        'Indonesia', 'New Zeland', 'England', 'Qatar', 'South Africa',
@@ -167,11 +46,23 @@ paises = st.sidebar.multiselect(
 
 st.sidebar.markdown('''---''')
 
+#Cuisine types counted in the charts: every cuisine the restaurants list, or only the primary one
+culinarias = st.sidebar.radio('Tipos de Culinária considerados:', list(CUISINE_MODES), format_func=CUISINE_MODES.get)
+
+st.sidebar.markdown('''---''')
+
 st.sidebar.markdown('### Powered by Caio Michelan')
 
-#Data filter on countries
-paises_sel = df.loc[:, 'country'].isin(paises)
-df = df.loc[paises_sel, :]
+#Data filter on countries (precomputed row positions, no copy when every country is selected)
+with section('filtro'):
+    cube = filter_cube(cube, paises, load_cube_index())
+    cuisine_cube = filter_cube(cuisine_cube, paises, load_cuisine_cube_index())
+
+#Charts of the page (specs in utils.views, aggregated by utils.charts)
+CHARTS = cuisine_specs(CUISINE_CHARTS, culinarias)
+
+#Charts of the selection (figures served from the figure cache, frames computed only on a miss)
+charts = PageCharts('Culinária', CHARTS, paises, {'cube': cube, 'cuisine_cube': cuisine_cube})
 
 
 # =======================================
@@ -179,87 +70,36 @@ df = df.loc[paises_sel, :]
 # =======================================
 
 #Top 10 culinary types by restaurant numbers bar graph 
-with st.container():
-    
-    st.markdown('### Top 10 Tipos de Culinárias por Quantidade de Restaurantes:')
+with st.container(), section('top 10 culinárias'):
     
-    df_aux = (df.loc[:, ['restaurant_id', 'cuisines']]
-              .groupby('cuisines')
-              .nunique()
-              .sort_values('restaurant_id', ascending=False)
-              .reset_index()
-              .head(10))
+    st.markdown(f"### {CHARTS['top_culinarias']['title']}:")
     
-    fig = px.bar(df_aux,
-            x='cuisines',
-            y='restaurant_id',
-            text='restaurant_id',
-            text_auto='.0f',
-            #title='Top 10 Tipos de Culinária no Geral',
-            color='cuisines',
-            labels={'cuisines':'Tipos de Culinária',
-                   'restaurant_id':'QTD Restaurantes'})
-    
-    st.plotly_chart(fig, use_container_width=True)
+    charts.show('top_culinarias')
 
 
-with st.container():
+with st.container(), section('melhores e piores avaliações'):
     
     col1, col2 = st.columns(2)
     
     #Top 10 culinary types with best ratings pie graph 
     with col1:
-        st.markdown('### Top 10 Tipos Culinários Melhores Avaliados (Acima de 4.6):')
-        
-        cond = df['aggregate_rating']>4.6
-        df_aux = (df.loc[cond, ['restaurant_id', 'cuisines']]
-                  .groupby('cuisines')
-                  .nunique()
-                  .sort_values('restaurant_id', ascending=False)
-                  .reset_index()
-                  .head(10))
-
-        fig = px.pie(df_aux,
-            values='restaurant_id',
-            names='cuisines',
-            #title='Top 10 Tipos de Culinária Melhores avaliados (Acima de 4.6)',
-            labels={'restaurant_id':'QTD Restaurantes',
-                   'cuisines':'Tipo de Culinária'})
+        st.markdown(f"### {CHARTS['melhores_culinarias']['title']}:")
         
-        st.plotly_chart(fig, use_container_width=True)
+        charts.show('melhores_culinarias')
     
     #Top 10 culinary types with worst ratings pie graph
     with col2:
-        st.markdown('### Top 10 Tipos Culinários Piores Avaliados (Abaixo de 2.0):')
-        
-        cond = df['aggregate_rating']<2.0
-        df_aux = (df.loc[cond, ['restaurant_id', 'cuisines']]
-                  .groupby('cuisines')
-                  .nunique()
-                  .sort_values('restaurant_id', ascending=False)
-                  .reset_index()
-                  .head(10))
-
-        fig = px.pie(df_aux,
-            values='restaurant_id',
-            names='cuisines',
-            #title='Top 10 Tipos de Culinária Piores avaliados (Abaixo de 2.0)',
-            labels={'restaurant_id':'QTD Restaurantes',
-                   'cuisines':'Tipo de Culinária'})
+        st.markdown(f"### {CHARTS['piores_culinarias']['title']}:")
         
-        st.plotly_chart(fig, use_container_width=True)   
+        charts.show('piores_culinarias')
 
 #Overall culinary types dataframe
-with st.container():
+with st.container(), section('culinárias por país'):
     
-    st.markdown('### Relatório Geral de Tipos Culinário por País:')
+    st.markdown(f"### {CHARTS['culinarias_pais']['title']}:")
     
-    df_aux = (df.loc[:, ['restaurant_id', 'country', 'cuisines']]
-              .groupby(['country', 'cuisines'])
-              .nunique()
-              .sort_values('restaurant_id', ascending=False)
-              .reset_index())
-    df_aux.rename(columns={'restaurant_id':'QTD Restaurantes', 'country':'País', 'cuisines':'Tipo de Culinária'}, inplace=True)
-    
-    st.dataframe(df_aux, width=800, height=600)
+    charts.show('culinarias_pais')
+
 
+#Section timings of this rerun (profiling mode only)
+profile_report()
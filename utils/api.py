@@ -0,0 +1,223 @@
+#Import Libraries
+import argparse
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import inflection
+import tornado.web
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from utils.cuisines import CUISINE_MODES
+from utils.data import dataset_version
+from utils.sketch import HLL_ERROR
+from utils.quantiles import QUANTILE_ACCURACY
+from utils.views import APPROXIMATE_METRICS, VIEWS, compute_views, load_view_data, quantile_specs
+
+
+#JSON API of the dashboard aggregations, served with tornado (installed with Streamlit)
+#GET /api/<view>[/<chart>]?paises=Brazil,India   (views: geral, paises, cidades, culinaria; no paises = every country)
+#                          &culinarias=principal  (cuisine figures from the primary cuisine only, see utils.cuisines)
+#GET /api/status                                  (dataset version, countries and cache counters)
+API_PORT = int(os.environ.get('API_PORT', 8600))
+
+#Responses kept in memory (API_CACHE_ENTRIES overrides the count), dropped when the dataset version changes
+API_CACHE_ENTRIES = int(os.environ.get('API_CACHE_ENTRIES', 512))
+
+#Seconds between checks of the raw files for a new dataset version
+RELOAD_SECONDS = 30
+
+#URL name of each view
+VIEW_PATHS = {inflection.parameterize(view): view for view in ('Geral',) + tuple(VIEWS)}
+
+# =======================================
+# Functions
+# =======================================
+
+#One dataset in memory shared by every request, and the JSON responses already built for it
+#The cache and the pending computations are only touched from the event loop (no lock); the pandas work runs
+#on a single worker thread, so the loop keeps answering cached requests and 304s meanwhile
+class Aggregates:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.current = None
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+
+    #(version, data) of a new dataset version, read on the worker thread (None when the version hasn't changed)
+    def load(self):
+        version = dataset_version()
+        if self.current is None or self.current[0] != version:
+            return version, load_view_data()
+
+        return None
+
+    #The swap and the cache clear happen back on the event loop, like every other cache access
+    #(version, data) is swapped as a whole: a computation in flight keeps the dataset it started with
+    async def reload(self):
+        current = await IOLoop.current().run_in_executor(self.executor, self.load)
+        if current is not None:
+            self.current = current
+            self.cache.clear()
+
+    @property
+    def version(self):
+        return self.current[0]
+
+    @property
+    def countries(self):
+        return self.current[1]['countries']
+
+    #Response key: the selection is order-free, so it is kept sorted
+    def key(self, view, chart, countries, cuisine_mode):
+        return (self.version, view, chart, tuple(sorted(set(countries))), cuisine_mode)
+
+    #The response only depends on its key, so the ETag is known before building (or finding) the body
+    def etag(self, key):
+        return '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:24] + '"'
+
+    async def response(self, key):
+        body = self.cache.get(key)
+        if body is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return body
+
+        #Concurrent requests for the same response wait for one computation
+        future = self.pending.get(key)
+        if future is None:
+            self.misses += 1
+            future = IOLoop.current().run_in_executor(self.executor, render, self.current, key)
+            future.add_done_callback(lambda f: self.store(key, f))
+            self.pending[key] = future
+        else:
+            self.coalesced += 1
+
+        return await future
+
+    def store(self, key, future):
+        self.pending.pop(key, None)
+        if future.cancelled() or future.exception() is not None or key[0] != self.version:
+            return
+
+        self.cache[key] = future.result()
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def stats(self):
+        return {
+            'dataset_version': self.version,
+            'countries': self.countries,
+            'entries': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'not_modified': self.not_modified,
+        }
+
+#JSON body of a response (runs on the worker thread)
+def render(current, key):
+    version, data = current
+    _, view, chart, countries, cuisine_mode = key
+
+    result = compute_views(data, countries, [view], cuisine_mode)[view]
+    response = {'view': view, 'dataset_version': version, 'countries': list(countries), 'cuisine_mode': cuisine_mode}
+
+    if view == 'Geral':
+        response['metrics'] = {name: int(value) for name, value in result.items()}
+        #Metrics estimated from sketches (APPROX_DISTINCT=1), with their relative standard error
+        response['approximate'] = {name: HLL_ERROR for name in APPROXIMATE_METRICS}
+    else:
+        names = [chart] if chart else list(VIEWS[view])
+        response['charts'] = {name: {'title': VIEWS[view][name]['title'],
+                                     'data': json.loads(result[name].to_json(orient='records'))}
+                              for name in names}
+        #Charts read from the price sketch (APPROX_QUANTILES=1), with their relative accuracy
+        specs = quantile_specs(VIEWS[view])
+        response['approximate'] = {name: QUANTILE_ACCURACY for name in names if specs[name]['source'] == 'price_sketch'}
+
+    return json.dumps(response, ensure_ascii=False).encode('utf-8')
+
+class JSONHandler(tornado.web.RequestHandler):
+    def initialize(self, aggregates):
+        self.aggregates = aggregates
+
+    def set_default_headers(self):
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+
+    def write_error(self, status_code, **kwargs):
+        reason = kwargs['exc_info'][1].log_message if 'exc_info' in kwargs else None
+        self.finish(json.dumps({'erro': reason or self._reason}, ensure_ascii=False))
+
+class StatusHandler(JSONHandler):
+    def get(self):
+        self.write(json.dumps(self.aggregates.stats(), ensure_ascii=False))
+
+class ViewHandler(JSONHandler):
+    async def get(self, path, chart=None):
+        view = VIEW_PATHS.get(path)
+        if view is None:
+            raise tornado.web.HTTPError(404, f'Visão desconhecida: {path}')
+        if chart and (view == 'Geral' or chart not in VIEWS[view]):
+            raise tornado.web.HTTPError(404, f'Gráfico desconhecido: {chart}')
+
+        #?paises=A,B or ?paises=A&paises=B
+        countries = self.aggregates.countries
+        if self.get_arguments('paises'):
+            countries = [c.strip() for arg in self.get_arguments('paises') for c in arg.split(',') if c.strip()]
+            unknown = sorted(set(countries) - set(self.aggregates.countries))
+            if unknown:
+                raise tornado.web.HTTPError(400, f"Países desconhecidos: {', '.join(unknown)}")
+
+        cuisine_mode = self.get_argument('culinarias', 'todas')
+        if cuisine_mode not in CUISINE_MODES:
+            raise tornado.web.HTTPError(400, f"culinarias deve ser {' ou '.join(CUISINE_MODES)}")
+
+        key = self.aggregates.key(view, chart, countries, cuisine_mode)
+        self._etag = self.aggregates.etag(key)
+
+        #Clients revalidate every time (no-cache); a matching If-None-Match gets a 304 without touching the data
+        self.set_header('Cache-Control', 'no-cache')
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.aggregates.not_modified += 1
+            self.set_status(304)
+            return
+
+        self.write(await self.aggregates.response(key))
+
+    def compute_etag(self):
+        return getattr(self, '_etag', None)
+
+def make_app(aggregates):
+    return tornado.web.Application([
+        (r'/api/status', StatusHandler, {'aggregates': aggregates}),
+        (r'/api/([^/]+)(?:/([^/]+))?', ViewHandler, {'aggregates': aggregates}),
+    ])
+
+async def serve(port=API_PORT, cache_entries=API_CACHE_ENTRIES):
+    aggregates = Aggregates(cache_entries)
+    await aggregates.reload()
+
+    make_app(aggregates).listen(port)
+    PeriodicCallback(aggregates.reload, RELOAD_SECONDS * 1000).start()
+    print(f'API em http://localhost:{port}/api (base {aggregates.version})', flush=True)
+
+
+#Local server: python -m utils.api [--port 8600] [--cache-entries 512]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--cache-entries', type=int, default=API_CACHE_ENTRIES)
+    args = parser.parse_args()
+
+    loop = IOLoop.current()
+    loop.run_sync(lambda: serve(args.port, args.cache_entries))
+    loop.start()
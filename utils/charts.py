@@ -0,0 +1,230 @@
+#Import Libraries
+import os
+
+import pandas as pd
+import streamlit as st
+
+from utils.data import dataset_version
+from utils.figures import show_figure
+from utils.quantiles import quantile_of, sketch_quantiles
+
+
+#Chart spec (one dict per chart of a page):
+#    'source':      'cube' (aggregation cube), 'cuisine_cube' (cube over every listed cuisine, utils.cuisines),
+#                   'price_sketch' (price quantile sketch, utils.quantiles) or 'rows' (processed dataset)
+#    'dimension':   column or list of columns to group by
+#    'measure':     column aggregated
+#    'aggregation': on the cube: 'count' (restaurants), 'sum', 'mean' (per restaurant) or 'nunique';
+#                   on the rows: any pandas aggregation ('median', 'mean', 'nunique', ...);
+#                   on the price sketch: 'median' or a percentile 'pNN' (e.g. 'p95') of the price
+#    'filter':      (column, '==' or '!=', value), optional
+#    'column':      name of the aggregated column in the chart frame (default: measure)
+#    'top':         keep only the N largest, optional (frames are always sorted by the column, descending)
+#    'chart':       'bar', 'pie' or 'table'
+#    'labels':      axis labels (bar, pie) or column names (table)
+
+#Engine of the chart aggregations: 'pandas' (in-memory frames), 'sqlite' or 'duckdb' (utils.sql)
+QUERY_ENGINE = os.environ.get('QUERY_ENGINE', 'pandas').strip().lower()
+
+#Sources with the cube layout (one row per cell, 'restaurants' and summed measures)
+CUBE_SOURCES = ('cube', 'cuisine_cube')
+
+#Aggregations that roll up by sum on the cube: specs filtered on a cube column share the unfiltered pass,
+#with the filter column added to the group keys and summed away afterwards
+ADDITIVE = ('count', 'sum', 'mean')
+
+# =======================================
+# Functions
+# =======================================
+
+def dimensions(spec):
+    dims = spec['dimension']
+
+    return [dims] if isinstance(dims, str) else list(dims)
+
+def output_column(spec):
+    return spec.get('column', spec['measure'])
+
+def apply_filter(df, spec_filter):
+    if spec_filter is None:
+        return df
+
+    col, op, value = spec_filter
+    mask = df[col] == value if op == '==' else df[col] != value
+
+    return df.loc[mask, :]
+
+#Merge the specs of a page into passes: one groupby per source/dimension/filter
+#Additive cube specs of the same dimension share one pass whatever their '==' filters (split columns);
+#an unfiltered 'nunique' joins it when there are no split columns, so e.g. every country chart is one scan
+#Returns a list of passes: {'source', 'dims', 'filter', 'additive', 'split', 'specs'}
+def plan(specs):
+    passes = []
+
+    def find(source, dims, spec_filter, additive):
+        for p in passes:
+            if (p['source'], p['dims'], p['filter'], p['additive']) == (source, dims, spec_filter, additive):
+                return p
+
+        p = {'source': source, 'dims': dims, 'filter': spec_filter, 'additive': additive, 'split': [], 'specs': []}
+        passes.append(p)
+        return p
+
+    for name, spec in specs.items():
+        dims = dimensions(spec)
+        spec_filter = spec.get('filter')
+
+        if spec['source'] in CUBE_SOURCES and spec['aggregation'] in ADDITIVE and (spec_filter is None or spec_filter[1] == '=='):
+            p = find(spec['source'], dims, None, True)
+            if spec_filter is not None and spec_filter[0] not in p['split']:
+                p['split'].append(spec_filter[0])
+        else:
+            p = find(spec['source'], dims, spec_filter, False)
+
+        p['specs'].append(name)
+
+    #Unfiltered non-additive specs move into the additive pass of the same dimension when it has no split columns
+    for p in [p for p in passes if not p['additive'] and p['source'] in CUBE_SOURCES and p['filter'] is None]:
+        target = next((q for q in passes if q['additive'] and (q['source'], q['dims']) == (p['source'], p['dims']) and not q['split']), None)
+        if target is not None:
+            target['specs'] += p['specs']
+            passes.remove(p)
+
+    return passes
+
+#Named aggregations of a pass
+def pass_aggregations(p, specs):
+    aggs = {}
+
+    for name in p['specs']:
+        spec = specs[name]
+        measure, how = spec['measure'], spec['aggregation']
+
+        if p['source'] == 'rows':
+            aggs[f'{measure}_{how}'] = (measure, how)
+        elif how == 'count':
+            aggs['restaurants'] = ('restaurants', 'sum')
+        elif how in ('sum', 'mean'):
+            aggs[measure] = (measure, 'sum')
+            if how == 'mean':
+                aggs['restaurants'] = ('restaurants', 'sum')
+        else:
+            aggs[f'{measure}_{how}'] = (measure, how)
+
+    return aggs
+
+#Aggregated series of one spec from the result of its pass
+def spec_series(spec, p, result):
+    dims = p['dims']
+    spec_filter = spec.get('filter')
+    measure, how = spec['measure'], spec['aggregation']
+
+    if p['split']:
+        if p['additive'] and spec_filter is not None:
+            col, op, value = spec_filter
+            result = result.loc[result.index.get_level_values(col) == value, :].droplevel(col)
+        if result.index.nlevels > len(dims):
+            result = result.groupby(level=dims, observed=True).sum()
+
+    if p['source'] in CUBE_SOURCES and how == 'count':
+        return result['restaurants']
+    if p['source'] in CUBE_SOURCES and how == 'sum':
+        return result[measure]
+    if p['source'] in CUBE_SOURCES and how == 'mean':
+        return result[measure] / result['restaurants']
+
+    return result[f'{measure}_{how}']
+
+#Chart frame of one spec from the result of its pass: sorted by the column (descending), top N
+def chart_frame(spec, p, result):
+    column = output_column(spec)
+
+    frame = (spec_series(spec, p, result)
+             .rename(column)
+             .to_frame()
+             .sort_values(column, ascending=False)
+             .reset_index())
+    if spec.get('top'):
+        frame = frame.head(spec['top'])
+
+    return frame
+
+#Result of one pass over its (filtered) source, indexed by the pass keys
+def aggregate_pass(p, specs, df):
+    df = apply_filter(df, p['filter'])
+
+    if p['source'] == 'price_sketch':
+        quantiles = {name: quantile_of(how) for name, (col, how) in pass_aggregations(p, specs).items()}
+        result = sketch_quantiles(df, p['dims'], list(quantiles.values()))
+        return pd.DataFrame({name: result[q] for name, q in quantiles.items()}, index=result.index)
+
+    return df.groupby(p['dims'] + p['split'], observed=True).agg(**pass_aggregations(p, specs))
+
+#Chart frames of every spec, from the minimum number of passes over the sources
+#({'cube': ..., 'cuisine_cube': ..., 'price_sketch': ..., 'rows': ...})
+def compute_charts(specs, sources):
+    frames = {}
+
+    for p in plan(specs):
+        result = aggregate_pass(p, specs, sources[p['source']])
+
+        for name in p['specs']:
+            frames[name] = chart_frame(specs[name], p, result)
+
+    return frames
+
+#Chart frames with the configured engine: pandas over the filtered sources,
+#or SQL with the country selection pushed down into the queries (sources only give the column dtypes)
+def chart_frames(specs, countries, sources):
+    if QUERY_ENGINE == 'pandas':
+        return compute_charts(specs, sources)
+
+    #Imported here: utils.sql builds on this module
+    from utils.sql import query_charts
+    return query_charts(specs, countries, sources, QUERY_ENGINE)
+
+#Plotly figure of a bar or pie spec
+#plotly.express is imported here, on the first figure cache miss: a warm page never needs it
+def chart_figure(spec, frame):
+    import plotly.express as px
+
+    dim = dimensions(spec)[0]
+    column = output_column(spec)
+
+    if spec['chart'] == 'pie':
+        return px.pie(frame, values=column, names=dim, labels=spec.get('labels'))
+
+    return px.bar(frame, x=dim, y=column, text=column, text_auto='.0f', color=dim, labels=spec.get('labels'))
+
+#Draw a chart frame on the page
+def show_chart(spec, frame):
+    if spec['chart'] == 'table':
+        st.dataframe(frame.rename(columns=spec.get('labels', {})), width=800, height=600)
+    else:
+        st.plotly_chart(chart_figure(spec, frame), use_container_width=True)
+
+#Charts of a page for the current country selection
+#Frames are only computed when something needs them, so a rerun whose figures are all in the figure cache
+#(utils.figures, keyed by page, selection, dataset version and chart) runs no aggregation at all
+class PageCharts:
+    def __init__(self, page, specs, countries, sources):
+        self.specs = specs
+        self.countries = countries
+        self.sources = sources
+        self.key = (page, tuple(sorted(countries)), dataset_version())
+        self.frames = None
+
+    def frame(self, name):
+        if self.frames is None:
+            self.frames = chart_frames(self.specs, self.countries, self.sources)
+
+        return self.frames[name]
+
+    def show(self, name):
+        spec = self.specs[name]
+
+        if spec['chart'] == 'table':
+            show_chart(spec, self.frame(name))
+        else:
+            #The spec is part of the key, so editing a chart never serves its old figure
+            show_figure(self.key + (name, repr(spec)), lambda: chart_figure(spec, self.frame(name)))
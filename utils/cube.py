@@ -0,0 +1,74 @@
+#Import Libraries
+import numpy as np
+import pandas as pd
+
+from utils.selection import select_rows
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Pre-aggregated cube: one row per country x city x cuisine x price type x rating band
+#Restaurant counts roll up by sum because restaurant_id is unique after processing
+CUBE_DIMENSIONS = ['country', 'city', 'cuisines', 'price_type', 'rating_band']
+
+#Rating bands, matching the thresholds used on the pages (< 2.0 and > 4.6)
+RATING_BANDS = pd.CategoricalDtype(['low', 'mid', 'high'], ordered=True)
+
+def rating_band(rating):
+    band = np.select([rating < 2.0, rating > 4.6], [0, 2], default=1)
+
+    return pd.Series(pd.Categorical.from_codes(band, dtype=RATING_BANDS), index=rating.index)
+
+#Build cube from the processed dataset
+def build_cube(df):
+    df1 = df.loc[:, ['country', 'city', 'cuisines', 'price_type', 'votes', 'average_cost_for_two']].copy()
+    df1['rating_band'] = rating_band(df['aggregate_rating'])
+
+    cube = (df1.groupby(CUBE_DIMENSIONS, observed=True)
+            .agg(restaurants=('votes', 'size'),
+                 votes=('votes', 'sum'),
+                 price_sum=('average_cost_for_two', 'sum'),
+                 price_min=('average_cost_for_two', 'min'),
+                 price_max=('average_cost_for_two', 'max'))
+            .reset_index())
+
+    cube['restaurants'] = cube['restaurants'].astype('int64')
+    cube['votes'] = cube['votes'].astype('int64')
+    cube['price_sum'] = cube['price_sum'].astype('int64')
+
+    return cube
+
+#Cube cells of the selected countries (index: country positions of the cube, see utils.selection)
+def filter_cube(cube, countries, index=None):
+    if index is not None:
+        return select_rows(cube, index, countries)
+
+    return cube.loc[cube['country'].isin(countries), :]
+
+#Roll up the cube to the given dimensions (optionally only one rating band)
+def rollup(cube, dims, band=None):
+    if band is not None:
+        cube = cube.loc[cube['rating_band'] == band, :]
+
+    return (cube.groupby(dims, observed=True)
+            .agg(restaurants=('restaurants', 'sum'),
+                 votes=('votes', 'sum'),
+                 price_sum=('price_sum', 'sum'),
+                 price_min=('price_min', 'min'),
+                 price_max=('price_max', 'max')))
+
+#Restaurants per group (same shape as groupby(dims)['restaurant_id'].nunique())
+def count_restaurants(cube, dims, band=None):
+    return rollup(cube, dims, band).loc[:, ['restaurants']].rename(columns={'restaurants': 'restaurant_id'})
+
+#Distinct values of a dimension per group (e.g. cuisine types per country)
+def count_distinct(cube, dim, of):
+    return cube.loc[:, [dim, of]].groupby(dim, observed=True).nunique()
+
+#Mean of a summed measure per restaurant (e.g. average votes per country)
+def mean_by(cube, dims, measure):
+    df_aux = rollup(cube, dims)
+
+    return (df_aux[measure] / df_aux['restaurants']).to_frame(measure)
@@ -0,0 +1,113 @@
+#Import Libraries
+import numpy as np
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS, RATING_BANDS, rating_band
+
+
+#Restaurants list several cuisines ("Italian, Pizza, Cafe"): 'cuisines' keeps the primary one (the first listed),
+#'all_cuisines' the whole list. Multi-cuisine figures come from a sparse restaurant x cuisine incidence
+#kept as integer codes, so no row of the dataset is ever repeated
+
+#Cuisine modes of the pages: every listed cuisine, or only the primary one
+CUISINE_MODES = {
+    'todas': 'Todas as culinárias listadas',
+    'principal': 'Apenas a culinária principal',
+}
+
+#Columns needed to build the multi-cuisine cube
+CUISINE_CUBE_COLUMNS = ['country', 'city', 'all_cuisines', 'price_type', 'aggregate_rating', 'votes', 'average_cost_for_two']
+
+# =======================================
+# Functions
+# =======================================
+
+#Sparse incidence in CSR form over the distinct cuisine lists (the categories of 'all_cuisines'):
+#list i has the cuisines indices[indptr[i]:indptr[i + 1]] (codes into names, sorted)
+#Only the distinct lists are split (a few thousand strings, whatever the number of rows)
+def build_cuisine_index(all_cuisines):
+    lists = [sorted({c.strip() for c in text.split(',') if c.strip()}) for text in all_cuisines.cat.categories]
+    lengths = np.array([len(names) for names in lists], dtype='int64')
+    flat = np.array([c for names in lists for c in names], dtype=object)
+
+    names = np.unique(flat) if len(flat) else np.array([], dtype=object)
+
+    return {
+        'names': names,
+        'indptr': np.concatenate([[0], np.cumsum(lengths)]),
+        'indices': np.searchsorted(names, flat).astype('int32'),
+        'lists': np.repeat(np.arange(len(lists)), lengths),
+    }
+
+#Incidence entries of some rows (list codes: 'all_cuisines' category codes of the rows)
+#Returns (row position, cuisine code), one entry per listed cuisine of each row
+def row_entries(index, list_codes):
+    list_codes = np.asarray(list_codes)
+    lengths = np.where(list_codes >= 0, np.diff(index['indptr'])[list_codes], 0)
+
+    rows = np.repeat(np.arange(len(list_codes)), lengths)
+    starts = np.repeat(index['indptr'][list_codes] - (np.cumsum(lengths) - lengths), lengths)
+
+    return rows, index['indices'][starts + np.arange(len(rows))]
+
+#Distinct cuisines of some rows (every listed cuisine, not only the primary one)
+def count_cuisines(index, list_codes):
+    present = np.zeros(len(index['indptr']) - 1, dtype=bool)
+    present[list_codes[list_codes >= 0]] = True
+
+    return int(np.count_nonzero(np.bincount(index['indices'][present[index['lists']]], minlength=len(index['names']))))
+
+#Cube over every listed cuisine: same cells, measures and row order as utils.cube.build_cube, with each restaurant
+#counted once in every cuisine it lists ('restaurants' of a cuisine = restaurants offering it)
+#Each incidence entry gets one integer key (the category codes of its cell, cuisine code included, in CUBE_DIMENSIONS
+#order), so the whole cube is a single groupby over integers, and sorted keys are already the build_cube order
+def build_cuisine_cube(df, index):
+    rows, cuisine = row_entries(index, df['all_cuisines'].cat.codes.to_numpy())
+
+    dtypes = {
+        'country': df['country'].dtype,
+        'city': df['city'].dtype,
+        'cuisines': pd.CategoricalDtype(index['names']),
+        'price_type': df['price_type'].dtype,
+        'rating_band': RATING_BANDS,
+    }
+    codes = {
+        'country': df['country'].cat.codes.to_numpy()[rows],
+        'city': df['city'].cat.codes.to_numpy()[rows],
+        'cuisines': cuisine,
+        'price_type': df['price_type'].cat.codes.to_numpy()[rows],
+        'rating_band': rating_band(df['aggregate_rating']).cat.codes.to_numpy()[rows],
+    }
+
+    key = np.zeros(len(rows), dtype='int64')
+    valid = np.ones(len(rows), dtype=bool)
+    for col in CUBE_DIMENSIONS:
+        key = key * len(dtypes[col].categories) + codes[col]
+        #Missing dimension values are left out, as in the groupby of build_cube
+        valid &= codes[col] >= 0
+
+    price = df['average_cost_for_two'].to_numpy()[rows]
+    entries = pd.DataFrame({'votes': df['votes'].to_numpy()[rows].astype('int64'),
+                            'price': price, 'price64': price.astype('int64')})
+
+    cells = (entries.loc[valid, :].groupby(key[valid], sort=True)
+             .agg(restaurants=('votes', 'size'),
+                  votes=('votes', 'sum'),
+                  price_sum=('price64', 'sum'),
+                  price_min=('price', 'min'),
+                  price_max=('price', 'max')))
+
+    #Cell codes back from the keys
+    keys = cells.index.to_numpy()
+    cube = {}
+    for col in reversed(CUBE_DIMENSIONS):
+        size = len(dtypes[col].categories)
+        cube[col] = pd.Categorical.from_codes(keys % size, dtype=dtypes[col])
+        keys = keys // size
+
+    cube = pd.DataFrame({col: cube[col] for col in CUBE_DIMENSIONS})
+    for col in cells.columns:
+        cube[col] = cells[col].to_numpy()
+    cube['restaurants'] = cube['restaurants'].astype('int64')
+
+    return cube
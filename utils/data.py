@@ -0,0 +1,373 @@
+#Import Libraries
+import glob
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import inflection
+
+from utils.cube import build_cube
+from utils.cuisines import CUISINE_CUBE_COLUMNS, build_cuisine_cube, build_cuisine_index
+from utils.quantiles import build_price_sketch
+from utils.profiling import section
+from utils.schema import apply_schema, legacy_frame
+from utils.selection import build_country_index
+from utils.sketch import build_sketch_table, table_sketches
+from utils.snapshot import CUBE_PATH, DATA_DIR, DISTINCT_SKETCH_PATH, PRICE_SKETCH_PATH, read_manifest, snapshot_is_current, write_snapshot, read_snapshot, write_table, read_table
+
+
+#Data files
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#Raw data: one CSV, or a directory with one CSV per country in the same layout (RAW_PATH env var overrides it)
+RAW_PATH = os.environ.get('RAW_PATH', os.path.join(BASE_DIR, 'data', 'base_restaurantes.csv'))
+PROCESSED_PATH = os.path.join(DATA_DIR, 'base_restaurantes_tratada.csv')
+
+#Bump whenever process_data output changes, so existing snapshots get rebuilt
+PIPELINE_VERSION = 5
+
+#Raw files larger than this (MB) are processed out-of-core, in chunks (utils.stream)
+STREAM_THRESHOLD_MB = int(os.environ.get('STREAM_INGEST_MB', 512))
+
+#PREBUILT_SNAPSHOT=1: the snapshot was built ahead (python -m utils.data, e.g. in the image build) and is trusted
+#as it is, so new workers skip hashing the raw files (which may not even be shipped)
+PREBUILT_SNAPSHOT = os.environ.get('PREBUILT_SNAPSHOT', '0') == '1'
+
+# =======================================
+# Functions
+# =======================================
+
+#Data processing
+#Adjusting variables
+COUNTRIES = {
+    1: "India",
+    14: "Australia",
+    30: "Brazil",
+    37: "Canada",
+    94: "Indonesia",
+    148: "New Zeland",
+    162: "Philippines",
+    166: "Qatar",
+    184: "Singapure",
+    189: "South Africa",
+    191: "Sri Lanka",
+    208: "Turkey",
+    214: "United Arab Emirates",
+    215: "England",
+    216: "United States of America",
+}
+
+
+COLORS = {
+    "3F7E00": "darkgreen",
+    "5BA829": "green",
+    "9ACD32": "lightgreen",
+    "CDD614": "orange",
+    "FFBA00": "red",
+    "CBCBC8": "darkred",
+    "FF7800": "darkred",
+}
+
+#Rename columns
+def rename_cols(df):
+    df1 = df.copy()
+    
+    title = lambda x: inflection.titleize(x)
+    spaces = lambda x: x.replace(' ', '') 
+    snakecase = lambda x: inflection.underscore(x)
+    
+    cols_old = list(df1.columns)
+    cols_old = list(map(title, cols_old))
+    cols_old = list(map(spaces, cols_old))
+    
+    cols_new = list(map(snakecase, cols_old))
+    
+    df1.columns = cols_new
+    
+    return df1
+
+#Map a column through a function/dict applied only to its distinct values (vectorized take)
+def map_uniques(series, func):
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(x) for x in uniques], dtype=object)
+
+    return pd.Series(mapped[codes], index=series.index)
+
+#Adjust price type
+PRICE_TYPES = np.array(['Gourmet', 'Cheap', 'Normal', 'Expensive'], dtype=object)
+
+def price_type(price_range):
+    values = price_range.to_numpy()
+    idx = np.select([values == 1, values == 2, values == 3], [1, 2, 3], default=0)
+
+    return pd.Series(PRICE_TYPES[idx], index=price_range.index)
+    
+#Adjust country names
+def country_name(country_id):
+    return map_uniques(country_id, COUNTRIES.__getitem__)
+
+#Adjust color names
+def color_name(color_code):
+    return map_uniques(color_code, COLORS.__getitem__)
+
+#Keep only the primary cuisine
+def primary_cuisine(cuisines):
+    return map_uniques(cuisines, lambda x: x.split(',')[0])
+
+#Adjust columns order
+def adjust_cols_order(df):
+    df1 = df.copy()
+
+    new_cols_order = [
+        'restaurant_id',
+        'restaurant_name',
+        'country',
+        'city',
+        'address',
+        'locality',
+        'locality_verbose',
+        'longitude',
+        'latitude',
+        'cuisines',
+        'all_cuisines',
+        'price_type',
+        'average_cost_for_two',
+        'currency',
+        'has_table_booking',
+        'has_online_delivery',
+        'is_delivering_now',
+        'aggregate_rating',
+        'rating_color',
+        'color_name',
+        'rating_text',
+        'votes',
+    ]
+    
+    return df1.loc[:, new_cols_order]
+
+#General Data Processing
+def process_data(df):
+    df = df.dropna()
+
+    df = rename_cols(df)
+
+    df['price_type'] = price_type(df.loc[:, 'price_range'])
+
+    df['country'] = country_name(df.loc[:, 'country_code'])
+
+    df['color_name'] = color_name(df.loc[:, 'rating_color'])
+
+    all_cuisines = df.loc[:, 'cuisines']
+
+    df['cuisines'] = primary_cuisine(df.loc[:, 'cuisines'])
+
+    #Duplicates on the original columns: rows differing only in their secondary cuisines are one restaurant
+    df = df.drop_duplicates()
+
+    df['all_cuisines'] = all_cuisines
+
+    df = adjust_cols_order(df)
+
+    return df
+
+#Raw files behind a raw path (the CSVs of a directory, in name order)
+def raw_files(path=RAW_PATH):
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '*.csv')))
+
+    return [path]
+
+#Raw data in a single frame (directory files concatenated in name order)
+def read_raw(path=RAW_PATH):
+    files = raw_files(path)
+    if len(files) == 1:
+        return pd.read_csv(files[0])
+
+    return pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+
+#Content hash of a data file (memoized on mtime/size so reruns don't re-read it)
+#For a directory, the combined hash of its raw files
+_hash_memo = {}
+
+def file_hash(path):
+    if os.path.isdir(path):
+        return files_hash(raw_files(path))
+
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _hash_memo.get(path)
+    if cached is None or cached[0] != key:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        cached = (key, sha.hexdigest())
+        _hash_memo[path] = cached
+
+    return cached[1]
+
+#Combined hash of several raw files (names and contents; a single file keeps its own hash)
+def files_hash(paths):
+    if len(paths) == 1:
+        return file_hash(paths[0])
+
+    sha = hashlib.sha256()
+    for path in paths:
+        sha.update(f'{os.path.basename(path)}:{file_hash(path)}\n'.encode())
+
+    return sha.hexdigest()
+
+#Rebuild the typed processed snapshot, the aggregation cube and the price/distinct sketches from the raw CSV (and refresh the legacy CSV export)
+#Returns the new manifest
+def build_snapshot(path=RAW_PATH, source_hash=None):
+    if source_hash is None:
+        source_hash = file_hash(path)
+
+    if os.path.isdir(path):
+        #Imported here: utils.parallel builds on this module
+        from utils.parallel import build_snapshot_parallel
+        return build_snapshot_parallel(raw_files(path), source_hash)[0]
+
+    if os.path.getsize(path) > STREAM_THRESHOLD_MB * 1024 ** 2:
+        #Imported here: utils.stream builds on this module
+        from utils.stream import build_snapshot_streaming
+        return build_snapshot_streaming(path, source_hash)
+
+    with section('ler CSV'):
+        raw = read_raw(path)
+
+    with section('processar dados'):
+        df = process_data(raw)
+
+    legacy_frame(df).to_csv(PROCESSED_PATH, index=False)
+
+    df = apply_schema(df)
+    write_table(build_cube(df), CUBE_PATH)
+    write_table(build_price_sketch(df), PRICE_SKETCH_PATH)
+    write_table(build_sketch_table(df), DISTINCT_SKETCH_PATH)
+
+    return write_snapshot(df, source_hash, PIPELINE_VERSION)
+
+#Make sure the snapshot matches the raw CSV, processing it only when it doesn't
+_build_lock = threading.RLock()
+
+def ensure_snapshot(path=RAW_PATH):
+    if PREBUILT_SNAPSHOT:
+        manifest = read_manifest()
+        if manifest is not None and snapshot_is_current(manifest['source_hash'], PIPELINE_VERSION):
+            return manifest['source_hash']
+
+    source_hash = file_hash(path)
+
+    with _build_lock:
+        if not snapshot_is_current(source_hash, PIPELINE_VERSION):
+            build_snapshot(path, source_hash)
+
+    return source_hash
+
+#Dataset version: source file hash + pipeline version + number of incremental updates applied to the snapshot
+#Every cache and derived file keyed by dataset uses it (SQL databases, exports...), so new versions are picked up
+#on the next rerun; the pipeline version changes the processed rows without changing the source file
+def dataset_version(path=RAW_PATH):
+    source_hash = ensure_snapshot(path)
+    manifest = read_manifest() or {}
+
+    return f"{source_hash[:16]}-p{PIPELINE_VERSION}-{manifest.get('version', 0)}"
+
+#Processed dataset, loaded once per dataset version/column set and shared by every session/page
+#The returned frame is shared: callers must filter/copy, never modify it in place
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _load_processed(version, columns):
+    with section('ler snapshot'):
+        return read_snapshot(columns)
+
+#Load data (columns: only the columns the page needs, None for all of them)
+def load_data(columns=None, path=RAW_PATH):
+    return _load_processed(dataset_version(path), tuple(columns) if columns else None)
+
+#Aggregation cube, loaded once per dataset version and shared like the dataset
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cube(version):
+    return read_table(CUBE_PATH)
+
+def load_cube(path=RAW_PATH):
+    return _load_cube(dataset_version(path))
+
+#Countries in dataset order (options of the sidebar filter)
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_countries(version):
+    return _load_processed(version, ('country',))['country'].unique().tolist()
+
+def load_countries(path=RAW_PATH):
+    return _load_countries(dataset_version(path))
+
+#Row positions of each country in the dataset (every column subset from load_data has the same rows) and in the cube
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_country_index(version):
+    return build_country_index(_load_processed(version, ('country',))['country'])
+
+def load_country_index(path=RAW_PATH):
+    return _load_country_index(dataset_version(path))
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cube_index(version):
+    return build_country_index(_load_cube(version)['country'])
+
+def load_cube_index(path=RAW_PATH):
+    return _load_cube_index(dataset_version(path))
+
+#Restaurant x cuisine index over every listed cuisine (utils.cuisines), and the cube built from it
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cuisine_index(version):
+    return build_cuisine_index(_load_processed(version, ('all_cuisines',))['all_cuisines'])
+
+def load_cuisine_index(path=RAW_PATH):
+    return _load_cuisine_index(dataset_version(path))
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cuisine_cube(version):
+    return build_cuisine_cube(_load_processed(version, tuple(CUISINE_CUBE_COLUMNS)), _load_cuisine_index(version))
+
+def load_cuisine_cube(path=RAW_PATH):
+    return _load_cuisine_cube(dataset_version(path))
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cuisine_cube_index(version):
+    return build_country_index(_load_cuisine_cube(version)['country'])
+
+def load_cuisine_cube_index(path=RAW_PATH):
+    return _load_cuisine_cube_index(dataset_version(path))
+
+#Price quantile sketch (utils.quantiles), loaded once per dataset version like the cube
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_price_sketch(version):
+    return read_table(PRICE_SKETCH_PATH)
+
+def load_price_sketch(path=RAW_PATH):
+    return _load_price_sketch(dataset_version(path))
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_price_sketch_index(version):
+    return build_country_index(_load_price_sketch(version)['country'])
+
+def load_price_sketch_index(path=RAW_PATH):
+    return _load_price_sketch_index(dataset_version(path))
+
+#Distinct-restaurant sketches of one dimension (utils.sketch: per country, city or cuisine), for the approximate metrics
+#Read from the sketch table built with the snapshot, no pass over the rows
+@st.cache_resource(show_spinner=False, max_entries=3)
+def _load_sketches(version, dimension):
+    return table_sketches(read_table(DISTINCT_SKETCH_PATH), dimension)
+
+def load_sketches(dimension='country', path=RAW_PATH):
+    return _load_sketches(dataset_version(path), dimension)
+
+
+#Build the snapshot from the command line: python -m utils.data
+if __name__ == '__main__':
+    manifest = build_snapshot()
+    print(f"Snapshot atualizado: {manifest['rows']} restaurantes")
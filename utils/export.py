@@ -0,0 +1,104 @@
+#Import Libraries
+import glob
+import gzip
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from utils.schema import export_frame, legacy_frame
+from utils.snapshot import DATA_DIR
+
+
+#Export files (full dataset, one set per dataset version)
+EXPORT_DIR = os.path.join(DATA_DIR, 'exports')
+EXPORT_NAME = 'world_restaurants-database'
+
+#Download formats: label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV compactado (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+#Rows serialized at a time
+EXPORT_CHUNK_ROWS = 50_000
+
+# =======================================
+# Functions
+# =======================================
+
+#Rows of the export in chunks (only the selected countries, if any), never copying the whole frame
+#Derived columns are left out, so the files keep the original layout
+def export_chunks(df, countries=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows) or [0]:
+        chunk = df.iloc[start:start + chunk_rows]
+        if countries:
+            chunk = chunk.loc[chunk['country'].isin(countries), :]
+        yield legacy_frame(chunk)
+
+#Write an export file chunk by chunk (CSV as in the original download: ';' separator, 0/1 flags)
+def write_export(df, path, extension, countries=None):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+
+    if extension == 'parquet':
+        writer = None
+        for chunk in export_chunks(df, countries):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+        writer.close()
+    else:
+        if extension == 'csv.gz':
+            f = gzip.open(tmp_path, 'wt', encoding='utf-8', newline='')
+        else:
+            f = open(tmp_path, 'w', encoding='utf-8', newline='')
+
+        with f:
+            for i, chunk in enumerate(export_chunks(df, countries)):
+                export_frame(chunk).to_csv(f, index=False, sep=';', header=i == 0)
+
+    os.replace(tmp_path, path)
+
+#Full export of a dataset version, written once and kept on disk (exports of older versions are removed)
+def ensure_export(df, extension, dataset_version):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f'{EXPORT_NAME}-{dataset_version}.{extension}')
+
+    if not os.path.exists(path):
+        write_export(df, path, extension)
+
+        for old in glob.glob(os.path.join(EXPORT_DIR, f'{EXPORT_NAME}-*.{extension}')):
+            if old != path:
+                os.remove(old)
+
+    return path
+
+#Export bytes for the download button, built at most once per dataset version/format/selection and shared by every session
+#Filtered exports go through a temp file, so only the final bytes are ever held in memory
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_export(extension, countries, dataset_version, _df):
+    if not countries:
+        with open(ensure_export(_df, extension, dataset_version), 'rb') as f:
+            return f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'{EXPORT_NAME}.{extension}')
+        write_export(_df, path, extension, countries)
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+#Precompute the full exports of the current dataset version: python -m utils.export
+if __name__ == '__main__':
+    from utils.data import dataset_version, load_data
+
+    version = dataset_version()
+    df = load_data()
+
+    for label, (extension, mime) in EXPORT_FORMATS.items():
+        path = ensure_export(df, extension, version)
+        print(f'{label:<22} {os.path.getsize(path) / 1024 ** 2:8.2f} MB  {path}')
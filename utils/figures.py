@@ -0,0 +1,81 @@
+#Import Libraries
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+import streamlit as st
+
+
+#Plotly figures kept in memory (FIGURE_CACHE_MB overrides the size, counted in serialized JSON), shared by every session
+FIGURE_CACHE_MB = float(os.environ.get('FIGURE_CACHE_MB', 64))
+
+# =======================================
+# Functions
+# =======================================
+
+#LRU cache of built figures, bounded by the size of their JSON (what goes to the browser)
+#Keys: (page, country selection, dataset version, chart id)
+class FigureCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, figure, size):
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+
+            self.entries[key] = (figure, size)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.bytes -= old_size
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'mb': self.bytes / 1024 ** 2,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+@st.cache_resource(show_spinner=False)
+def figure_cache():
+    return FigureCache(int(FIGURE_CACHE_MB * 1024 ** 2))
+
+#Draw a Plotly figure through the cache: on a hit the figure is not built again (build() is not called),
+#st.plotly_chart only serializes the cached one (no validation: it is already a go.Figure)
+def show_figure(key, build, use_container_width=True):
+    cache = figure_cache()
+
+    figure = cache.get(key)
+    if figure is None:
+        figure = build()
+        cache.put(key, figure, len(pio.to_json(figure, validate=False)))
+
+    return st.plotly_chart(figure, use_container_width=use_container_width)
@@ -0,0 +1,143 @@
+#Import Libraries
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS, RATING_BANDS, build_cube, rating_band
+from utils.data import PIPELINE_VERSION, PROCESSED_PATH, RAW_PATH, process_data, ensure_snapshot, file_hash, _build_lock
+from utils.quantiles import PRICE_SKETCH_KEYS, build_price_sketch
+from utils.schema import apply_schema, export_frame, legacy_frame
+from utils.sketch import SKETCH_DIMENSIONS, build_sketch_table, merge_sketch_tables
+from utils.snapshot import (CUBE_PATH, DISTINCT_SKETCH_PATH, PRICE_SKETCH_PATH, read_manifest, read_snapshot, read_table, write_snapshot,
+                            write_table)
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Give the categorical columns of both frames the same (sorted) categories, so they concat as categoricals
+def align_categories(df, delta):
+    df1 = df.copy()
+    delta1 = delta.copy()
+
+    for col in df1.select_dtypes('category').columns:
+        categories = df1[col].cat.categories.union(delta1[col].astype('category').cat.categories)
+        dtype = pd.CategoricalDtype(categories, ordered=df1[col].cat.ordered)
+        df1[col] = df1[col].astype(dtype)
+        delta1[col] = delta1[col].astype(dtype)
+
+    return df1, delta1
+
+#Upsert processed delta rows into the snapshot by restaurant_id
+#Changed restaurants keep their position, new ones are appended (later rows of the delta win)
+#Returns the new snapshot and the previous version of the changed rows
+def upsert(df, delta):
+    df, delta = align_categories(df, delta.drop_duplicates('restaurant_id', keep='last'))
+
+    changed = df['restaurant_id'].isin(delta['restaurant_id'])
+    is_new = ~delta['restaurant_id'].isin(df['restaurant_id'])
+
+    updated = (delta.set_index('restaurant_id')
+               .loc[df.loc[changed, 'restaurant_id']]
+               .reset_index()
+               .loc[:, df.columns])
+    updated.index = df.index[changed]
+
+    inserted = delta.loc[is_new, df.columns]
+    inserted.index = range(len(df), len(df) + len(inserted))
+
+    df1 = pd.concat([df.loc[~changed, :], updated, inserted]).sort_index().reset_index(drop=True)
+
+    return df1, df.loc[changed, :]
+
+#Integer key of the cube cell of each row (dimensions must share the same categorical dtypes)
+def cell_keys(frame, bands):
+    key = np.zeros(len(frame), dtype='int64')
+
+    for col in CUBE_DIMENSIONS[:-1]:
+        key = key * len(frame[col].cat.categories) + frame[col].cat.codes.to_numpy()
+
+    return key * len(RATING_BANDS.categories) + bands
+
+#Recompute only the cube cells of the affected groups
+#(build, keys: the price sketch has the same cells, split by price bucket, see utils.quantiles)
+def update_cube(cube, df, affected, build=build_cube, keys=CUBE_DIMENSIONS):
+    cube = cube.copy()
+    for col in CUBE_DIMENSIONS[:-1]:
+        cube[col] = cube[col].astype(df[col].dtype)
+
+    cube_keys = cell_keys(cube, cube['rating_band'].cat.codes.to_numpy())
+    row_keys = cell_keys(df, rating_band(df['aggregate_rating']).cat.codes.to_numpy())
+
+    cells = build(df.loc[np.isin(row_keys, affected), :])
+    cube1 = pd.concat([cube.loc[~np.isin(cube_keys, affected), :], cells], ignore_index=True)
+
+    #Same order as a full rebuild (groupby sorts by category codes)
+    return cube1.sort_values(keys).reset_index(drop=True)
+
+#Rebuild the distinct sketches of the groups the upserted rows belong to (before or after the update)
+#HyperLogLog registers can't forget a value, so a restaurant moved to another city/cuisine can't be taken out of its
+#old group by a merge: each touched group is rebuilt from its rows, the other groups are kept as they are
+def update_sketches(table, df, rows):
+    keep = np.ones(len(table), dtype=bool)
+    parts = []
+
+    for dim in SKETCH_DIMENSIONS:
+        groups = rows[dim].dropna().unique()
+        keep &= ~((table['dimension'] == dim) & table['group'].isin(groups)).to_numpy()
+        parts.append(build_sketch_table(df.loc[df[dim].isin(groups), :], [dim]))
+
+    return merge_sketch_tables([table.loc[keep, :]] + parts)
+
+#Apply a delta CSV (same layout as the raw file) to the processed snapshot, cube and price/distinct sketches
+def apply_delta(delta_path, path=RAW_PATH):
+    delta_hash = file_hash(delta_path)
+
+    with _build_lock:
+        source_hash = ensure_snapshot(path)
+        manifest = read_manifest()
+
+        if any(d['hash'] == delta_hash for d in manifest.get('deltas', [])):
+            return manifest
+
+        delta = apply_schema(process_data(pd.read_csv(delta_path)))
+
+        df, replaced = upsert(read_snapshot(), delta)
+
+        #Cells of the previous and the new version of every upserted restaurant
+        rows = pd.concat([replaced, df.loc[df['restaurant_id'].isin(delta['restaurant_id']), :]])
+        affected = np.unique(cell_keys(rows, rating_band(rows['aggregate_rating']).cat.codes.to_numpy()))
+
+        cube = update_cube(read_table(CUBE_PATH), df, affected)
+        prices = update_cube(read_table(PRICE_SKETCH_PATH), df, affected, build_price_sketch, PRICE_SKETCH_KEYS)
+        distinct = update_sketches(read_table(DISTINCT_SKETCH_PATH), df, rows)
+
+        version = manifest.get('version', 0) + 1
+        deltas = manifest.get('deltas', []) + [{
+            'file': os.path.basename(delta_path),
+            'hash': delta_hash,
+            'rows': int(len(delta)),
+            'updated': int(len(replaced)),
+            'inserted': int(len(delta) - len(replaced)),
+            'applied_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }]
+
+        write_table(cube, CUBE_PATH)
+        write_table(prices, PRICE_SKETCH_PATH)
+        write_table(distinct, DISTINCT_SKETCH_PATH)
+        #Legacy CSV kept in step with the snapshot (plain dtypes, 0/1 flags, as build_snapshot writes it)
+        export_frame(legacy_frame(df)).to_csv(PROCESSED_PATH, index=False)
+        return write_snapshot(df, source_hash, PIPELINE_VERSION, version, deltas)
+
+
+#Incremental ingest from the command line: python -m utils.ingest delta1.csv [delta2.csv ...]
+if __name__ == '__main__':
+    for delta_path in sys.argv[1:]:
+        manifest = apply_delta(delta_path)
+        last = manifest['deltas'][-1]
+        print(f"{delta_path}: versão {manifest['version']} "
+              f"({last['updated']} atualizados, {last['inserted']} novos, {manifest['rows']} restaurantes)")
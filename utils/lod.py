@@ -0,0 +1,121 @@
+#Import Libraries
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Level-of-detail pyramid for the restaurant map
+#Each zoom level groups restaurants on a Web Mercator grid of CELL_PX pixels,
+#so the map only gets cluster centroids/counts for the current zoom and viewport
+CELL_PX = 64
+CELL_BITS = 2  #256px tiles / 64px cells = 2**2 cells per tile side
+CLUSTER_MAX_ZOOM = 14  #above this zoom the map shows individual restaurants
+MAX_RESTAURANTS = 500  #individual restaurants per view, more than that stays clustered
+
+#Normalized Web Mercator coordinates (0 to 1 on both axes)
+def mercator(lat, lon):
+    lat = np.clip(lat, -85.0511, 85.0511)
+    sin = np.sin(np.radians(lat))
+
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+
+    return np.clip(x, 0, np.nextafter(1, 0)), np.clip(y, 0, np.nextafter(1, 0))
+
+#Build the pyramid: finest grid first, each coarser level merges 2x2 cells of the previous one
+def build_pyramid(df):
+    lat = df['latitude'].to_numpy(dtype='float64')
+    lon = df['longitude'].to_numpy(dtype='float64')
+    x, y = mercator(lat, lon)
+
+    cells = 2 ** (CLUSTER_MAX_ZOOM + CELL_BITS)
+    level = pd.DataFrame({
+        'ix': (x * cells).astype('int64'),
+        'iy': (y * cells).astype('int64'),
+        'count': np.ones(len(df), dtype='int64'),
+        'lat_sum': lat,
+        'lon_sum': lon,
+        'row': np.arange(len(df)),
+    })
+
+    levels = {}
+    for zoom in range(CLUSTER_MAX_ZOOM, -1, -1):
+        level = (level.groupby(['ix', 'iy'], sort=False)
+                 .agg(count=('count', 'sum'),
+                      lat_sum=('lat_sum', 'sum'),
+                      lon_sum=('lon_sum', 'sum'),
+                      row=('row', 'min'))
+                 .reset_index())
+
+        levels[zoom] = pd.DataFrame({
+            'lat': level['lat_sum'] / level['count'],
+            'lon': level['lon_sum'] / level['count'],
+            'count': level['count'],
+            'row': level['row'],
+        })
+
+        level = level.assign(ix=level['ix'] // 2, iy=level['iy'] // 2)
+
+    return {'levels': levels, 'restaurants': df.reset_index(drop=True)}
+
+#Viewport bounds as returned by the map component ({'_southWest': {'lat', 'lng'}, '_northEast': {...}})
+#Padded so panning a little doesn't leave empty borders; None when unknown
+def parse_bounds(bounds, padding=0.25):
+    try:
+        south = float(bounds['_southWest']['lat'])
+        west = float(bounds['_southWest']['lng'])
+        north = float(bounds['_northEast']['lat'])
+        east = float(bounds['_northEast']['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    pad_lat = (north - south) * padding
+    pad_lon = (east - west) * padding
+
+    return south - pad_lat, west - pad_lon, north + pad_lat, east + pad_lon
+
+#Mask of the coordinates inside the bounds (longitudes may wrap around the antimeridian)
+def in_bounds(lat, lon, bounds):
+    if bounds is None:
+        return np.ones(len(lat), dtype=bool)
+
+    south, west, north, east = bounds
+    mask = (lat >= south) & (lat <= north)
+
+    if east - west >= 360:
+        return mask
+
+    west = (west + 180) % 360 - 180
+    east = (east + 180) % 360 - 180
+
+    if west <= east:
+        return mask & (lon >= west) & (lon <= east)
+
+    return mask & ((lon >= west) | (lon <= east))
+
+#Clusters and individual restaurants to draw for a zoom level and viewport
+def view(pyramid, zoom, bounds=None):
+    restaurants = pyramid['restaurants']
+    bounds = parse_bounds(bounds)
+    zoom = int(zoom or 0)
+
+    if zoom > CLUSTER_MAX_ZOOM:
+        mask = in_bounds(restaurants['latitude'].to_numpy(), restaurants['longitude'].to_numpy(), bounds)
+        if mask.sum() <= MAX_RESTAURANTS:
+            return pyramid['levels'][CLUSTER_MAX_ZOOM].iloc[:0], restaurants.loc[mask, :]
+
+    cells = pyramid['levels'][min(max(zoom, 0), CLUSTER_MAX_ZOOM)]
+    cells = cells.loc[in_bounds(cells['lat'].to_numpy(), cells['lon'].to_numpy(), bounds), :]
+
+    single = cells['count'] == 1
+
+    return cells.loc[~single, :], restaurants.iloc[cells.loc[single, 'row'].to_numpy(), :]
+
+#Pyramid of a country selection (_df already filtered), cached per selection and dataset version
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_pyramid(countries, dataset_version, _df):
+    return build_pyramid(_df)
@@ -0,0 +1,161 @@
+#Import Libraries
+import json
+
+import pandas as pd
+from branca.element import CssLink, Element, JavascriptLink
+from jinja2 import Template
+from folium.plugins import MarkerCluster
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Codes + lookup list of a text column (popup fields are sent once per distinct value)
+def lookup(series):
+    codes, uniques = pd.factorize(series)
+
+    return codes.tolist(), [str(x) for x in uniques]
+
+#Columnar marker data: coordinates, color and popup fields as compact arrays
+def marker_data(df):
+    colors, color_names = lookup(df['color_name'])
+    cuisines, cuisine_names = lookup(df['cuisines'])
+    currencies, currency_names = lookup(df['currency'])
+
+    return {
+        'lat': df['latitude'].round(6).tolist(),
+        'lon': df['longitude'].round(6).tolist(),
+        'name': df['restaurant_name'].astype(str).tolist(),
+        'price': df['average_cost_for_two'].tolist(),
+        'rating': df['aggregate_rating'].astype('float64').round(1).tolist(),
+        'color': colors,
+        'colors': color_names,
+        'cuisine': cuisines,
+        'cuisines': cuisine_names,
+        'currency': currencies,
+        'currencies': currency_names,
+    }
+
+#Script inserted as-is (large JSON payloads are not compiled as Jinja templates)
+class RawScript(Element):
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def render(self, **kwargs):
+        return self.script
+
+#Layer whose script is added to the figure without going through branca's
+#Element(template) compilation, which is slow for scripts carrying a lot of data
+class DataLayer(MarkerCluster):
+    def render(self, **kwargs):
+        figure = self.get_root()
+
+        for name, url in self.default_js:
+            figure.header.add_child(JavascriptLink(url), name=name)
+
+        for name, url in self.default_css:
+            figure.header.add_child(CssLink(url), name=name)
+
+        figure.script.add_child(RawScript(self._template.module.script(self, kwargs)), name=self.get_name())
+
+#JSON for inline scripts
+def to_json(data):
+    return json.dumps(data, ensure_ascii=False).replace('</', '<\\/')
+
+#Restaurant markers rendered in bulk on the client
+#Markers are built in the browser from the arrays above, one icon per color,
+#popups only when opened, and added to the cluster with chunked loading
+#(cluster=False adds them as plain markers, for points already clustered on the server)
+class RestaurantMarkers(DataLayer):
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var data = {{ this.data }};
+
+                var escape = function (text) {
+                    return String(text).replace(/[&<>"']/g, function (c) {
+                        return '&#' + c.charCodeAt(0) + ';';
+                    });
+                };
+
+                var icons = data.colors.map(function (color) {
+                    return L.AwesomeMarkers.icon({icon: 'home', prefix: 'fa', markerColor: color});
+                });
+
+                var popup = function (i) {
+                    return function () {
+                        return '<p><strong>' + escape(data.name[i]) + '</strong></p>'
+                            + '<p>Preço p/ dois: ' + data.price[i] + ',00 (' + escape(data.currencies[data.currency[i]]) + ')'
+                            + '<br />Tipo: ' + escape(data.cuisines[data.cuisine[i]])
+                            + '<br />Nota: ' + data.rating[i].toFixed(1) + '/5.0';
+                    };
+                };
+
+                var markers = new Array(data.lat.length);
+                for (var i = 0; i < markers.length; i++) {
+                    markers[i] = L.marker([data.lat[i], data.lon[i]], {icon: icons[data.color[i]]})
+                        .bindPopup(popup(i), {maxWidth: 500});
+                }
+
+                {%- if this.cluster %}
+                var layer = L.markerClusterGroup({{ this.options|tojson }});
+                layer.addLayers(markers);
+                {%- else %}
+                var layer = L.featureGroup(markers);
+                {%- endif %}
+                layer.addTo({{ this._parent.get_name() }});
+                return layer;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, df, cluster=True, name=None, **kwargs):
+        kwargs.setdefault('chunkedLoading', True)
+        super().__init__(name=name, **kwargs)
+        self._name = 'RestaurantMarkers'
+        self.cluster = cluster
+        self.data = to_json(marker_data(df))
+
+#Clusters computed on the server (centroid + count), drawn with the markercluster bubble style
+#Clicking a bubble zooms in on it
+class ClusterMarkers(DataLayer):
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var data = {{ this.data }};
+
+                var markers = new Array(data.lat.length);
+                for (var i = 0; i < markers.length; i++) {
+                    var count = data.count[i];
+                    var size = count < 10 ? 'small' : (count < 100 ? 'medium' : 'large');
+                    var icon = L.divIcon({
+                        html: '<div><span>' + count + '</span></div>',
+                        className: 'marker-cluster marker-cluster-' + size,
+                        iconSize: L.point(40, 40),
+                    });
+                    markers[i] = L.marker([data.lat[i], data.lon[i]], {icon: icon})
+                        .on('click', function (e) {
+                            var map = e.target._map;
+                            map.setView(e.latlng, map.getZoom() + 2);
+                        });
+                }
+
+                var layer = L.featureGroup(markers);
+                layer.addTo({{ this._parent.get_name() }});
+                return layer;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, clusters, name=None):
+        super().__init__(name=name)
+        self._name = 'ClusterMarkers'
+        self.data = to_json({
+            'lat': clusters['lat'].round(6).tolist(),
+            'lon': clusters['lon'].round(6).tolist(),
+            'count': clusters['count'].tolist(),
+        })
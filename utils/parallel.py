@@ -0,0 +1,209 @@
+#Import Libraries
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils.cube import build_cube
+from utils.data import PIPELINE_VERSION, PROCESSED_PATH, files_hash, process_data, raw_files
+from utils.quantiles import build_price_sketch, merge_price_sketches
+from utils.schema import apply_schema, legacy_frame
+from utils.sketch import build_dimension_sketches, merge_dimension_sketches, sketches_table
+from utils.snapshot import (CUBE_PATH, DISTINCT_SKETCH_PATH, MANIFEST_PATH, PRICE_SKETCH_PATH, SNAPSHOT_PATH, write_manifest,
+                            write_table)
+from utils.stream import frame_stats, merge_stats, merge_cubes, resolve_schema
+
+
+#Keys of the two 64-bit row hashes (128 bits together, so collisions are negligible at any size)
+HASH_KEYS = ('0123456789123456', 'restaurantes-128')
+
+# =======================================
+# Functions
+# =======================================
+
+#Parallel ingest of several raw files (e.g. one per country, same layout as base_restaurantes.csv)
+#1. workers parse + process whole files, spill them to Parquet and send back row hashes and schema stats
+#2. the parent marks the duplicates across files from the hashes (first occurrence in file order wins)
+#3. workers write their file's share of the legacy CSV and snapshot, plus a partial cube, price sketch and distinct sketches
+#4. the parent concatenates the pieces (plain file/row group copies) and rolls up the cube and the sketches
+#Only steps 2 and 4 are serial, and neither parses nor converts rows
+
+#128-bit hash of each processed row (numbers hashed as float64, so files parsed with int/float columns still match)
+#Derived columns are left out, as in the drop_duplicates of process_data
+def row_hashes(df):
+    df1 = legacy_frame(df)
+    df1 = df1.astype({col: 'float64' for col in df1.select_dtypes('number').columns})
+
+    return np.column_stack([pd.util.hash_pandas_object(df1, index=False, hash_key=key).to_numpy() for key in HASH_KEYS])
+
+#Worker, step 1: parse + process one raw file and spill it to Parquet
+def process_file(task):
+    index, path, tmp_dir = task
+
+    start = time.perf_counter()
+    raw = pd.read_csv(path)
+    parsed = time.perf_counter()
+
+    df = process_data(raw)
+    processed = time.perf_counter()
+
+    output = os.path.join(tmp_dir, f'part_{index:05d}.parquet')
+    df.to_parquet(output, index=False)
+    hashes = row_hashes(df)
+    written = time.perf_counter()
+
+    timings = {'step': 'processar', 'file': os.path.basename(path), 'pid': os.getpid(), 'rows': len(df),
+               'read_s': parsed - start, 'process_s': processed - parsed, 'write_s': written - processed,
+               'total_s': written - start}
+
+    return index, output, hashes, frame_stats(df), timings
+
+#Worker, step 3: write one file's share of the outputs (duplicates across files removed)
+def export_part(task):
+    index, name, part_path, keep, plain, schema = task
+
+    start = time.perf_counter()
+    df = pd.read_parquet(part_path).loc[keep, :].astype(plain)
+    parsed = time.perf_counter()
+
+    csv_path = part_path.replace('.parquet', '.csv')
+    legacy_frame(df).to_csv(csv_path, index=False, header=False)
+
+    df = apply_schema(df, schema)
+    typed_path = part_path.replace('.parquet', '_typed.parquet')
+    df.to_parquet(typed_path, index=False)
+    cube = build_cube(df)
+    prices = build_price_sketch(df)
+    distinct = build_dimension_sketches(df)
+    written = time.perf_counter()
+
+    timings = {'step': 'exportar', 'file': name, 'pid': os.getpid(), 'rows': len(df),
+               'read_s': parsed - start, 'process_s': np.nan, 'write_s': written - parsed,
+               'total_s': written - start}
+
+    return index, csv_path, typed_path, cube, timings, prices, distinct
+
+#Build snapshot, cube, price/distinct sketches and legacy CSV from several raw files, processed on a process pool
+#Returns the manifest and the timings report (one row per worker task, plus the serial steps)
+def build_snapshot_parallel(paths, source_hash=None, workers=None,
+                            snapshot_path=SNAPSHOT_PATH, manifest_path=MANIFEST_PATH, cube_path=CUBE_PATH, processed_path=PROCESSED_PATH,
+                            price_path=PRICE_SKETCH_PATH, distinct_path=DISTINCT_SKETCH_PATH):
+    paths = list(paths)
+
+    if source_hash is None:
+        source_hash = files_hash(paths)
+
+    tmp_dir = tempfile.mkdtemp(prefix='ingest_', dir=os.path.dirname(snapshot_path))
+    snapshot_tmp = f'{snapshot_path}.{os.getpid()}.tmp'
+    processed_tmp = f'{processed_path}.{os.getpid()}.tmp'
+
+    report = []
+    writer = None
+
+    try:
+        #Largest files first, so no worker is left with a big file at the end
+        tasks = sorted([(i, p, tmp_dir) for i, p in enumerate(paths)], key=lambda t: -os.path.getsize(t[1]))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = sorted(pool.map(process_file, tasks), key=lambda r: r[0])
+            report += [r[4] for r in parts]
+
+            start = time.perf_counter()
+            stats = None
+            for part in parts:
+                stats = merge_stats(stats, part[3])
+            plain = stats['dtypes']
+            schema = resolve_schema(stats)
+
+            #Duplicates across files: the first occurrence (file order) wins, as in a single drop_duplicates
+            hashes = np.concatenate([part[2] for part in parts])
+            keep = ~pd.DataFrame(hashes).duplicated().to_numpy()
+            bounds = np.cumsum([0] + [len(part[2]) for part in parts])
+            report.append({'step': 'deduplicar', 'file': '', 'pid': os.getpid(), 'rows': int(keep.sum()),
+                           'total_s': time.perf_counter() - start})
+
+            tasks = [(part[0], part[4]['file'], part[1], keep[bounds[i]:bounds[i + 1]], plain, schema)
+                     for i, part in enumerate(parts)]
+            pieces = sorted(pool.map(export_part, tasks), key=lambda r: r[0])
+            report += [r[4] for r in pieces]
+
+        start = time.perf_counter()
+
+        with open(processed_tmp, 'w', encoding='utf-8', newline='') as out:
+            out.write(legacy_frame(pd.DataFrame(columns=list(plain))).to_csv(index=False))
+            for piece in pieces:
+                with open(piece[1], encoding='utf-8', newline='') as f:
+                    shutil.copyfileobj(f, out)
+
+        dtypes = apply_schema(pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in plain.items()}), schema).dtypes
+
+        #Files left empty by the dedup are skipped (their text columns have no type in Parquet)
+        for piece in pieces:
+            if piece[4]['rows'] == 0:
+                continue
+            table = pq.read_table(piece[2])
+            if writer is None:
+                writer = pq.ParquetWriter(snapshot_tmp, table.schema)
+            writer.write_table(table)
+
+        if writer is None:
+            pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dtypes.items()}).to_parquet(snapshot_tmp, index=False)
+        else:
+            writer.close()
+            writer = None
+
+        cube = merge_cubes([piece[3] for piece in pieces])
+        prices = merge_price_sketches([piece[5] for piece in pieces])
+        distinct = merge_dimension_sketches([piece[6] for piece in pieces])
+
+        os.replace(processed_tmp, processed_path)
+        write_table(cube, cube_path)
+        write_table(prices, price_path)
+        write_table(sketches_table(distinct), distinct_path)
+        os.replace(snapshot_tmp, snapshot_path)
+
+        manifest = write_manifest(int(keep.sum()), dtypes, source_hash, PIPELINE_VERSION, manifest_path=manifest_path)
+
+        report.append({'step': 'juntar', 'file': '', 'pid': os.getpid(), 'rows': manifest['rows'],
+                       'total_s': time.perf_counter() - start})
+    finally:
+        if writer is not None:
+            writer.close()
+        for f in (snapshot_tmp, processed_tmp):
+            if os.path.exists(f):
+                os.remove(f)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return manifest, pd.DataFrame(report)
+
+#Timings per worker process (tasks, rows and busy time), from the report
+def worker_report(report):
+    tasks = report.loc[report['step'].isin(['processar', 'exportar']), :]
+
+    return (tasks.groupby('pid')
+            .agg(tasks=('step', 'size'), rows=('rows', 'sum'), busy_s=('total_s', 'sum'))
+            .reset_index())
+
+
+#Parallel build from the command line: python -m utils.parallel <pasta ou arquivos.csv> [--workers N]
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    workers = None
+    if '--workers' in args:
+        i = args.index('--workers')
+        workers = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+
+    files = [f for arg in args for f in raw_files(arg)]
+    manifest, report = build_snapshot_parallel(files, workers=workers)
+
+    print(report.to_string(index=False, float_format='{:.3f}'.format))
+    print()
+    print(worker_report(report).to_string(index=False, float_format='{:.3f}'.format))
+    print(f"\nSnapshot atualizado (paralelo): {manifest['rows']} restaurantes")
@@ -0,0 +1,206 @@
+#Import Libraries
+import contextlib
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import weakref
+
+import pandas as pd
+import streamlit as st
+
+from utils.figures import figure_cache
+from utils.snapshot import DATA_DIR
+
+
+#Profiling mode: PROFILE=1 (or ?profile=1 on the page URL) times each named section of every rerun
+#and shows the breakdown in the sidebar; PROFILE=cprofile (or ?profile=cprofile) also dumps cProfile stats per rerun
+PROFILE_ENV = os.environ.get('PROFILE', '').strip().lower()
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+
+#Functions listed in the sidebar (by cumulative time) when cProfile is on
+TOP_FUNCTIONS = 15
+
+#Profiled reruns in progress: tracemalloc is process-wide, so it runs while any of them does
+#Its peak is process-wide too (reset_peak resets it for everyone): when profiled reruns overlap, the peaks of each
+#one include the allocations of the others, so the report flags them as approximate
+_runs_lock = threading.Lock()
+_active_runs = 0
+
+#Current rerun of each script thread (None when profiling is off)
+_state = threading.local()
+
+#Returned by section() when profiling is off, so an unprofiled rerun only pays for an attribute lookup
+_NULL = contextlib.nullcontext()
+
+# =======================================
+# Functions
+# =======================================
+
+#Profiling mode of this rerun: '' (off), 'on' or 'cprofile'
+def profile_mode():
+    mode = PROFILE_ENV
+    if not mode:
+        mode = st.experimental_get_query_params().get('profile', [''])[0].strip().lower()
+
+    if mode in ('', '0', 'false', 'off', 'no'):
+        return ''
+
+    return 'cprofile' if mode == 'cprofile' else 'on'
+
+def _start_tracing():
+    global _active_runs
+
+    with _runs_lock:
+        if _active_runs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _active_runs += 1
+
+def _stop_tracing():
+    global _active_runs
+
+    with _runs_lock:
+        _active_runs -= 1
+        if _active_runs == 0:
+            tracemalloc.stop()
+
+def _overlapping():
+    return _active_runs > 1
+
+#Timings of one rerun: wall time, peak and net allocated memory of each (possibly nested) section
+#Tracing is released when the run finishes or, if it never does (exception, st.stop, session gone before
+#profile_report), when the run is dropped with its script thread
+class Run:
+    def __init__(self, page, mode):
+        self.page = page
+        self.mode = mode
+        self.records = []
+        self.stack = []
+        self.opened = 0
+        self.finished = False
+        self.overlapped = False
+
+        _start_tracing()
+        self._release = weakref.finalize(self, _stop_tracing)
+        self.start = time.perf_counter()
+
+        self.profiler = None
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        self.overlapped = self.overlapped or _overlapping()
+
+        #Nested sections reset the tracemalloc peak, so the outer ones keep the peak seen so far
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+
+        frame = {'name': ' / '.join([f['name'] for f in self.stack] + [name]), 'order': self.opened,
+                 'memory': current, 'peak': current}
+        self.opened += 1
+        self.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            self.stack.pop()
+            self.overlapped = self.overlapped or _overlapping()
+            frame['peak'] = max(frame['peak'], peak)
+            if self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1]['peak'], frame['peak'])
+
+            self.records.append({
+                'order': frame['order'],
+                'section': frame['name'],
+                'wall_s': wall,
+                'peak_mb': (frame['peak'] - frame['memory']) / 1024 ** 2,
+                'net_mb': (current - frame['memory']) / 1024 ** 2,
+            })
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.total_s = time.perf_counter() - self.start
+        self._release()
+
+    #Sections in the order they started (a section is recorded when it ends, after the ones nested in it)
+    def table(self):
+        records = sorted(self.records, key=lambda r: r['order'])
+
+        return pd.DataFrame(records, columns=['section', 'wall_s', 'peak_mb', 'net_mb'])
+
+    #cProfile stats of the rerun: written to PROFILE_DIR, top functions returned as text
+    def dump_stats(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = os.path.join(PROFILE_DIR, f'{self.page}-{stamp}.pstats')
+        self.profiler.dump_stats(path)
+
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+        return path, out.getvalue()
+
+#Start profiling the rerun of a page (at the top of the script, before loading data)
+def start_profile(page):
+    previous = getattr(_state, 'run', None)
+    if previous is not None:
+        #Last rerun of this thread stopped before its report (exception or st.stop)
+        previous.finish()
+
+    mode = profile_mode()
+    _state.run = Run(page, mode) if mode else None
+
+#Named section of the current rerun: with section('...'): ...
+def section(name):
+    run = getattr(_state, 'run', None)
+    if run is None:
+        return _NULL
+
+    return run.section(name)
+
+#Finish the current rerun and show its breakdown in the sidebar (at the end of the script)
+def profile_report():
+    run = getattr(_state, 'run', None)
+    if run is None:
+        return
+    _state.run = None
+    run.finish()
+
+    df = run.table()
+
+    st.sidebar.markdown('''---''')
+    st.sidebar.markdown('### Perfil da Execução:')
+    st.sidebar.markdown(f'Tempo total: {run.total_s * 1000:,.0f} ms')
+    if run.overlapped:
+        st.sidebar.caption('Outras execuções perfiladas rodaram ao mesmo tempo: os picos de memória incluem as alocações delas.')
+    st.sidebar.dataframe(df.rename(columns={
+        'section':'Seção',
+        'wall_s':'Tempo (ms)',
+        'peak_mb':'Pico (MB)',
+        'net_mb':'Líquido (MB)',
+    }).assign(**{'Tempo (ms)': df['wall_s'] * 1000}).round(2))
+
+    cache = figure_cache().stats()
+    st.sidebar.markdown(f"Cache de gráficos: {cache['hits']} acertos, {cache['misses']} faltas, "
+                        f"{cache['evictions']} descartes ({cache['entries']} gráficos, {cache['mb']:.1f} MB)")
+
+    if run.profiler is not None:
+        path, stats = run.dump_stats()
+        with st.sidebar.expander('cProfile'):
+            st.markdown(f'Arquivo: `{path}`')
+            st.code(stats)
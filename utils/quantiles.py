@@ -0,0 +1,106 @@
+#Import Libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import CUBE_DIMENSIONS, rating_band
+
+
+#Mergeable quantile sketch of the prices, with relative-error log buckets (as in DDSketch, Masson et al., 2019):
+#a price goes to bucket i = ceil(log(price) / log(gamma)), gamma = (1 + a) / (1 - a), whose value 2 gamma^i / (gamma + 1)
+#is within a (relative) of every price in it. The sketch is a price histogram per cube cell (cube dimensions + bucket ->
+#restaurants), so the sketches of any cells merge by summing counts: the quantiles of any selection, filter or group
+#(country, city, cuisine...) come from the histogram, and an ingest only rebuilds the cells it touches
+
+#APPROX_QUANTILES=1: the price median chart reads the sketch instead of the rows (see utils.views)
+APPROX_QUANTILES = os.environ.get('APPROX_QUANTILES', '0') == '1'
+
+#Relative accuracy of every quantile (the buckets are persisted: changing it needs a PIPELINE_VERSION bump)
+QUANTILE_ACCURACY = 0.01
+GAMMA = (1 + QUANTILE_ACCURACY) / (1 - QUANTILE_ACCURACY)
+
+#Bucket of the prices <= 0 (no logarithm), valued 0
+ZERO_BUCKET = np.iinfo('int32').min
+
+#Group keys of the sketch table (one row per cell and bucket)
+PRICE_SKETCH_KEYS = CUBE_DIMENSIONS + ['price_bucket']
+
+# =======================================
+# Functions
+# =======================================
+
+def price_bucket(prices):
+    prices = np.asarray(prices, dtype='float64')
+    positive = prices > 0
+
+    buckets = np.full(len(prices), ZERO_BUCKET, dtype='int32')
+    buckets[positive] = np.ceil(np.log(prices[positive]) / np.log(GAMMA))
+
+    return buckets
+
+def bucket_value(buckets):
+    return np.where(buckets == ZERO_BUCKET, 0.0, 2 * GAMMA ** buckets.astype('float64') / (GAMMA + 1))
+
+#Build the price sketch from the processed dataset (same cells as utils.cube.build_cube, split by price bucket)
+def build_price_sketch(df):
+    df1 = df.loc[:, CUBE_DIMENSIONS[:-1]].copy()
+    df1['rating_band'] = rating_band(df['aggregate_rating'])
+    df1['price_bucket'] = price_bucket(df['average_cost_for_two'])
+
+    #Missing prices are left out, as in the pandas quantiles
+    sketch = (df1.loc[df['average_cost_for_two'].notna(), :]
+              .groupby(PRICE_SKETCH_KEYS, observed=True)
+              .size()
+              .rename('restaurants')
+              .reset_index())
+
+    sketch['restaurants'] = sketch['restaurants'].astype('int64')
+
+    return sketch
+
+#Roll up partial sketches (of disjoint sets of rows) into one
+def merge_price_sketches(sketches):
+    sketches = [sketch for sketch in sketches if sketch is not None]
+    if len(sketches) == 1:
+        return sketches[0]
+
+    return (pd.concat(sketches, ignore_index=True)
+            .groupby(PRICE_SKETCH_KEYS, observed=True)
+            .agg(restaurants=('restaurants', 'sum'))
+            .reset_index())
+
+#Quantile of an aggregation name: 'median' or 'pNN' (e.g. 'p95'); None for other aggregations
+def quantile_of(how):
+    if how == 'median':
+        return 0.5
+    if len(how) > 1 and how[0] == 'p' and how[1:].isdigit():
+        return int(how[1:]) / 100
+
+    return None
+
+#Quantiles of the price per group, from a (filtered) sketch: frame indexed by dims, one column per quantile
+#Interpolated between the two nearest ranks, like pandas (so the median of an even count is the mean of the middle two)
+def sketch_quantiles(sketch, dims, quantiles):
+    hist = sketch.groupby(dims + ['price_bucket'], observed=True)['restaurants'].sum().reset_index()
+    if hist.empty:
+        return pd.DataFrame({q: pd.Series(dtype='float64') for q in quantiles}, index=hist.set_index(dims).index)
+
+    #Groups in order, so each group's buckets are one sorted run of the global cumulative counts
+    groups = hist.groupby(dims, observed=True).ngroup().to_numpy()
+    counts = hist['restaurants'].to_numpy()
+    ends = np.cumsum(counts)
+    totals = np.bincount(groups, weights=counts).astype('int64')
+    starts = np.concatenate([[0], np.cumsum(totals)[:-1]])
+    values = bucket_value(hist['price_bucket'].to_numpy())
+
+    index = hist.loc[np.r_[True, groups[1:] != groups[:-1]], dims].set_index(dims).index
+    result = {}
+    for q in quantiles:
+        rank = q * (totals - 1)
+        low = np.floor(rank)
+        below = values[np.searchsorted(ends, starts + low, side='right')]
+        above = values[np.searchsorted(ends, starts + np.ceil(rank), side='right')]
+        result[q] = below + (rank - low) * (above - below)
+
+    return pd.DataFrame(result, index=index)
@@ -0,0 +1,196 @@
+#Import Libraries
+import argparse
+import datetime
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import inflection
+import pandas as pd
+import plotly.offline
+
+from utils.charts import chart_figure
+from utils.data import dataset_version
+from utils.snapshot import DATA_DIR, read_snapshot
+from utils.sketch import HLL_ERROR
+from utils.views import (APPROXIMATE_HELP, APPROXIMATE_METRICS, OVERVIEW_METRICS, VIEWS, compute_views, format_metric, load_view_data,
+                         quantile_specs)
+
+
+#Static reports of the dashboard views (one HTML + one JSON per country selection), without the Streamlit app
+REPORT_DIR = os.path.join(DATA_DIR, 'reports')
+
+#plotly.js is inlined in every file, so a report opens on its own wherever it is copied
+#(--external-js writes it once next to the reports instead: smaller files, but they need it alongside)
+PLOTLY_JS = 'plotly.min.js'
+
+PAGE_STYLE = '''
+body { font-family: sans-serif; margin: 2em auto; max-width: 1100px; color: #262730; }
+.metricas { display: flex; flex-wrap: wrap; gap: 2em; }
+.metrica span { display: block; font-size: 0.9em; color: #555; }
+.metrica b { font-size: 1.8em; }
+table { border-collapse: collapse; font-size: 0.85em; }
+td, th { border: 1px solid #ddd; padding: 2px 8px; }
+.nota { font-size: 0.85em; color: #555; }
+'''
+
+# =======================================
+# Functions
+# =======================================
+
+#Data loaded once per worker process (dataset + cube, with their country position indexes)
+_worker = {}
+
+def init_worker():
+    _worker.update(load_view_data())
+
+#File name of a selection
+def report_name(label):
+    return inflection.parameterize(label, '_')
+
+def chart_html(spec, frame, include_plotlyjs):
+    if spec['chart'] == 'table':
+        return frame.rename(columns=spec.get('labels', {})).to_html(index=False, border=0)
+
+    return chart_figure(spec, frame).to_html(full_html=False, include_plotlyjs=include_plotlyjs, default_width='100%')
+
+def report_html(label, views, version, inline_js):
+    script = f'<script>{plotly.offline.get_plotlyjs()}</script>' if inline_js else f'<script src="{PLOTLY_JS}"></script>'
+
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8">',
+        f'<title>World Restaurants - {html.escape(label)}</title>',
+        f'<style>{PAGE_STYLE}</style>{script}</head><body>',
+        f'<h1>World Restaurants - {html.escape(label)}</h1>',
+        f'<p class="nota">Base {html.escape(version)}, gerado em {datetime.datetime.now():%d/%m/%Y %H:%M}</p>',
+        '<h2>Visão Geral</h2><div class="metricas">',
+    ]
+
+    for name, value in views['Geral'].items():
+        parts.append(f'<div class="metrica"><span>{html.escape(OVERVIEW_METRICS[name][0])}</span>'
+                     f'<b>{html.escape(str(format_metric(name, value)))}</b></div>')
+    parts.append('</div>')
+    if APPROXIMATE_METRICS:
+        parts.append(f'<p class="nota">≈ {html.escape(APPROXIMATE_HELP)}</p>')
+
+    for view, specs in VIEWS.items():
+        parts.append(f'<h2>Visão {html.escape(view)}</h2>')
+        for name, spec in quantile_specs(specs).items():
+            parts.append(f"<h3>{html.escape(spec['title'])}</h3>")
+            parts.append(chart_html(spec, views[view][name], False))
+            for note in spec.get('notes', []):
+                parts.append(f'<p class="nota">{html.escape(note)}</p>')
+
+    parts.append('</body></html>')
+
+    return '\n'.join(parts)
+
+def report_json(label, countries, views, version):
+    report = {
+        'selection': label,
+        'countries': list(countries),
+        'dataset_version': version,
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'views': {'Geral': {name: int(value) for name, value in views['Geral'].items()}},
+        'approximate': {name: HLL_ERROR for name in APPROXIMATE_METRICS},
+    }
+
+    for view, specs in VIEWS.items():
+        report['views'][view] = {name: {'title': spec['title'], 'data': json.loads(views[view][name].to_json(orient='records'))}
+                                 for name, spec in specs.items()}
+
+    return report
+
+#Worker: HTML + JSON report of one selection
+def render_report(task):
+    label, countries, output, version, inline_js = task
+
+    start = time.perf_counter()
+    views = compute_views(_worker, countries)
+    computed = time.perf_counter()
+
+    name = report_name(label)
+    with open(os.path.join(output, f'{name}.html'), 'w', encoding='utf-8') as f:
+        f.write(report_html(label, views, version, inline_js))
+    with open(os.path.join(output, f'{name}.json'), 'w', encoding='utf-8') as f:
+        json.dump(report_json(label, countries, views, version), f, ensure_ascii=False, indent=1)
+    written = time.perf_counter()
+
+    return {'selection': label, 'file': f'{name}.html', 'pid': os.getpid(),
+            'restaurants': int(views['Geral']['restaurants']),
+            'compute_s': computed - start, 'render_s': written - computed, 'total_s': written - start}
+
+#Countries of the dataset (dataset order)
+def dataset_countries():
+    return read_snapshot(['country'])['country'].unique().tolist()
+
+#Default selections: every country together, then each country alone (dataset order)
+def default_selections():
+    countries = dataset_countries()
+
+    return [('Todos os países', countries)] + [(country, [country]) for country in countries]
+
+def index_html(report, version):
+    links = '\n'.join(f"<li><a href=\"{html.escape(row['file'])}\">{html.escape(row['selection'])}</a> "
+                      f"({format_metric('restaurants', row['restaurants'])} restaurantes)</li>"
+                      for row in report.to_dict('records'))
+
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>World Restaurants - Relatórios</title>'
+            f'<style>{PAGE_STYLE}</style></head><body><h1>World Restaurants - Relatórios</h1>'
+            f'<p class="nota">Base {html.escape(version)}, gerado em {datetime.datetime.now():%d/%m/%Y %H:%M}</p>'
+            f'<ul>{links}</ul></body></html>')
+
+#Write the reports of every selection ([(label, countries)]), one selection per task on a process pool
+#Returns the timings report (one row per selection)
+#Selections with no country or with a country missing from the dataset raise ValueError (nothing is written)
+def build_reports(selections=None, output=REPORT_DIR, workers=None, inline_js=True):
+    version = dataset_version()
+    selections = selections or default_selections()
+
+    empty = [label for label, countries in selections if not countries]
+    if empty:
+        raise ValueError('Seleção sem países')
+    unknown = sorted({country for _, countries in selections for country in countries} - set(dataset_countries()))
+    if unknown:
+        raise ValueError(f"Países desconhecidos: {', '.join(unknown)}")
+
+    os.makedirs(output, exist_ok=True)
+
+    if not inline_js:
+        with open(os.path.join(output, PLOTLY_JS), 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    tasks = [(label, countries, output, version, inline_js) for label, countries in selections]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        report = pd.DataFrame(list(pool.map(render_report, tasks)))
+
+    with open(os.path.join(output, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(index_html(report, version))
+
+    return report
+
+
+#Batch reports from the command line:
+#python -m utils.report [--output data/reports] [--workers N] [--selection "Brazil, India" ...] [--external-js]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=REPORT_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--selection', action='append', default=[])
+    parser.add_argument('--external-js', action='store_true')
+    args = parser.parse_args()
+
+    #Country names separated by commas, spaces around them ignored
+    names = [[country.strip() for country in s.split(',') if country.strip()] for s in args.selection]
+    selections = [(', '.join(countries), countries) for countries in names]
+
+    start = time.perf_counter()
+    try:
+        report = build_reports(selections, args.output, args.workers, not args.external_js)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(report.to_string(index=False, float_format='{:.3f}'.format))
+    print(f'\n{len(report)} relatórios em {time.perf_counter() - start:.1f} s: {args.output}')
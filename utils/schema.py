@@ -0,0 +1,114 @@
+#Import Libraries
+import numpy as np
+import pandas as pd
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Typed schema for the processed dataset
+#Low-cardinality text as categories, 0/1 flags as bool, 32-bit numerics where the ranges allow
+PRICE_TYPE_DTYPE = pd.CategoricalDtype(['Cheap', 'Normal', 'Expensive', 'Gourmet'], ordered=True)
+
+SCHEMA = {
+    'restaurant_id': 'int32',
+    'country': 'category',
+    'city': 'category',
+    'cuisines': 'category',
+    'all_cuisines': 'category',
+    'price_type': PRICE_TYPE_DTYPE,
+    'average_cost_for_two': 'int32',
+    'currency': 'category',
+    'has_table_booking': 'bool',
+    'has_online_delivery': 'bool',
+    'is_delivering_now': 'bool',
+    'aggregate_rating': 'float32',
+    'rating_color': 'category',
+    'color_name': 'category',
+    'rating_text': 'category',
+    'votes': 'int32',
+}
+
+#Columns added for the app only: left out of the duplicate check, the legacy CSV and the download exports,
+#which keep the original layout
+DERIVED_COLUMNS = ['all_cuisines']
+
+def legacy_frame(df):
+    return df.drop(columns=[col for col in DERIVED_COLUMNS if col in df.columns])
+
+#Check if an integer column fits in the target integer dtype
+def fits(series, dtype):
+    if len(series) == 0:
+        return True
+
+    info = np.iinfo(dtype)
+    return info.min <= series.min() and series.max() <= info.max
+
+#Apply schema (integer columns out of 32-bit range keep their original dtype)
+def apply_schema(df, schema=SCHEMA):
+    df1 = df.copy()
+
+    for col, dtype in schema.items():
+        if col not in df1.columns:
+            continue
+
+        if dtype in ('int32', 'int16', 'int8') and not fits(df1[col], dtype):
+            continue
+
+        df1[col] = df1[col].astype(dtype)
+
+    return df1
+
+#Categories back in schema order (Parquet files written in several row groups are read back
+#with the categories in order of appearance and without the ordered flag)
+def restore_categories(df, schema=SCHEMA):
+    for col, dtype in schema.items():
+        if col not in df.columns or not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            if df[col].dtype != dtype:
+                df[col] = df[col].astype(dtype)
+        elif not df[col].cat.categories.is_monotonic_increasing:
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+
+    return df
+
+#Plain dtypes for file exports (bool flags back to 0/1, as in the raw data)
+def export_frame(df):
+    df1 = df.copy()
+
+    for col in df1.select_dtypes('bool').columns:
+        df1[col] = df1[col].astype('int8')
+
+    return df1
+
+#Memory usage per column, in bytes and MB
+def memory_report(df):
+    usage = df.memory_usage(index=False, deep=True)
+
+    report = pd.DataFrame({
+        'column': usage.index,
+        'dtype': [str(df[col].dtype) for col in usage.index],
+        'bytes': usage.values,
+    })
+    report['mb'] = report['bytes'] / 1024 ** 2
+
+    return report
+
+
+#Memory report, before and after the schema: python -m utils.schema
+if __name__ == '__main__':
+    from utils.data import process_data, read_raw
+
+    df = process_data(read_raw())
+
+    before = memory_report(df)
+    after = memory_report(apply_schema(df))
+
+    report = before.merge(after, on='column', suffixes=('_antes', '_depois'))
+    report = report.loc[:, ['column', 'dtype_antes', 'mb_antes', 'dtype_depois', 'mb_depois']]
+
+    print(report.to_string(index=False, float_format='{:.3f}'.format))
+    print(f"\nTotal: {before['mb'].sum():.2f} MB -> {after['mb'].sum():.2f} MB")
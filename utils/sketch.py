@@ -0,0 +1,168 @@
+#Import Libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+
+#HyperLogLog distinct-count sketches (Flajolet et al., 2007; small-range correction by linear counting):
+#each value is hashed to 64 bits, the first p bits pick one of 2^p registers and the register keeps the highest rank
+#(position of the first 1 bit in the other bits) seen. Sketches merge by the register maximum, so the distinct count of
+#any union of groups (e.g. a country selection) comes from the group sketches, without a pass over the rows
+
+#APPROX_DISTINCT=1: the Geral metrics estimate distinct restaurants from per-country sketches (see utils.views)
+APPROX_DISTINCT = os.environ.get('APPROX_DISTINCT', '0') == '1'
+
+#Registers per sketch = 2^HLL_PRECISION (one byte each): 14 -> 16 KB per group
+#(the persisted sketches are built with it: their file name carries it, so a change rebuilds them)
+HLL_PRECISION = int(os.environ.get('HLL_PRECISION', 14))
+
+#Groups of the persisted sketches, built with the snapshot: one sketch per country, city and (primary) cuisine
+SKETCH_DIMENSIONS = ['country', 'city', 'cuisines']
+
+#Keys of the sketch table: one row per non-empty register of each group (the empty ones are implied), valued by its rank
+SKETCH_KEYS = ['dimension', 'group', 'register']
+
+#Relative standard error of an estimate (about 95% of them are within twice this)
+HLL_ERROR = 1.04 / np.sqrt(2 ** HLL_PRECISION)
+
+# =======================================
+# Functions
+# =======================================
+
+#Number of significant bits of each uint64 (0 for 0)
+#float64 keeps 53 bits, so values just below a power of two may round up: those get one bit less
+def bit_length(values):
+    bits = np.minimum(np.frexp(values.astype('float64'))[1], 64)
+    over = (bits > 0) & ((values >> np.maximum(bits - 1, 0).astype('uint64')) == 0)
+
+    return bits - over
+
+#Register index and rank of each value
+def hll_hash(values, precision=HLL_PRECISION):
+    hashes = pd.util.hash_array(np.asarray(values))
+    index = (hashes >> np.uint64(64 - precision)).astype('int64')
+    #Rank: leading zeros of the remaining 64 - p bits, plus one (all zeros: 64 - p + 1)
+    rank = (65 - precision) - bit_length(hashes & np.uint64((1 << (64 - precision)) - 1))
+
+    return index, rank.astype('uint8')
+
+#One sketch per group: registers of shape (groups, 2^p)
+#groups: categorical Series aligned with the values (rows without a group are left out)
+def build_sketches(values, groups, precision=HLL_PRECISION):
+    m = 2 ** precision
+    codes = groups.cat.codes.to_numpy()
+    valid = codes >= 0
+
+    index, rank = hll_hash(np.asarray(values)[valid], precision)
+
+    registers = np.zeros(len(groups.cat.categories) * m, dtype='uint8')
+    np.maximum.at(registers, codes[valid].astype('int64') * m + index, rank)
+
+    return {'groups': groups.cat.categories, 'registers': registers.reshape(-1, m)}
+
+#Sketch table of the processed dataset: non-empty registers of every group of the given dimensions
+#Built from the rows (memory follows the rows, not groups x 2^p), so a snapshot build can make it chunk by chunk
+#Dimension and group are categoricals: a table row takes a few bytes, whatever the group names
+def build_sketch_table(df, dimensions=SKETCH_DIMENSIONS, precision=HLL_PRECISION):
+    index, rank = hll_hash(df['restaurant_id'].to_numpy(), precision)
+
+    rows = [pd.DataFrame({'dimension': pd.Categorical.from_codes(np.full(len(df), SKETCH_DIMENSIONS.index(dim)), SKETCH_DIMENSIONS),
+                          'group': df[dim].astype('category').array,
+                          'register': index.astype('int32'), 'rank': rank})
+            for dim in dimensions]
+
+    return merge_sketch_tables(rows)
+
+#Merge sketch tables (of any sets of rows, overlapping or not) into one: register maximum per group
+#Groups are sorted by name within each dimension, so the result doesn't depend on how the rows were split
+def merge_sketch_tables(tables):
+    tables = [table for table in tables if table is not None]
+    groups = pd.CategoricalDtype(sorted(set().union(*[table['group'].cat.categories for table in tables])))
+
+    table = (pd.concat([table.astype({'group': groups}) for table in tables], ignore_index=True)
+             .groupby(SKETCH_KEYS, observed=True)['rank']
+             .max()
+             .reset_index())
+    table['group'] = table['group'].cat.remove_unused_categories()
+
+    return table
+
+#Dense sketches of the processed rows, one build_sketches per dimension: {dimension: sketches}
+#Memory follows groups x 2^p instead of the rows, so a streaming build can keep them for the whole file
+def build_dimension_sketches(df, dimensions=SKETCH_DIMENSIONS, precision=HLL_PRECISION):
+    ids = df['restaurant_id'].to_numpy()
+
+    return {dim: build_sketches(ids, df[dim].astype('category'), precision) for dim in dimensions}
+
+#Merge dense sketches of the same dimensions: register maximum per group, groups sorted by name
+def merge_dimension_sketches(parts):
+    parts = [part for part in parts if part is not None]
+    merged = {}
+
+    for dim in parts[0]:
+        sketches = [part[dim] for part in parts]
+        groups = pd.Index(sorted(set().union(*[sketch['groups'] for sketch in sketches])))
+
+        registers = np.zeros((len(groups), sketches[0]['registers'].shape[1]), dtype='uint8')
+        for sketch in sketches:
+            positions = groups.get_indexer(sketch['groups'])
+            registers[positions] = np.maximum(registers[positions], sketch['registers'])
+
+        merged[dim] = {'groups': groups, 'registers': registers}
+
+    return merged
+
+#Sketch table of dense sketches: the same table build_sketch_table makes from the same rows
+#Columns are built group by group in their final dtypes (and only with the groups that have rows),
+#so the conversion takes little more than the table itself
+def sketches_table(parts):
+    dims = [dim for dim in SKETCH_DIMENSIONS if dim in parts]
+    counts = {dim: np.count_nonzero(parts[dim]['registers'], axis=1) for dim in dims}
+    groups = pd.CategoricalDtype(sorted(set().union(*[parts[dim]['groups'][counts[dim] > 0] for dim in dims])))
+    columns = {'dimension': [], 'group': [], 'register': [], 'rank': []}
+    for dim in dims:
+        registers = parts[dim]['registers']
+        registers_of = np.arange(registers.shape[1], dtype='int32')
+
+        columns['dimension'].append(np.full(counts[dim].sum(), SKETCH_DIMENSIONS.index(dim), dtype='int8'))
+        columns['group'].append(np.repeat(groups.categories.get_indexer(parts[dim]['groups']).astype('int32'), counts[dim]))
+        columns['register'] += [registers_of[row > 0] for row in registers]
+        columns['rank'].append(registers[registers > 0])
+
+    columns = {col: np.concatenate(values) if values else np.array([], dtype='int32') for col, values in columns.items()}
+
+    return pd.DataFrame({'dimension': pd.Categorical.from_codes(columns['dimension'], SKETCH_DIMENSIONS),
+                         'group': pd.Categorical.from_codes(columns['group'], dtype=groups),
+                         'register': columns['register'].astype('int32'), 'rank': columns['rank'].astype('uint8')})
+
+#Sketches of one dimension of the table, as build_sketches returns them (groups without rows are left out)
+def table_sketches(table, dimension, precision=HLL_PRECISION):
+    rows = table.loc[table['dimension'] == dimension, :]
+    groups = rows['group'].cat.remove_unused_categories()
+
+    registers = np.zeros((len(groups.cat.categories), 2 ** precision), dtype='uint8')
+    registers[groups.cat.codes.to_numpy(), rows['register'].to_numpy()] = rows['rank'].to_numpy()
+
+    return {'groups': groups.cat.categories, 'registers': registers}
+
+#Distinct count estimate of one or more merged sketches (registers: (2^p,) or (n, 2^p))
+def hll_estimate(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+
+    raw = alpha * m * m / np.exp2(-registers.astype('float64')).sum(axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    #Small range: linear counting over the empty registers is more accurate
+    linear = m * np.log(m / np.maximum(zeros, 1))
+
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+#Estimated distinct values over a selection of groups (names missing from the sketches are ignored)
+def estimate_distinct(sketches, selected):
+    positions = sketches['groups'].get_indexer(list(selected))
+    positions = positions[positions >= 0]
+    if len(positions) == 0:
+        return 0
+
+    return int(round(float(hll_estimate(sketches['registers'][positions].max(axis=0)))))
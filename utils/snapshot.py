@@ -0,0 +1,95 @@
+#Import Libraries
+import json
+import os
+import time
+
+import pandas as pd
+
+from utils.schema import restore_categories
+from utils.sketch import HLL_PRECISION
+
+
+#Snapshot files
+#Processed files directory (the SNAPSHOT_DIR env var overrides it, e.g. to keep benchmark builds apart)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(BASE_DIR, 'data'))
+SNAPSHOT_PATH = os.path.join(DATA_DIR, 'base_restaurantes_tratada.parquet')
+MANIFEST_PATH = os.path.join(DATA_DIR, 'base_restaurantes_tratada.json')
+CUBE_PATH = os.path.join(DATA_DIR, 'base_restaurantes_cubo.parquet')
+PRICE_SKETCH_PATH = os.path.join(DATA_DIR, 'base_restaurantes_precos.parquet')
+DISTINCT_SKETCH_PATH = os.path.join(DATA_DIR, f'base_restaurantes_distintos_p{HLL_PRECISION}.parquet')
+
+# =======================================
+# Functions
+# =======================================
+
+#Read manifest (None when missing or unreadable), memoized on mtime/size
+_manifest_memo = {}
+
+def read_manifest(manifest_path=MANIFEST_PATH):
+    try:
+        stat = os.stat(manifest_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = _manifest_memo.get(manifest_path)
+        if cached is None or cached[0] != key:
+            with open(manifest_path, encoding='utf-8') as f:
+                cached = (key, json.load(f))
+            _manifest_memo[manifest_path] = cached
+
+        return cached[1]
+    except (OSError, ValueError):
+        return None
+
+#Check if snapshot (and the tables derived with it) was built from this source with this pipeline version
+def snapshot_is_current(source_hash, pipeline_version, snapshot_path=SNAPSHOT_PATH, manifest_path=MANIFEST_PATH, derived_paths=(CUBE_PATH, PRICE_SKETCH_PATH, DISTINCT_SKETCH_PATH)):
+    manifest = read_manifest(manifest_path)
+
+    if manifest is None or not os.path.exists(snapshot_path):
+        return False
+
+    if not all(os.path.exists(path) for path in derived_paths):
+        return False
+
+    return (manifest.get('source_hash') == source_hash
+            and manifest.get('pipeline_version') == pipeline_version)
+
+#Write a Parquet table (temp file and rename, so readers never see a partial file)
+def write_table(df, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+#Read a Parquet table, only the requested columns
+def read_table(path, columns=None):
+    return restore_categories(pd.read_parquet(path, columns=list(columns) if columns else None))
+
+#Write snapshot + manifest (manifest last: it marks the snapshot as complete)
+#version counts the incremental updates applied on top of the source file (deltas lists them)
+def write_snapshot(df, source_hash, pipeline_version, version=0, deltas=(), snapshot_path=SNAPSHOT_PATH, manifest_path=MANIFEST_PATH):
+    write_table(df, snapshot_path)
+
+    return write_manifest(len(df), df.dtypes, source_hash, pipeline_version, version, deltas, manifest_path)
+
+#Write manifest of a snapshot already on disk (rows/dtypes describe it)
+def write_manifest(rows, dtypes, source_hash, pipeline_version, version=0, deltas=(), manifest_path=MANIFEST_PATH):
+    manifest = {
+        'source_hash': source_hash,
+        'pipeline_version': pipeline_version,
+        'version': version,
+        'deltas': list(deltas),
+        'rows': int(rows),
+        'columns': {col: str(dtype) for col, dtype in dtypes.items()},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+    tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    return manifest
+
+#Read snapshot, only the requested columns
+def read_snapshot(columns=None, snapshot_path=SNAPSHOT_PATH):
+    return read_table(snapshot_path, columns)
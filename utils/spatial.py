@@ -0,0 +1,172 @@
+#Import Libraries
+import numpy as np
+import streamlit as st
+
+
+# =======================================
+# Functions
+# =======================================
+
+#Spatial index over the restaurant coordinates
+#Points are sorted by a lat/lon grid cell key; cells of one grid row are contiguous,
+#so a bounding box is one searchsorted range per grid row instead of a full scan
+CELL_DEG = 0.05
+GRID_COLS = int(360 / CELL_DEG)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG = np.pi * EARTH_RADIUS_KM / 180
+
+#Columns that can be used to filter queries (stored as category codes)
+FILTER_COLUMNS = ['country', 'cuisines', 'price_type']
+
+#Grid cell of coordinates
+def cell_row(lat):
+    return np.clip(np.floor((np.asarray(lat) + 90) / CELL_DEG), 0, 180 / CELL_DEG - 1).astype('int64')
+
+def cell_col(lon):
+    return np.clip(np.floor((np.asarray(lon) + 180) / CELL_DEG), 0, GRID_COLS - 1).astype('int64')
+
+#Great-circle distance in km (vectorized)
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+#Build index (rows are positions in df)
+def build_index(df):
+    lat = df['latitude'].to_numpy(dtype='float64')
+    lon = df['longitude'].to_numpy(dtype='float64')
+
+    keys = cell_row(lat) * GRID_COLS + cell_col(lon)
+    order = np.argsort(keys, kind='stable')
+
+    index = {
+        'keys': keys[order],
+        'rows': order,
+        'lat': lat[order],
+        'lon': lon[order],
+        'codes': {},
+        'categories': {},
+    }
+
+    for col in FILTER_COLUMNS:
+        if col in df.columns:
+            values = df[col].astype('category')
+            index['codes'][col] = values.cat.codes.to_numpy()[order]
+            index['categories'][col] = {value: code for code, value in enumerate(values.cat.categories)}
+
+    return index
+
+#Candidate positions (in index order) of the grid cells covering a bounding box
+def _candidates(index, south, west, north, east):
+    rows = np.arange(cell_row(south), cell_row(north) + 1)
+
+    if east - west >= 360:
+        col_ranges = [(0, GRID_COLS - 1)]
+    else:
+        west = (west + 180) % 360 - 180
+        east = (east + 180) % 360 - 180
+        if west <= east:
+            col_ranges = [(cell_col(west), cell_col(east))]
+        else:
+            col_ranges = [(cell_col(west), GRID_COLS - 1), (0, cell_col(east))]
+
+    starts, ends = [], []
+    for col0, col1 in col_ranges:
+        starts.append(np.searchsorted(index['keys'], rows * GRID_COLS + col0, side='left'))
+        ends.append(np.searchsorted(index['keys'], rows * GRID_COLS + col1, side='right'))
+
+    starts = np.concatenate(starts)
+    lengths = np.concatenate(ends) - starts
+
+    #Expand the [start, end) ranges into positions without a Python loop
+    total = lengths.sum()
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+    return offsets + np.arange(total)
+
+#Category codes of the filter values ({'cuisines': 'Italian', 'price_type': ['Cheap', 'Normal']})
+def filter_codes(index, filters):
+    codes = {}
+
+    for col, values in (filters or {}).items():
+        if values is None:
+            continue
+
+        values = [values] if isinstance(values, str) else list(values)
+        categories = index['categories'][col]
+        codes[col] = np.array([categories[v] for v in values if v in categories], dtype='int64')
+
+    return codes
+
+#Keep only candidates matching the filter codes
+def _apply_filters(index, pos, codes):
+    for col, col_codes in codes.items():
+        values = index['codes'][col][pos]
+
+        if len(col_codes) == 1:
+            pos = pos[values == col_codes[0]]
+        else:
+            pos = pos[np.isin(values, col_codes)]
+
+    return pos
+
+#Restaurants inside a bounding box (df row positions)
+def query_bbox(index, south, west, north, east, filters=None):
+    pos = _candidates(index, south, west, north, east)
+    lat = index['lat'][pos]
+    lon = index['lon'][pos]
+
+    mask = (lat >= south) & (lat <= north)
+    if east - west < 360:
+        west = (west + 180) % 360 - 180
+        east = (east + 180) % 360 - 180
+        mask &= ((lon >= west) & (lon <= east)) if west <= east else ((lon >= west) | (lon <= east))
+
+    pos = _apply_filters(index, pos[mask], filter_codes(index, filters))
+
+    return index['rows'][pos]
+
+#Bounding box around a point containing every point within km
+def radius_bbox(lat, lon, km):
+    dlat = km / KM_PER_DEG
+    cos = np.cos(np.radians(min(abs(lat) + dlat, 90)))
+    dlon = 360 if cos < 1e-6 else min(km / (KM_PER_DEG * cos), 360)
+
+    return max(lat - dlat, -90), lon - dlon, min(lat + dlat, 90), lon + dlon
+
+#Restaurants within km of a point, nearest first: (df row positions, distances in km)
+def query_radius(index, lat, lon, km, filters=None, codes=None):
+    if codes is None:
+        codes = filter_codes(index, filters)
+
+    south, west, north, east = radius_bbox(lat, lon, km)
+    pos = _apply_filters(index, _candidates(index, south, west, north, east), codes)
+
+    dist = haversine(lat, lon, index['lat'][pos], index['lon'][pos])
+    keep = dist <= km
+    pos, dist = pos[keep], dist[keep]
+
+    order = np.argsort(dist, kind='stable')
+
+    return index['rows'][pos[order]], dist[order]
+
+#k nearest restaurants to a point: (df row positions, distances in km)
+#The search radius grows 4x until k matches are found inside it, so the result is exact
+def nearest(index, lat, lon, k=10, filters=None, start_km=None):
+    km = start_km or CELL_DEG * KM_PER_DEG
+    codes = filter_codes(index, filters)
+
+    while True:
+        rows, dist = query_radius(index, lat, lon, km, codes=codes)
+
+        if len(rows) >= k or km >= np.pi * EARTH_RADIUS_KM:
+            return rows[:k], dist[:k]
+
+        km *= 4
+
+#Index of the processed dataset, built once per dataset version
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_index(dataset_version, _df):
+    return build_index(_df)
@@ -0,0 +1,253 @@
+#Import Libraries
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+
+from utils.charts import aggregate_pass, chart_frame, pass_aggregations, plan
+from utils.cuisines import CUISINE_CUBE_COLUMNS, build_cuisine_cube, build_cuisine_index
+from utils.data import dataset_version
+from utils.schema import export_frame
+from utils.snapshot import CUBE_PATH, DATA_DIR, SNAPSHOT_PATH, read_snapshot
+
+#DuckDB is optional (pip install duckdb); SQLite ships with Python
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+#Embedded database with the processed dataset and the cube (QUERY_ENGINE=sqlite or duckdb, see utils.charts)
+#Rebuilt from the Parquet snapshot whenever the dataset version changes
+DATABASE_PATHS = {
+    'sqlite': os.path.join(DATA_DIR, 'base_restaurantes.sqlite'),
+    'duckdb': os.path.join(DATA_DIR, 'base_restaurantes.duckdb'),
+}
+
+#Chart source -> (table, Parquet file it is loaded from; None: built in memory, see cuisine_cube_table)
+TABLES = {
+    'rows': ('restaurants', SNAPSHOT_PATH),
+    'cube': ('cube', CUBE_PATH),
+    'cuisine_cube': ('cuisine_cube', None),
+}
+
+#Rows inserted at a time into SQLite
+INSERT_BATCH_ROWS = 50_000
+
+#SQL of the pandas aggregations used by the chart specs (median has its own query on SQLite)
+AGGREGATIONS = {
+    'sum': 'SUM({})',
+    'mean': 'AVG({})',
+    'min': 'MIN({})',
+    'max': 'MAX({})',
+    'count': 'COUNT({})',
+    'nunique': 'COUNT(DISTINCT {})',
+    'median': 'MEDIAN({})',
+}
+
+# =======================================
+# Functions
+# =======================================
+
+def connect(engine, path, read_only=True):
+    if engine == 'duckdb':
+        if duckdb is None:
+            raise ImportError('QUERY_ENGINE=duckdb precisa do pacote duckdb (pip install duckdb)')
+        return duckdb.connect(path, read_only=read_only)
+
+    if engine == 'sqlite':
+        return sqlite3.connect(f'file:{path}?mode=ro' if read_only else path, uri=read_only, check_same_thread=False)
+
+    raise ValueError(f'QUERY_ENGINE desconhecido: {engine} (use pandas, sqlite ou duckdb)')
+
+#Dataset version the database was built from (None when missing or unreadable)
+def database_version(engine, path):
+    if not os.path.exists(path):
+        return None
+
+    try:
+        con = connect(engine, path)
+        try:
+            return con.execute('SELECT version FROM meta').fetchone()[0]
+        finally:
+            con.close()
+    except Exception:
+        return None
+
+#Cube over every listed cuisine (no Parquet file of its own: built from the snapshot, as in utils.data)
+def cuisine_cube_table():
+    df = read_snapshot(CUISINE_CUBE_COLUMNS)
+    cube = build_cuisine_cube(df, build_cuisine_index(df['all_cuisines']))
+
+    #Categories as plain text, like the Parquet tables
+    return export_frame(cube.astype({col: 'object' for col in cube.select_dtypes('category').columns}))
+
+#Load the snapshot and the cubes into a new database file (temp file and rename, like the snapshot)
+def build_database(engine, version, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    con = connect(engine, tmp_path, read_only=False)
+    try:
+        for table, parquet_path in TABLES.values():
+            if parquet_path is None:
+                frame = cuisine_cube_table()
+                if engine == 'duckdb':
+                    con.register('derived', frame)
+                    con.execute(f'CREATE TABLE {table} AS SELECT * FROM derived')
+                    con.unregister('derived')
+                else:
+                    frame.to_sql(table, con, index=False, chunksize=INSERT_BATCH_ROWS)
+                    con.execute(f'CREATE INDEX {table}_country ON {table} (country)')
+                continue
+
+            if engine == 'duckdb':
+                #DuckDB scans the Parquet file itself
+                con.execute(f"CREATE TABLE {table} AS SELECT * FROM read_parquet('{parquet_path}')")
+                continue
+
+            parquet = pq.ParquetFile(parquet_path)
+            export_frame(parquet.schema_arrow.empty_table().to_pandas()).to_sql(table, con, index=False)
+            for batch in parquet.iter_batches(INSERT_BATCH_ROWS):
+                export_frame(batch.to_pandas()).to_sql(table, con, if_exists='append', index=False)
+            con.execute(f'CREATE INDEX {table}_country ON {table} (country)')
+
+        con.execute('CREATE TABLE meta (version VARCHAR)')
+        con.execute('INSERT INTO meta VALUES (?)', [version])
+        con.commit()
+    finally:
+        con.close()
+
+    os.replace(tmp_path, path)
+
+#Make sure the database matches the dataset version, rebuilding it only when it doesn't
+_database_lock = threading.Lock()
+
+def ensure_database(engine, version):
+    path = DATABASE_PATHS[engine]
+
+    with _database_lock:
+        if database_version(engine, path) != version:
+            build_database(engine, version, path)
+
+    return path
+
+#Database of a dataset version, checked/built once per process and shared by every session
+#DuckDB: one read-only connection (each query uses its own cursor); SQLite: the file path (one connection per query)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_database(engine, version):
+    path = ensure_database(engine, version)
+
+    return connect(engine, path) if engine == 'duckdb' else path
+
+def run_query(engine, database, sql, params):
+    if engine == 'duckdb':
+        cursor = database.cursor()
+        try:
+            return cursor.execute(sql, params).df()
+        finally:
+            cursor.close()
+
+    con = connect(engine, database)
+    try:
+        return pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
+
+#WHERE clause of a pass: the country selection (pushed down), the spec filter and non-null group keys (as pandas groupby)
+def where_clause(p, keys, countries):
+    conditions = [f'{key} IS NOT NULL' for key in keys]
+    params = []
+
+    if countries is not None:
+        if countries:
+            conditions.append(f"country IN ({', '.join('?' * len(countries))})")
+            params += list(countries)
+        else:
+            conditions.append('1 = 0')
+
+    if p['filter'] is not None:
+        col, op, value = p['filter']
+        #pandas '!=' keeps missing values
+        conditions.append(f'{col} = ?' if op == '==' else f'({col} <> ? OR {col} IS NULL)')
+        params.append(value)
+
+    return ' AND '.join(conditions), params
+
+#Queries of one pass: one GROUP BY for every aggregation, plus one per median on SQLite (no MEDIAN there)
+def pass_queries(p, specs, countries, engine):
+    table = TABLES[p['source']][0]
+    keys = p['dims'] + p['split']
+    group = ', '.join(keys)
+    where, params = where_clause(p, keys, countries)
+
+    selects = []
+    queries = []
+    for name, (col, how) in pass_aggregations(p, specs).items():
+        if how == 'median' and engine == 'sqlite':
+            #Middle row (odd count) or average of the two middle rows (even count) of each group
+            queries.append((f'''
+                SELECT {group}, AVG({col}) AS {name}
+                FROM (SELECT {group}, {col},
+                             ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {col}) AS rn,
+                             COUNT(*) OVER (PARTITION BY {group}) AS n
+                      FROM {table}
+                      WHERE {where} AND {col} IS NOT NULL)
+                WHERE rn IN ((n + 1) / 2, (n + 2) / 2)
+                GROUP BY {group}''', params))
+        else:
+            selects.append(f'{AGGREGATIONS[how].format(col)} AS {name}')
+
+    if selects:
+        queries.insert(0, (f"SELECT {group}, {', '.join(selects)} FROM {table} WHERE {where} GROUP BY {group}", params))
+
+    return queries
+
+#Result of a pass shaped like the pandas groupby: key dtypes and order, aggregation dtypes
+def pass_result(p, specs, frames, source):
+    keys = p['dims'] + p['split']
+
+    result = frames[0]
+    for frame in frames[1:]:
+        result = result.merge(frame, on=keys, how='outer')
+
+    #Dtypes of the same aggregation in pandas (run on no rows)
+    expected = source.head(0).groupby(keys, observed=True).agg(**pass_aggregations(p, specs))
+
+    result = result.astype({key: source[key].dtype for key in keys}).astype(expected.dtypes.to_dict())
+
+    return result.sort_values(keys, kind='stable').set_index(keys)
+
+#Chart frames of every spec, queried from the embedded database (same frames as utils.charts.compute_charts)
+#countries: selected countries (None for no filter); sources: the pandas frames, only used for their dtypes
+#(the price sketch is the exception: its quantiles are read from the filtered frame, a small histogram)
+def query_charts(specs, countries, sources, engine):
+    database = load_database(engine, dataset_version())
+    frames = {}
+
+    for p in plan(specs):
+        if p['source'] == 'price_sketch':
+            result = aggregate_pass(p, specs, sources[p['source']])
+        else:
+            results = [run_query(engine, database, sql, params) for sql, params in pass_queries(p, specs, countries, engine)]
+            result = pass_result(p, specs, results, sources[p['source']])
+
+        for name in p['specs']:
+            frames[name] = chart_frame(specs[name], p, result)
+
+    return frames
+
+
+#Build the database of the current dataset version: python -m utils.sql [sqlite|duckdb]
+if __name__ == '__main__':
+    import sys
+
+    engine = sys.argv[1] if len(sys.argv) > 1 else 'sqlite'
+    version = dataset_version()
+    path = ensure_database(engine, version)
+
+    print(f'Banco {engine} atualizado ({version}): {path}')
@@ -0,0 +1,321 @@
+#Import Libraries
+import glob
+import math
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.cube import CUBE_DIMENSIONS, build_cube
+from utils.data import PIPELINE_VERSION, PROCESSED_PATH, RAW_PATH, file_hash, process_data
+from utils.quantiles import build_price_sketch, merge_price_sketches
+from utils.schema import DERIVED_COLUMNS, SCHEMA, apply_schema, legacy_frame
+from utils.sketch import build_dimension_sketches, merge_dimension_sketches, sketches_table
+from utils.snapshot import (CUBE_PATH, DISTINCT_SKETCH_PATH, MANIFEST_PATH, PRICE_SKETCH_PATH, SNAPSHOT_PATH, write_manifest,
+                            write_table)
+
+
+#Streaming ingest defaults: raw rows per chunk, target size of each on-disk dedup partition
+#and most partitions read at once by the merge
+CHUNK_ROWS = 50_000
+PARTITION_MB = 256
+MERGE_FANIN = 8
+
+# =======================================
+# Functions
+# =======================================
+
+#Out-of-core version of build_snapshot, for raw files larger than RAM
+#1. read the raw CSV in chunks, run process_data on each one and spill the rows to disk,
+#   partitioned by restaurant_id (duplicated rows always land in the same partition)
+#2. drop the duplicates of each partition (one partition in memory at a time)
+#3. merge the partitions back in raw file order (at most merge_fanin at a time, in several passes when there are more)
+#   and write snapshot, cube and legacy CSV in row groups (the cube and the sketches are merged batch by batch,
+#   the distinct sketches as dense registers per group, turned into their table when written)
+#Peak memory depends on chunk_rows/partition_mb/merge_fanin, not on the size of the raw file
+
+#Dtype that holds the values of both chunks (chunks are parsed independently by read_csv)
+def common_dtype(a, b):
+    if a == b:
+        return a
+
+    if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+        return np.result_type(a, b)
+
+    return np.dtype(object)
+
+#Partition of each row (hash of restaurant_id)
+def partition_of(ids, partitions):
+    return pd.util.hash_array(ids.to_numpy().astype('int64')) % partitions
+
+#Columns typed as category / 32-bit int by the schema (their values are collected while streaming)
+CATEGORY_COLS = [col for col, dtype in SCHEMA.items() if isinstance(dtype, str) and dtype == 'category']
+INT_COLS = [col for col, dtype in SCHEMA.items() if dtype in ('int32', 'int16', 'int8')]
+
+#What the schema needs from a block of processed rows: dtypes, categories and integer ranges
+def frame_stats(df):
+    stats = {'dtypes': dict(df.dtypes), 'uniques': {}, 'ranges': {}}
+
+    for col in CATEGORY_COLS:
+        stats['uniques'][col] = set(df[col].unique().tolist())
+
+    for col in INT_COLS:
+        if len(df) > 0:
+            stats['ranges'][col] = (df[col].min(), df[col].max())
+
+    return stats
+
+#Stats of two blocks of rows together
+def merge_stats(stats, other):
+    if stats is None:
+        return other
+
+    dtypes = dict(stats['dtypes'])
+    for col, dtype in other['dtypes'].items():
+        dtypes[col] = common_dtype(dtypes[col], dtype) if col in dtypes else dtype
+
+    uniques = {col: stats['uniques'].get(col, set()) | other['uniques'].get(col, set())
+               for col in CATEGORY_COLS}
+
+    ranges = dict(stats['ranges'])
+    for col, (low, high) in other['ranges'].items():
+        ranges[col] = (min(ranges[col][0], low), max(ranges[col][1], high)) if col in ranges else (low, high)
+
+    return {'dtypes': dtypes, 'uniques': uniques, 'ranges': ranges}
+
+#Pass 1: process the raw chunks and spill them to partition files, collecting what the schema needs
+def spill_chunks(path, tmp_dir, chunk_rows, partitions):
+    stats = None
+
+    for n, chunk in enumerate(pd.read_csv(path, chunksize=chunk_rows)):
+        df = process_data(chunk)
+        stats = merge_stats(stats, frame_stats(df))
+
+        df['_seq'] = df.index.to_numpy().astype('int64')
+        for part, rows in df.groupby(partition_of(df['restaurant_id'], partitions)):
+            rows.to_parquet(os.path.join(tmp_dir, f'p{part:04d}_c{n:06d}.parquet'), index=False)
+
+    return stats
+
+#Pass 2: drop the duplicated rows of each partition (first occurrence in the raw file wins), sorted by raw position
+#Written in small row groups, so the merge only holds one batch per partition
+def dedup_partitions(tmp_dir, partitions, data_cols, batch_rows):
+    paths = []
+
+    for part in range(partitions):
+        files = sorted(glob.glob(os.path.join(tmp_dir, f'p{part:04d}_c*.parquet')))
+        if not files:
+            continue
+
+        df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        df = df.sort_values('_seq', kind='stable').drop_duplicates(subset=[col for col in data_cols if col not in DERIVED_COLUMNS])
+
+        part_path = os.path.join(tmp_dir, f'dedup_{part:04d}.parquet')
+        df.to_parquet(part_path, index=False, row_group_size=batch_rows)
+        paths.append(part_path)
+
+        for f in files:
+            os.remove(f)
+
+    return paths
+
+#Batches of a sorted run (one or more files, in order)
+def run_batches(files, batch_rows):
+    for f in files:
+        yield from pq.ParquetFile(f).iter_batches(batch_size=batch_rows)
+
+#Pass 3: k-way merge of the sorted runs by raw position, in batches
+def merge_partitions(runs, batch_rows):
+    readers = [run_batches(files, batch_rows) for files in runs]
+    buffers = [None] * len(readers)
+
+    while True:
+        for i, reader in enumerate(readers):
+            if reader is not None and (buffers[i] is None or len(buffers[i]) == 0):
+                batch = next(reader, None)
+                if batch is None:
+                    readers[i] = None
+                    buffers[i] = None
+                else:
+                    buffers[i] = batch.to_pandas()
+
+        live = [i for i, buf in enumerate(buffers) if buf is not None]
+        if not live:
+            return
+
+        #Every row up to the smallest last position of the buffers is final
+        bound = min(buffers[i]['_seq'].iloc[-1] for i in live)
+
+        out = []
+        for i in live:
+            take = buffers[i]['_seq'].to_numpy() <= bound
+            out.append(buffers[i].loc[take, :])
+            buffers[i] = buffers[i].loc[~take, :]
+
+        yield pd.concat(out, ignore_index=True).sort_values('_seq', kind='stable')
+
+#Merge the runs merge_fanin at a time until one last merge of at most merge_fanin is left
+#Each intermediate run is written as files of about chunk_rows rows
+def reduce_runs(runs, tmp_dir, batch_rows, chunk_rows, merge_fanin):
+    level = 0
+
+    while len(runs) > merge_fanin:
+        merged = []
+
+        for i in range(0, len(runs), merge_fanin):
+            group = runs[i:i + merge_fanin]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+
+            files = []
+            for df in rebatch(merge_partitions(group, batch_rows), chunk_rows):
+                files.append(os.path.join(tmp_dir, f'run{level:02d}_{i:04d}_{len(files):06d}.parquet'))
+                df.to_parquet(files[-1], index=False, row_group_size=batch_rows)
+            merged.append(files)
+
+            for f in sum(group, []):
+                os.remove(f)
+
+        runs = merged
+        level += 1
+
+    return runs
+
+#Regroup the merged batches in frames of about n rows (row groups of the output files)
+def rebatch(frames, n):
+    buffer = []
+    size = 0
+
+    for df in frames:
+        buffer.append(df)
+        size += len(df)
+
+        if size >= n:
+            yield pd.concat(buffer, ignore_index=True)
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield pd.concat(buffer, ignore_index=True)
+
+#Schema resolved for the whole file: categories from every chunk, 32-bit ints only where the whole column fits
+def resolve_schema(stats):
+    schema = {}
+
+    for col, dtype in SCHEMA.items():
+        if isinstance(dtype, str) and dtype == 'category':
+            schema[col] = pd.CategoricalDtype(sorted(stats['uniques'][col]))
+        elif dtype in ('int32', 'int16', 'int8'):
+            info = np.iinfo(dtype)
+            low, high = stats['ranges'].get(col, (0, 0))
+            if info.min <= low and high <= info.max:
+                schema[col] = dtype
+        else:
+            schema[col] = dtype
+
+    return schema
+
+#Roll up partial cubes (of disjoint sets of rows) into one
+def merge_cubes(cubes):
+    cubes = [cube for cube in cubes if cube is not None]
+    if len(cubes) == 1:
+        return cubes[0]
+
+    return (pd.concat(cubes, ignore_index=True)
+            .groupby(CUBE_DIMENSIONS, observed=True)
+            .agg(restaurants=('restaurants', 'sum'),
+                 votes=('votes', 'sum'),
+                 price_sum=('price_sum', 'sum'),
+                 price_min=('price_min', 'min'),
+                 price_max=('price_max', 'max'))
+            .reset_index())
+
+#Build snapshot, cube, price/distinct sketches and legacy CSV from a raw CSV of any size
+def build_snapshot_streaming(path=RAW_PATH, source_hash=None, chunk_rows=CHUNK_ROWS, partition_mb=PARTITION_MB, partitions=None,
+                             merge_fanin=MERGE_FANIN,
+                             snapshot_path=SNAPSHOT_PATH, manifest_path=MANIFEST_PATH, cube_path=CUBE_PATH, processed_path=PROCESSED_PATH,
+                             price_path=PRICE_SKETCH_PATH, distinct_path=DISTINCT_SKETCH_PATH):
+    if source_hash is None:
+        source_hash = file_hash(path)
+
+    if partitions is None:
+        partitions = max(1, math.ceil(os.path.getsize(path) / (partition_mb * 1024 ** 2)))
+
+    tmp_dir = tempfile.mkdtemp(prefix='ingest_', dir=os.path.dirname(snapshot_path))
+    snapshot_tmp = f'{snapshot_path}.{os.getpid()}.tmp'
+    processed_tmp = f'{processed_path}.{os.getpid()}.tmp'
+
+    writer = None
+
+    try:
+        stats = spill_chunks(path, tmp_dir, chunk_rows, partitions)
+        plain = stats['dtypes']
+        data_cols = list(plain)
+        schema = resolve_schema(stats)
+
+        batch_rows = max(1000, chunk_rows // merge_fanin)
+        paths = dedup_partitions(tmp_dir, partitions, data_cols, batch_rows)
+        runs = reduce_runs([[p] for p in paths], tmp_dir, batch_rows, chunk_rows, merge_fanin)
+
+        cube = None
+        prices = None
+        distinct = None
+        rows = 0
+        dtypes = None
+
+        for df in rebatch(merge_partitions(runs, batch_rows), chunk_rows):
+            df = df.loc[:, data_cols].astype(plain)
+            legacy_frame(df).to_csv(processed_tmp, index=False, mode='w' if rows == 0 else 'a', header=rows == 0)
+
+            df = apply_schema(df, schema)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(snapshot_tmp, table.schema)
+            writer.write_table(table)
+
+            cube = merge_cubes([cube, build_cube(df)])
+            prices = merge_price_sketches([prices, build_price_sketch(df)])
+            distinct = merge_dimension_sketches([distinct, build_dimension_sketches(df)])
+            rows += len(df)
+            dtypes = df.dtypes
+
+        if writer is None:
+            empty = apply_schema(pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in plain.items()}), schema)
+            legacy_frame(empty).to_csv(processed_tmp, index=False)
+            empty.to_parquet(snapshot_tmp, index=False)
+            cube = build_cube(empty)
+            prices = build_price_sketch(empty)
+            distinct = build_dimension_sketches(empty)
+            dtypes = empty.dtypes
+        else:
+            writer.close()
+            writer = None
+
+        os.replace(processed_tmp, processed_path)
+        write_table(cube, cube_path)
+        write_table(prices, price_path)
+        write_table(sketches_table(distinct), distinct_path)
+        os.replace(snapshot_tmp, snapshot_path)
+
+        return write_manifest(rows, dtypes, source_hash, PIPELINE_VERSION, manifest_path=manifest_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        for f in glob.glob(os.path.join(tmp_dir, '*')) + [snapshot_tmp, processed_tmp]:
+            if os.path.exists(f):
+                os.remove(f)
+        os.rmdir(tmp_dir)
+
+
+#Streaming build from the command line: python -m utils.stream [raw.csv] [linhas_por_bloco]
+if __name__ == '__main__':
+    raw_path = sys.argv[1] if len(sys.argv) > 1 else RAW_PATH
+    chunk_rows = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_ROWS
+
+    manifest = build_snapshot_streaming(raw_path, chunk_rows=chunk_rows)
+    print(f"Snapshot atualizado (streaming): {manifest['rows']} restaurantes")
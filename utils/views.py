@@ -0,0 +1,197 @@
+#Contents of the dashboard views, shared by the Streamlit pages and the batch reports (utils.report)
+#Charts are utils.charts specs, plus their heading ('title') and footnotes ('notes')
+
+#Import Libraries
+from utils.charts import compute_charts
+from utils.cuisines import build_cuisine_cube, build_cuisine_index, count_cuisines
+from utils.quantiles import APPROX_QUANTILES, QUANTILE_ACCURACY, quantile_of
+from utils.selection import build_country_index, select_rows
+from utils.sketch import APPROX_DISTINCT, HLL_ERROR, estimate_distinct, table_sketches
+from utils.snapshot import CUBE_PATH, DISTINCT_SKETCH_PATH, PRICE_SKETCH_PATH, read_snapshot, read_table
+
+
+#Overview metrics of the Geral view: name -> (label, column, aggregation)
+OVERVIEW_METRICS = {
+    'restaurants': ('Restaurantes Cadastrados', 'restaurant_id', 'nunique'),
+    'countries': ('Países Cadastrados', 'country', 'nunique'),
+    'cities': ('Cidades Cadastradas', 'city', 'nunique'),
+    'cuisines': ('Tipos de Culinária', 'cuisines', 'nunique'),
+    'votes': ('Total de avaliações registradas', 'votes', 'sum'),
+}
+
+#Metrics shown with a thousands separator
+THOUSANDS_METRICS = ('restaurants', 'votes')
+
+#Metrics estimated from the per-country distinct-count sketches in approximate mode (APPROX_DISTINCT=1, utils.sketch);
+#the others then come from the cubes, exact
+APPROXIMATE_METRICS = ('restaurants',) if APPROX_DISTINCT else ()
+
+#Tooltip of the approximate metrics
+APPROXIMATE_HELP = f'Valor aproximado (HyperLogLog): erro padrão de {HLL_ERROR:.1%}, até {2 * HLL_ERROR:.1%} em 95% dos casos'
+
+#Note of the price quantile charts read from the price sketch (APPROX_QUANTILES=1, see quantile_specs)
+QUANTILE_NOTE = f'≈ Valores aproximados (sketch de quantis): erro relativo de até {QUANTILE_ACCURACY:.0%}.'
+
+#Cuisine charts read the cube over every listed cuisine ('cuisine_cube'), see cuisine_specs for the primary-only mode
+
+#Países: the cube charts are one pass, the median price one pass over the rows
+COUNTRY_CHARTS = {
+    'restaurantes_pais': {'source': 'cube', 'dimension': 'country', 'measure': 'restaurant_id', 'aggregation': 'count',
+                          'chart': 'pie', 'labels': {'restaurant_id':'QTD Restaurantes', 'country':'País'},
+                          'title': 'Quantidade de Restaurantes por País'},
+    'top_paises': {'source': 'cube', 'dimension': 'country', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 10,
+                   'chart': 'bar', 'labels': {'country':'Países', 'restaurant_id':'QTD Restaurantes'},
+                   'title': 'Top 10 Países com Maior Número de Restaurantes'},
+    'culinarias_pais': {'source': 'cuisine_cube', 'dimension': 'country', 'measure': 'cuisines', 'aggregation': 'nunique',
+                        'chart': 'bar', 'labels': {'country':'Países', 'cuisines':'Tipos de Culinária'},
+                        'title': 'Total de Tipos de Culinária por País'},
+    'preco_mediano': {'source': 'rows', 'dimension': 'country', 'measure': 'average_cost_for_two', 'aggregation': 'median',
+                      'filter': ('country', '!=', 'Indonesia'),
+                      'chart': 'bar', 'labels': {'country':'Países', 'average_cost_for_two':'Média de Preço'},
+                      'title': 'Média de Preços de um Prato para Duas Pessoas (Considerada a Mediana*)',
+                      'notes': ['*Mediana: Valor Central de um conjunto de números colocados por ordem de grandeza.',
+                                '**Nesta análise foi desconsiderado a Indonésia por se configurar um Outlier previamente identificado.']},
+    'media_avaliacoes': {'source': 'cube', 'dimension': 'country', 'measure': 'votes', 'aggregation': 'mean',
+                         'chart': 'bar', 'labels': {'country':'Países', 'votes':'Média de Avaliações'},
+                         'title': 'Média de Avaliações por País'},
+}
+
+#Cidades: restaurant counts are one pass over the cube, cuisine variety another
+CITY_CHARTS = {
+    'top_cidades': {'source': 'cube', 'dimension': 'city', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 10,
+                    'chart': 'bar', 'labels': {'city':'Cidade', 'restaurant_id':'QTD Restaurantes'},
+                    'title': 'Top 10 Cidades com Mais Restaurantes registrados'},
+    'melhores_cidades': {'source': 'cube', 'dimension': 'city', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 5,
+                         'filter': ('rating_band', '==', 'high'),
+                         'chart': 'bar', 'labels': {'city':'Cidade', 'restaurant_id':'QTD Restaurantes'},
+                         'title': 'Top 5 Cidades com as Melhores Avaliações (Acima de 4.6)'},
+    'piores_cidades': {'source': 'cube', 'dimension': 'city', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 5,
+                       'filter': ('rating_band', '==', 'low'),
+                       'chart': 'bar', 'labels': {'city':'Cidade', 'restaurant_id':'QTD Restaurantes'},
+                       'title': 'Top 5 Cidades com as Piores Avaliações (Abaixo de 2.0)'},
+    'variedade_culinarias': {'source': 'cuisine_cube', 'dimension': 'city', 'measure': 'cuisines', 'aggregation': 'nunique', 'top': 10,
+                             'chart': 'bar', 'labels': {'city':'Cidade', 'cuisines':'QTD Tipos Culinária'},
+                             'title': 'Top 10 cidades com maior variedade de Tipos de Culinária'},
+    'restaurantes_cidade': {'source': 'cube', 'dimension': 'city', 'measure': 'restaurant_id', 'aggregation': 'count',
+                            'chart': 'table', 'labels': {'city':'Cidade', 'restaurant_id':'QTD_Restaurantes'},
+                            'title': 'Quantidade Total de Restaurantes por Cidade'},
+}
+
+#Culinária: the cuisine counts are one pass over the cube, the country report another
+CUISINE_CHARTS = {
+    'top_culinarias': {'source': 'cuisine_cube', 'dimension': 'cuisines', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 10,
+                       'chart': 'bar', 'labels': {'cuisines':'Tipos de Culinária', 'restaurant_id':'QTD Restaurantes'},
+                       'title': 'Top 10 Tipos de Culinárias por Quantidade de Restaurantes'},
+    'melhores_culinarias': {'source': 'cuisine_cube', 'dimension': 'cuisines', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 10,
+                            'filter': ('rating_band', '==', 'high'),
+                            'chart': 'pie', 'labels': {'restaurant_id':'QTD Restaurantes', 'cuisines':'Tipo de Culinária'},
+                            'title': 'Top 10 Tipos Culinários Melhores Avaliados (Acima de 4.6)'},
+    'piores_culinarias': {'source': 'cuisine_cube', 'dimension': 'cuisines', 'measure': 'restaurant_id', 'aggregation': 'count', 'top': 10,
+                          'filter': ('rating_band', '==', 'low'),
+                          'chart': 'pie', 'labels': {'restaurant_id':'QTD Restaurantes', 'cuisines':'Tipo de Culinária'},
+                          'title': 'Top 10 Tipos Culinários Piores Avaliados (Abaixo de 2.0)'},
+    'culinarias_pais': {'source': 'cuisine_cube', 'dimension': ['country', 'cuisines'], 'measure': 'restaurant_id', 'aggregation': 'count',
+                        'chart': 'table', 'labels': {'restaurant_id':'QTD Restaurantes', 'country':'País', 'cuisines':'Tipo de Culinária'},
+                        'title': 'Relatório Geral de Tipos Culinário por País'},
+}
+
+#Chart views in dashboard order
+VIEWS = {
+    'Países': COUNTRY_CHARTS,
+    'Cidades': CITY_CHARTS,
+    'Culinária': CUISINE_CHARTS,
+}
+
+#Columns of the dataset used by the views (everything else comes from the cube)
+VIEW_COLUMNS = ['restaurant_id', 'country', 'city', 'cuisines', 'all_cuisines', 'price_type', 'aggregate_rating',
+                'votes', 'average_cost_for_two']
+
+# =======================================
+# Functions
+# =======================================
+
+#Dataset and cube with their country position indexes, for processes outside Streamlit (reports, API)
+#(the st.cache_resource loaders of utils.data only cache inside the Streamlit runtime)
+def load_view_data():
+    df = read_snapshot(VIEW_COLUMNS)
+    cube = read_table(CUBE_PATH)
+    price_sketch = read_table(PRICE_SKETCH_PATH)
+    cuisine_index = build_cuisine_index(df['all_cuisines'])
+    cuisine_cube = build_cuisine_cube(df, cuisine_index)
+
+    return {'df': df, 'cube': cube, 'cuisine_cube': cuisine_cube, 'cuisine_index': cuisine_index,
+            'countries': df['country'].unique().tolist(),
+            'df_index': build_country_index(df['country']), 'cube_index': build_country_index(cube['country']),
+            'cuisine_cube_index': build_country_index(cuisine_cube['country']),
+            'price_sketch': price_sketch, 'price_sketch_index': build_country_index(price_sketch['country']),
+            'sketches': table_sketches(read_table(DISTINCT_SKETCH_PATH), 'country') if APPROX_DISTINCT else None}
+
+#Specs of a view for a cuisine mode (utils.cuisines.CUISINE_MODES): 'principal' reads the cuisine charts
+#from the primary-cuisine cube, as the dashboard did before the multi-cuisine index
+def cuisine_specs(specs, mode):
+    if mode != 'principal':
+        return specs
+
+    return {name: dict(spec, source='cube') if spec['source'] == 'cuisine_cube' else spec for name, spec in specs.items()}
+
+#Specs of a view in approximate mode (APPROX_QUANTILES=1): price quantiles over the rows read the price sketch
+#(utils.quantiles) instead, with a note marking the values as approximate
+def quantile_specs(specs):
+    if not APPROX_QUANTILES:
+        return specs
+
+    return {name: dict(spec, source='price_sketch', notes=spec.get('notes', []) + [QUANTILE_NOTE])
+            if spec['source'] == 'rows' and spec['measure'] == 'average_cost_for_two' and quantile_of(spec['aggregation'])
+            else spec
+            for name, spec in specs.items()}
+
+#Overview metrics of a (filtered) dataset
+#With the cuisine index (utils.cuisines), cuisine types count every listed cuisine, not only the primary one
+def overview_metrics(df, cuisine_index=None):
+    metrics = {name: df[col].agg(how) for name, (label, col, how) in OVERVIEW_METRICS.items()}
+    if cuisine_index is not None:
+        metrics['cuisines'] = count_cuisines(cuisine_index, df['all_cuisines'].cat.codes.to_numpy())
+
+    return metrics
+
+#Overview metrics without a pass over the rows (approximate mode): distinct restaurants merged from the per-country
+#sketches, the other metrics from the (filtered) cube, or from the multi-cuisine cube for the cuisine types
+def sketch_metrics(sketches, countries, cube, cuisine_cube=None):
+    cuisines = cube if cuisine_cube is None else cuisine_cube
+
+    return {
+        'restaurants': estimate_distinct(sketches, countries),
+        'countries': cube['country'].nunique(),
+        'cities': cube['city'].nunique(),
+        'cuisines': cuisines['cuisines'].nunique(),
+        'votes': cube['votes'].sum(),
+    }
+
+#Metric value as shown on the page (approximate values start with ≈)
+def format_metric(name, value):
+    if name in THOUSANDS_METRICS:
+        value = '{:,}'.format(value).replace(',','.')
+
+    return f'≈ {value}' if name in APPROXIMATE_METRICS else value
+
+#Metrics ('Geral') and chart frames of the given views for one country selection
+def compute_views(data, countries, views=('Geral',) + tuple(VIEWS), cuisine_mode='todas'):
+    df = select_rows(data['df'], data['df_index'], countries)
+    sources = {
+        'rows': df,
+        'cube': select_rows(data['cube'], data['cube_index'], countries),
+        'cuisine_cube': select_rows(data['cuisine_cube'], data['cuisine_cube_index'], countries),
+        'price_sketch': select_rows(data['price_sketch'], data['price_sketch_index'], countries),
+    }
+
+    results = {}
+    for view in views:
+        if view == 'Geral' and APPROX_DISTINCT:
+            results[view] = sketch_metrics(data['sketches'], countries, sources['cube'],
+                                           sources['cuisine_cube'] if cuisine_mode != 'principal' else None)
+        elif view == 'Geral':
+            results[view] = overview_metrics(df, data['cuisine_index'] if cuisine_mode != 'principal' else None)
+        else:
+            results[view] = compute_charts(quantile_specs(cuisine_specs(VIEWS[view], cuisine_mode)), sources)
+
+    return results
@@ -0,0 +1,220 @@
+#Import Libraries
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.ioloop import IOLoop
+from tornado.websocket import websocket_connect
+
+from utils.snapshot import BASE_DIR, DATA_DIR
+
+
+#Warm-up of a new replica before it gets traffic, and its time-to-first-render
+#1. prepare(): the disk state (snapshot, embedded database), built only when missing or stale
+#2. warm_pages(): every page rendered once through the app websocket, like a browser tab would, so the
+#   server process loads its imports, datasets, indexes and figure cache before the first user arrives
+#Usage: python -m utils.warmup --url http://localhost:8501     (warm a running server)
+#       python -m utils.warmup --serve [--port 8501]           (start Streamlit, warm it, keep serving)
+#       python -m utils.warmup --measure [--port 8599]         (start, warm, report and stop: tracking)
+MAIN_SCRIPT = os.path.join(BASE_DIR, 'Página_Inicial.py')
+
+#Startup measures, one JSON line per --serve/--measure run
+STARTUP_LOG = os.path.join(DATA_DIR, 'startup.jsonl')
+
+#Written once the server is warm (readiness probe: the file exists), removed when a new warm-up starts
+READY_PATH = os.path.join(DATA_DIR, 'ready.json')
+
+#Seconds to wait for the server to answer its health check, and for each page
+BOOT_TIMEOUT = 120
+PAGE_TIMEOUT = 300
+
+FINISHED = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR)
+
+# =======================================
+# Functions
+# =======================================
+
+#Snapshot (processed from the raw CSV only when missing or stale) and, with QUERY_ENGINE=sqlite/duckdb, the database
+#Imports here: the warm-up client itself never needs the data modules
+def prepare():
+    from utils.charts import QUERY_ENGINE
+    from utils.data import dataset_version
+
+    timings = {}
+
+    start = time.perf_counter()
+    version = dataset_version()
+    timings['snapshot_s'] = time.perf_counter() - start
+
+    if QUERY_ENGINE != 'pandas':
+        from utils.sql import ensure_database
+
+        start = time.perf_counter()
+        ensure_database(QUERY_ENGINE, version)
+        timings['database_s'] = time.perf_counter() - start
+
+    return version, timings
+
+def start_server(port):
+    return subprocess.Popen([sys.executable, '-m', 'streamlit', 'run', MAIN_SCRIPT,
+                             '--server.headless', 'true', '--server.port', str(port),
+                             '--browser.gatherUsageStats', 'false'],
+                            cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def wait_healthy(url, server=None, timeout=BOOT_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f'O Streamlit terminou ao iniciar (código {server.returncode})')
+        try:
+            with urllib.request.urlopen(f'{url}/_stcore/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+
+    raise TimeoutError(f'O Streamlit não respondeu em {timeout} s: {url}')
+
+#One page run over the app websocket: time until its first element arrived, until the script finished, and the
+#exceptions it showed
+#Returns {'first_s', 'seconds', 'errors', 'pages'} (pages: [(page_script_hash, page_name)] of the app, from the new session message)
+async def run_page(ws, page_script_hash=''):
+    msg = BackMsg()
+    msg.rerun_script.page_script_hash = page_script_hash
+    #Widgets keep their defaults: the default country selection gets warm
+    msg.rerun_script.widget_states.SetInParent()
+
+    start = time.perf_counter()
+    await ws.write_message(msg.SerializeToString(), binary=True)
+
+    result = {'first_s': None, 'errors': [], 'pages': []}
+    while True:
+        payload = await ws.read_message()
+        if payload is None:
+            raise ConnectionError('O Streamlit fechou a conexão')
+
+        msg = ForwardMsg()
+        msg.ParseFromString(payload)
+        kind = msg.WhichOneof('type')
+
+        if kind == 'new_session':
+            result['pages'] = [(page.page_script_hash, page.page_name) for page in msg.new_session.app_pages]
+        elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+            if result['first_s'] is None:
+                result['first_s'] = time.perf_counter() - start
+            if msg.delta.new_element.WhichOneof('type') == 'exception':
+                result['errors'].append(msg.delta.new_element.exception.message)
+        elif kind == 'script_finished' and msg.script_finished in FINISHED:
+            result['seconds'] = time.perf_counter() - start
+            return result
+
+#Render every page of the app once (rounds > 1: again, with everything warm)
+#Returns one row per page and round: {'page', 'round', 'first_s', 'seconds', 'errors'}
+async def warm_pages(url, rounds=1):
+    ws = await websocket_connect(url.replace('http', 'ws', 1) + '/_stcore/stream', max_message_size=256 * 1024 ** 2)
+    rows = []
+    try:
+        #The main page runs first (no hash): its new session message lists the app pages
+        result = await run_page(ws)
+        pages = result['pages']
+        rows.append({'page': pages[0][1], 'round': 1, 'first_s': result['first_s'], 'seconds': result['seconds'], 'errors': result['errors']})
+
+        for round in range(1, rounds + 1):
+            for page_script_hash, name in pages[1:] if round == 1 else pages:
+                result = await run_page(ws, page_script_hash)
+                rows.append({'page': name, 'round': round, 'first_s': result['first_s'], 'seconds': result['seconds'], 'errors': result['errors']})
+    finally:
+        ws.close()
+
+    return rows
+
+def write_ready(report):
+    tmp_path = f'{READY_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, READY_PATH)
+
+def print_report(report):
+    for name, value in report['timings'].items():
+        print(f'{name:<28} {value:8.2f} s')
+
+    print(f"\n{'página':<20} {'rodada':>6} {'1º elem. s':>10} {'total s':>8}")
+    for row in report['pages']:
+        status = '' if not row['errors'] else '   ERRO: ' + row['errors'][0][:80]
+        print(f"{row['page']:<20} {row['round']:>6} {row['first_s'] or 0:10.2f} {row['seconds']:8.2f}{status}")
+
+#Prepare the disk state, start (or reach) the server and warm every page
+#Timings: server_boot_s (launch -> health check ok), time_to_first_render_s (launch -> first element of the first page
+#on screen), time_to_first_page_s (launch -> first page complete)
+def warm_up(url=None, port=8501, rounds=1):
+    if os.path.exists(READY_PATH):
+        os.remove(READY_PATH)
+
+    version, timings = prepare()
+
+    server = None
+    if url is None:
+        url = f'http://localhost:{port}'
+        launched = time.perf_counter()
+        server = start_server(port)
+        wait_healthy(url, server)
+        timings['server_boot_s'] = time.perf_counter() - launched
+
+    rows = IOLoop.current().run_sync(lambda: warm_pages(url, rounds), timeout=PAGE_TIMEOUT * 10)
+    if server is not None:
+        timings['time_to_first_render_s'] = timings['server_boot_s'] + rows[0]['first_s']
+        timings['time_to_first_page_s'] = timings['server_boot_s'] + rows[0]['seconds']
+    timings['warm_up_s'] = sum(row['seconds'] for row in rows if row['round'] == 1)
+
+    report = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'dataset_version': version,
+        'url': url,
+        'python': platform.python_version(),
+        'timings': timings,
+        'pages': rows,
+    }
+
+    return server, report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--serve', action='store_true')
+    parser.add_argument('--measure', action='store_true')
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--rounds', type=int, default=None)
+    args = parser.parse_args()
+
+    port = args.port or (8599 if args.measure else 8501)
+    rounds = args.rounds or (2 if args.measure else 1)
+    server, report = warm_up(None if (args.serve or args.measure) else args.url or f'http://localhost:{port}', port, rounds)
+
+    print_report(report)
+    if server is not None:
+        with open(STARTUP_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + '\n')
+
+    errors = sum(len(row['errors']) for row in report['pages'])
+    if errors:
+        print(f'\n{errors} erros nas páginas')
+
+    if args.measure:
+        server.terminate()
+        server.wait()
+        sys.exit(1 if errors else 0)
+
+    write_ready(report)
+    if server is not None:
+        print(f"\nServidor pronto em {report['url']}")
+        sys.exit(server.wait())